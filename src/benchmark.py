@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark suite for the label pipeline on synthetic CPRO workbooks.
+
+For each size, a seeded synthetic workbook (see synthetic_data) is generated
+once and kept in the data directory, then these stages are timed separately:
+
+- ingest: load_data_from_excel without filters (a cold parse of the workbook)
+- ingest_cached: the same through a warm ingest cache, as the web app reads it
+- filter_<type>: filter_engine.filter_mask for each filter on its own
+  (category, category exclude, status, status exclude, mail zone, publication)
+  and all of them combined in AND mode
+- to_dict: converting the loaded sheet to records
+- render: generate_labels
+- web_upload, web_export, web_generate, web_generate_cached: the API endpoints
+
+Each stage reports seconds, throughput (rows per second, or labels per second
+for rendering) and the peak resident memory of the process while it ran.
+Results can be saved as JSON and compared against a baseline with perf_gate.
+
+Example:
+    python src/benchmark.py --sizes 1k,10k,100k --json output/benchmark.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import filter_engine
+from memory_profile import PeakRSS
+from simple_labels import load_data_from_excel, generate_labels
+from synthetic_data import SIZES, ensure_workbook
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_DIR, "config", "label_config.json")
+
+# Each filter type on its own, then everything together in AND mode
+FILTERS = {
+    "category": dict(category_filter="C_acd,C_col"),
+    "category_exclude": dict(category_exclude_filter="C_can,C_hst"),
+    "status": dict(status_filter="19,8"),
+    "status_exclude": dict(status_exclude_filter="90"),
+    # MAIL_ZONE is read as a float (it has blanks), and the filter compares its string form
+    "mail_zone": dict(mail_zone_filter="2.0"),
+    "publication": dict(publication_columns=["BE", "AR"]),
+    "combined_and": dict(status_filter="19", category_exclude_filter="C_can", mail_zone_filter="3.0",
+                         publication_columns=["BE"], filter_mode="AND"),
+}
+
+
+def parse_sizes(text):
+    """Turn "1k,10k" (or plain row counts) into a list of (name, rows)."""
+    sizes = []
+    for name in text.split(","):
+        name = name.strip().lower()
+        if name:
+            sizes.append((name, SIZES.get(name) or int(name)))
+    return sizes
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    """Call func repeat times and return (best seconds, peak RSS, last result)."""
+    best = None
+    with PeakRSS() as rss:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    return best, rss.peak, result
+
+
+def stage(seconds, items, unit="rows", peak_rss=None):
+    """Result entry for one stage: duration, item count, throughput and peak RSS."""
+    return {
+        "seconds": seconds,
+        unit: items,
+        f"{unit}_per_second": items / seconds if seconds > 0 else None,
+        "peak_rss_bytes": peak_rss,
+    }
+
+
+def bench_pipeline(workbook, rows, repeat=1, render_rows=None, work_dir=None):
+    """
+    Time ingest, each filter, to_dict and rendering on one workbook.
+
+    Args:
+        workbook (str): Path of the workbook.
+        rows (int): Number of data rows in it.
+        repeat (int): Take the best of this many runs of each stage.
+        render_rows (int, optional): Render at most this many labels.
+        work_dir (str, optional): Where to put the ingest cache and PDF (a temp dir by default).
+
+    Returns:
+        dict: Stage name -> stage() entry.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        seconds, peak, df = timed(load_data_from_excel, workbook, repeat=repeat)
+        results["ingest"] = stage(seconds, rows, peak_rss=peak)
+
+        cache_dir = os.path.join(tmp, "ingest_cache")
+        load_data_from_excel(workbook, cache_dir=cache_dir)  # Warm the cache
+        seconds, peak, _ = timed(load_data_from_excel, workbook, cache_dir=cache_dir, repeat=repeat)
+        results["ingest_cached"] = stage(seconds, rows, peak_rss=peak)
+
+        for name, filters in FILTERS.items():
+            seconds, peak, _ = timed(filter_engine.filter_mask, df, repeat=repeat, **filters)
+            results[f"filter_{name}"] = stage(seconds, rows, peak_rss=peak)
+
+        seconds, peak, records = timed(df.to_dict, orient="records", repeat=repeat)
+        results["to_dict"] = stage(seconds, rows, peak_rss=peak)
+
+        if render_rows is not None:
+            records = records[:render_rows]
+        seconds, peak, label_count = timed(generate_labels, records, os.path.join(tmp, "labels.pdf"),
+                                           config_file=CONFIG_PATH, repeat=repeat)
+        results["render"] = stage(seconds, label_count, unit="labels", peak_rss=peak)
+    return results
+
+
+def bench_web(workbook, rows, render_rows=None):
+    """
+    Time the upload, export and generate endpoints on one workbook.
+
+    The app runs in a temporary working directory, so its uploads and caches
+    don't touch the repository.
+
+    Returns:
+        dict: Stage name -> stage() entry.
+    """
+    import httpx
+
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in ("static", "templates", "config", "icon"):
+            os.symlink(os.path.join(PROJECT_DIR, name), os.path.join(work_dir, name))
+        os.chdir(work_dir)
+        try:
+            sys.modules.pop("web_app", None)
+            web_app = importlib.import_module("web_app")
+            try:
+                return asyncio.run(_web_scenario(httpx, web_app, workbook, rows, render_rows))
+            finally:
+                web_app.shutdown_executor()
+        finally:
+            os.chdir(old_cwd)
+
+
+async def _web_scenario(httpx, web_app, workbook, rows, render_rows):
+    results = {}
+    config = {"limit": render_rows} if render_rows is not None else {}
+    request = {"filename": os.path.basename(workbook), "config": config}
+    with open(workbook, "rb") as f:
+        content = f.read()
+
+    transport = httpx.ASGITransport(app=web_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def post(url, **kwargs):
+            with PeakRSS() as rss:
+                start = time.perf_counter()
+                response = await client.post(url, **kwargs)
+                response.raise_for_status()
+                elapsed = time.perf_counter() - start
+            return elapsed, rss.peak
+
+        labels = min(rows, render_rows) if render_rows is not None else rows
+        seconds, peak = await post("/upload", files={"file": (request["filename"], content)})
+        results["web_upload"] = stage(seconds, rows, peak_rss=peak)
+        seconds, peak = await post("/export-filtered", json=request)
+        results["web_export"] = stage(seconds, rows, peak_rss=peak)
+        seconds, peak = await post("/generate", json=request)
+        results["web_generate"] = stage(seconds, labels, unit="labels", peak_rss=peak)
+        seconds, peak = await post("/generate", json=request)
+        results["web_generate_cached"] = stage(seconds, labels, unit="labels", peak_rss=peak)
+    return results
+
+
+def machine_profile():
+    """Describe the machine the numbers were taken on."""
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(sizes, data_dir, seed=0, repeat=1, render_rows=None, web=True):
+    """
+    Run the suite for each (name, rows) in sizes.
+
+    Returns:
+        dict: {"machine": ..., "seed": ..., "sizes": {name: {"rows": ..., "stages": {...}}}}
+    """
+    report = {"machine": machine_profile(), "seed": seed, "sizes": {}}
+    for name, rows in sizes:
+        start = time.perf_counter()
+        workbook = ensure_workbook(rows, data_dir, seed=seed)
+        print(f"[{name}] workbook ready in {time.perf_counter() - start:.1f}s: {workbook}")
+
+        stages = bench_pipeline(workbook, rows, repeat=repeat, render_rows=render_rows)
+        if web:
+            stages.update(bench_web(workbook, rows, render_rows=render_rows))
+        report["sizes"][name] = {"rows": rows, "stages": stages}
+        print(format_results(name, rows, stages))
+    return report
+
+
+def format_results(name, rows, stages):
+    """Table of one size's stage timings and throughput."""
+    lines = [f"{name} ({rows} rows)", f"  {'stage':<24}{'seconds':>10}{'throughput':>22}{'peak RSS':>12}"]
+    for stage_name, entry in stages.items():
+        unit = "labels" if "labels" in entry else "rows"
+        rate = entry[f"{unit}_per_second"]
+        throughput = f"{rate:,.0f} {unit}/s" if rate is not None else "-"
+        peak = entry.get("peak_rss_bytes")
+        peak_text = f"{peak / (1024 * 1024):.0f} MB" if peak is not None else "-"
+        lines.append(f"  {stage_name:<24}{entry['seconds']:>10.3f}{throughput:>22}{peak_text:>12}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the label pipeline on synthetic workbooks.")
+    parser.add_argument("--sizes", default="1k,10k",
+                        help="Comma-separated sizes: " + ", ".join(SIZES) + " or row counts (default: 1k,10k)")
+    parser.add_argument("--data-dir", default=os.path.join(PROJECT_DIR, "output", "benchmark_data"),
+                        help="Where generated workbooks are kept between runs")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    parser.add_argument("--repeat", type=int, default=1, help="Best of this many runs per stage")
+    parser.add_argument("--render-rows", type=int, default=None,
+                        help="Render at most this many labels per size (rendering 1M labels takes a while)")
+    parser.add_argument("--no-web", action="store_true", help="Skip the web endpoint benchmarks")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    report = run_benchmarks(parse_sizes(args.sizes), args.data_dir, seed=args.seed, repeat=args.repeat,
+                            render_rows=args.render_rows, web=not args.no_web)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
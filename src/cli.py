@@ -6,10 +6,23 @@ Command-line interface for the label printing application using simple_labels mo
 """
 
 import argparse
+import itertools
 import os
 import sys
 import pandas as pd
-from simple_labels import load_data_from_excel, generate_labels, load_config
+import memory_profile
+import metrics
+from profiling import Profiler
+from simple_labels import load_data_from_excel, iter_records_from_excel, generate_labels, load_config
+from parallel_render import generate_labels_parallel
+
+
+def record_matches(record, filters):
+    """Check whether a single record matches all provided filters."""
+    for key, value in filters.items():
+        if key in record and str(record[key]) != str(value):
+            return False
+    return True
 
 
 def filter_data(records, filters):
@@ -17,17 +30,7 @@ def filter_data(records, filters):
     if not filters:
         return records
     
-    filtered_records = []
-    for record in records:
-        match = True
-        for key, value in filters.items():
-            if key in record and str(record[key]) != str(value):
-                match = False
-                break
-        if match:
-            filtered_records.append(record)
-    
-    return filtered_records
+    return [record for record in records if record_matches(record, filters)]
 
 
 def create_label_batch(records, batch_size, start_index=0):
@@ -36,7 +39,20 @@ def create_label_batch(records, batch_size, start_index=0):
     return records[start_index:end_index]
 
 
-def parse_args():
+def render_labels(records, args):
+    """Render records serially, or in worker processes when --workers is given."""
+    if args.workers and args.workers > 1:
+        if args.pages_per_file:
+            # Each shard becomes one part file of the requested size
+            generate_labels_parallel(records, args.output, config_file=args.config, workers=args.workers,
+                                     pages_per_shard=args.pages_per_file, merge=False)
+        else:
+            generate_labels_parallel(records, args.output, config_file=args.config, workers=args.workers)
+    else:
+        generate_labels(records, args.output, config_file=args.config, pages_per_file=args.pages_per_file)
+
+
+def parse_args(argv=None):
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(description="Generate labels from Excel data.")
     
@@ -100,13 +116,78 @@ def parse_args():
         default=0
     )
     
-    return parser.parse_args()
+    parser.add_argument(
+        "-w", "--workers",
+        help="Render page-aligned shards in this many worker processes",
+        type=int,
+        default=None
+    )
+    
+    parser.add_argument(
+        "--pages-per-file",
+        help="Roll over to a new PDF every N pages (writes <output>_partNNN.pdf and a manifest)",
+        type=int,
+        default=None
+    )
+    
+    parser.add_argument(
+        "--stream",
+        help="Stream rows from the Excel file instead of loading it all into memory",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--timings",
+        help="Print the time spent per stage (ingest, filter, to_dict, render, pdf_save) when done",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        help="Profile the run and write <output>_profile.pstats and <output>_profile.collapsed (flamegraph stacks)",
+        action="store_true"
+    )
+    
+    parser.add_argument(
+        "--mem-report",
+        help="Record peak memory and top allocation sites per stage (slows the run down) and print them when done",
+        action="store_true"
+    )
+    
+    args = parser.parse_args(argv)
+    if args.stream and args.workers and args.workers > 1:
+        # Sharding needs the full record list, which would defeat streaming
+        parser.error("--stream cannot be combined with --workers: the parallel renderer loads every row into memory")
+    return args
 
 
 def main():
     """Main function for the CLI."""
     args = parse_args()
-    
+    memory_report = None
+    if args.mem_report:
+        with memory_profile.recording() as memory_report:
+            run_profiled_if_requested(args)
+    else:
+        run_profiled_if_requested(args)
+    if args.timings:
+        print(metrics.format_timings())
+    if memory_report is not None:
+        print(memory_profile.format_report(memory_report))
+
+
+def run_profiled_if_requested(args):
+    """Run, under the profiler when --profile was given."""
+    if args.profile:
+        with Profiler(f"{os.path.splitext(args.output)[0]}_profile") as profiler:
+            run(args)
+        print(f"Profile written to {profiler.paths['pstats']} and {profiler.paths['collapsed']}")
+    else:
+        run(args)
+
+
+def run(args):
+    """Load, filter and render labels as requested on the command line."""
     # Load configuration
     config = load_config(args.config)
     
@@ -115,14 +196,6 @@ def main():
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    # Load data from Excel
-    df = load_data_from_excel(args.input)
-    if df is None:
-        sys.exit(1)
-    
-    # Convert DataFrame to list of dictionaries
-    records = df.to_dict(orient='records')
-    
     # Apply filters
     filters = {}
     for filter_str in args.filter:
@@ -130,6 +203,25 @@ def main():
             key, value = filter_str.split('=', 1)
             filters[key] = value
     
+    if args.stream:
+        # Records flow lazily from the workbook into the renderer
+        records = iter_records_from_excel(args.input)
+        if filters:
+            records = (record for record in records if record_matches(record, filters))
+        if args.batch_size is not None:
+            records = itertools.islice(records, args.start_index, args.start_index + args.batch_size)
+        render_labels(records, args)
+        return
+    
+    # Load data from Excel
+    df = load_data_from_excel(args.input)
+    if df is None:
+        sys.exit(1)
+    
+    # Convert DataFrame to list of dictionaries
+    with metrics.timer("to_dict"):
+        records = df.to_dict(orient='records')
+    
     if filters:
         filtered_records = filter_data(records, filters)
         print(f"Filtered from {len(records)} to {len(filtered_records)} records")
@@ -142,7 +234,7 @@ def main():
         records = batched_records
     
     # Generate labels
-    generate_labels(records, args.output, config_file=args.config)
+    render_labels(records, args)
 
 
 if __name__ == "__main__":
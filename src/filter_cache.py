@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+LRU cache of filter results for uploaded workbooks.
+
+Generating, exporting and generating again with the same filters used to
+re-filter the sheet every time. The cache maps (workbook content hash,
+normalized filters) to the positions of the matching rows in the full sheet,
+so a repeat request only has to take those rows. Entries are small integer
+arrays, bounded both by count and by total size.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from filter_engine import normalize_token, split_filter_values
+
+
+def _token_set(filter_value):
+    # Include/exclude filters are sets of tokens: order and repeats don't change the result
+    if not filter_value:
+        return None
+    return tuple(sorted(set(split_filter_values(filter_value))))
+
+
+def normalize_filters(category_filter=None, category_exclude_filter=None, status_filter=None, status_exclude_filter=None, mail_zone_filter=None, publication_columns=None, filter_mode="OR"):
+    """
+    Reduce the load_data_from_excel filter arguments to a canonical, hashable tuple.
+
+    Filters that select the same rows normalize to the same tuple, e.g.
+    "C_col, C_acd" and "C_acd,C_col", "1.0" and "1", or an empty string and None.
+    """
+    if publication_columns and isinstance(publication_columns, list) and any(publication_columns):
+        publications = tuple(sorted(set(publication_columns)))
+    else:
+        publications = None
+
+    return (
+        _token_set(category_filter),
+        _token_set(category_exclude_filter),
+        _token_set(status_filter),
+        _token_set(status_exclude_filter),
+        normalize_token(mail_zone_filter) if mail_zone_filter else None,
+        publications,
+        # filter_engine treats anything other than "AND" as OR
+        "AND" if filter_mode == "AND" else "OR",
+    )
+
+
+class FilterCache:
+    """
+    Thread-safe LRU cache of matching row positions.
+
+    Args:
+        max_entries (int): Maximum number of cached filter results.
+        max_bytes (int): Maximum total size of the cached position arrays.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(content_hash, **filters):
+        """Cache key for a workbook's contents and load_data_from_excel filter arguments."""
+        return (content_hash,) + normalize_filters(**filters)
+
+    def get(self, key):
+        """Return the cached row positions for key, or None, updating the hit/miss counts."""
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return positions
+
+    def put(self, key, positions):
+        """
+        Cache the row positions for key, evicting least recently used entries as needed.
+
+        Args:
+            key (tuple): Key from make_key.
+            positions (array-like): Positions of the matching rows in the full sheet.
+        """
+        positions = np.asarray(positions)
+        if positions.size and positions.max() < np.iinfo(np.int32).max:
+            positions = positions.astype(np.int32)
+        positions.setflags(write=False)  # Shared between requests
+
+        if positions.nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = positions
+            self._bytes += positions.nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return entry count, size, limits and hit/miss counts as a dict."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
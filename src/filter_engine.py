@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized filter engine for the label data.
+
+The multi-value columns (category_ids, status_ids) hold comma-separated tokens
+such as "C_adm_sev,C_mgt_offr". Instead of splitting every row for every filter,
+each column is tokenized once into a membership table over its distinct values,
+and include/exclude filters become boolean NumPy operations over whole columns.
+
+Cells and filter values are compared as text. A whole number reads the same
+whether it was stored as 1 or 1.0, because pandas turns integer columns with
+gaps into floats while openpyxl returns the numbers as stored.
+"""
+
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+import memory_profile
+
+
+# A whole number written as a float, e.g. "1.0" or "-2.00"
+_WHOLE_FLOAT = re.compile(r"^(-?\d+)\.0+$")
+
+
+def normalize_token(token):
+    """Canonical text of a cell or filter token: stripped, with "1.0" read as "1"."""
+    token = token.strip()
+    match = _WHOLE_FLOAT.match(token)
+    return match.group(1) if match else token
+
+
+def cell_text(value):
+    """Text of a single cell as the filters compare it; empty cells read as "nan"."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "nan"
+    return str(value)
+
+
+def split_filter_values(filter_value):
+    """Split a comma-separated filter string into normalized tokens."""
+    return [normalize_token(token) for token in filter_value.split(',')]
+
+
+class MultiValueIndex:
+    """
+    Token membership index for one comma-separated multi-value column.
+
+    Rows are factorized to their distinct cell values, and each token maps to the
+    set of distinct values containing it. A token's row mask is then a single
+    fancy-indexing pass over the factor codes, memoized per token.
+    """
+
+    def __init__(self, series):
+        # Cells are compared as str(cell), matching the original per-row filters
+        # (so a missing cell reads as "nan"), with tokens normalized so that 1.0
+        # reads as "1". Mixed object columns are stringified first because
+        # factorize treats 1 and "1" as different values but 1 and 1.0 as equal.
+        if series.dtype == object:
+            series = series.map(str)
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        self._codes = codes
+        self._num_values = len(uniques)
+
+        token_values = {}
+        for value_index, value in enumerate(uniques):
+            for token in str(value).split(','):
+                token_values.setdefault(normalize_token(token), []).append(value_index)
+        self._token_values = {
+            token: np.asarray(indices, dtype=np.intp) for token, indices in token_values.items()
+        }
+        self._token_masks = {}
+
+    def __len__(self):
+        return len(self._codes)
+
+    def token_mask(self, token):
+        """Return a boolean row mask of rows whose cell contains the token."""
+        mask = self._token_masks.get(token)
+        if mask is None:
+            member = np.zeros(self._num_values, dtype=bool)
+            value_indices = self._token_values.get(token)
+            if value_indices is not None:
+                member[value_indices] = True
+            mask = member[self._codes]
+            self._token_masks[token] = mask
+        return mask
+
+    def any_of(self, tokens):
+        """Rows containing at least one of the tokens."""
+        mask = np.zeros(len(self), dtype=bool)
+        for token in tokens:
+            mask |= self.token_mask(token)
+        return mask
+
+    def all_of(self, tokens):
+        """Rows containing every one of the tokens."""
+        mask = np.ones(len(self), dtype=bool)
+        for token in tokens:
+            mask &= self.token_mask(token)
+        return mask
+
+    def match(self, filter_value, filter_mode="OR"):
+        """Rows matching a comma-separated filter string in OR or AND mode."""
+        tokens = split_filter_values(filter_value)
+        if filter_mode == "AND":
+            return self.all_of(tokens)
+        return self.any_of(tokens)
+
+
+def subscription_mask(df, publication_columns):
+    """
+    Rows subscribed to any of the publication columns.
+
+    Following the CPRO guideline, a positive integer (>= 1) in a publication column
+    means a subscription; empty cells, 0 and non-numeric text do not.
+    """
+    mask = np.zeros(len(df), dtype=bool)
+    for column in publication_columns:
+        values = pd.to_numeric(df[column], errors='coerce')
+        mask |= (values >= 1).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def filter_mask(df, category_filter=None, category_exclude_filter=None, status_filter=None, status_exclude_filter=None, mail_zone_filter=None, publication_columns=None, filter_mode="OR"):
+    """
+    Build the boolean row mask for the label filters.
+
+    Takes the same filter arguments as simple_labels.load_data_from_excel and keeps
+    its semantics: each filter narrows the rows, filters on missing columns are
+    skipped with a warning, and publication columns that are all missing match no rows.
+
+    Returns:
+        numpy.ndarray: Boolean mask with one entry per row of df.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    indexes = {}
+
+    def index_for(column):
+        if column not in indexes:
+            indexes[column] = MultiValueIndex(df[column])
+        return indexes[column]
+
+    if category_filter:
+        with memory_profile.stage("filter_category"):
+            if 'category_ids' in df.columns:
+                mask &= index_for('category_ids').match(category_filter, filter_mode)
+            else:
+                print("Warning: 'category_ids' column not found in Excel sheet. Category filter not applied.")
+
+    if category_exclude_filter:
+        with memory_profile.stage("filter_category_exclude"):
+            if 'category_ids' in df.columns:
+                mask &= ~index_for('category_ids').any_of(split_filter_values(category_exclude_filter))
+            else:
+                print("Warning: 'category_ids' column not found in Excel sheet. Category exclusion filter not applied.")
+
+    if status_filter:
+        with memory_profile.stage("filter_status"):
+            if 'status_ids' in df.columns:
+                mask &= index_for('status_ids').match(status_filter, filter_mode)
+            else:
+                print("Warning: 'status_ids' column not found in Excel sheet. Status filter not applied.")
+
+    if status_exclude_filter:
+        with memory_profile.stage("filter_status_exclude"):
+            if 'status_ids' in df.columns:
+                mask &= ~index_for('status_ids').any_of(split_filter_values(status_exclude_filter))
+            else:
+                print("Warning: 'status_ids' column not found in Excel sheet. Status exclusion filter not applied.")
+
+    if mail_zone_filter:
+        with memory_profile.stage("filter_mail_zone"):
+            if 'MAIL_ZONE' in df.columns:
+                # MAIL_ZONE is usually stored as a number in Excel but the filter is a string
+                zones = df['MAIL_ZONE'].astype(str).str.strip().str.replace(_WHOLE_FLOAT, r"\1", regex=True)
+                mask &= (zones == normalize_token(mail_zone_filter)).to_numpy(dtype=bool, na_value=False)
+            else:
+                print("Warning: 'MAIL_ZONE' column not found in Excel sheet. Mail zone filter not applied.")
+
+    if publication_columns and isinstance(publication_columns, list) and any(publication_columns):
+        with memory_profile.stage("filter_publication"):
+            valid_publication_columns = [col for col in publication_columns if col in df.columns]
+            if valid_publication_columns:
+                mask &= subscription_mask(df, valid_publication_columns)
+            else:
+                print(f"Warning: None of the specified publication columns {publication_columns} found in the Excel sheet. Returning no data for this filter.")
+                mask[:] = False
+
+    return mask
+
+
+def _cell_tokens(value):
+    # Same comparison as the column filters
+    return split_filter_values(cell_text(value))
+
+
+def _is_subscribed(value):
+    number = pd.to_numeric(value, errors='coerce')
+    return pd.notna(number) and number >= 1
+
+
+def row_predicate(columns, category_filter=None, category_exclude_filter=None, status_filter=None, status_exclude_filter=None, mail_zone_filter=None, publication_columns=None, filter_mode="OR"):
+    """
+    Compile the label filters into a predicate over single records.
+
+    This is the row-at-a-time counterpart of filter_mask, used when records are
+    streamed from the workbook instead of loaded into a DataFrame, and selects
+    the same rows.
+
+    Args:
+        columns (list): Column names present in the sheet.
+        Remaining arguments are the filters accepted by filter_mask.
+
+    Returns:
+        callable: Function taking a record dict and returning True to keep it.
+    """
+    checks = []
+    combine = all if filter_mode == "AND" else any
+
+    if category_filter:
+        if 'category_ids' in columns:
+            wanted = split_filter_values(category_filter)
+            checks.append(lambda r: combine(t in _cell_tokens(r.get('category_ids')) for t in wanted))
+        else:
+            print("Warning: 'category_ids' column not found in Excel sheet. Category filter not applied.")
+
+    if category_exclude_filter:
+        if 'category_ids' in columns:
+            unwanted = split_filter_values(category_exclude_filter)
+            checks.append(lambda r: not any(t in _cell_tokens(r.get('category_ids')) for t in unwanted))
+        else:
+            print("Warning: 'category_ids' column not found in Excel sheet. Category exclusion filter not applied.")
+
+    if status_filter:
+        if 'status_ids' in columns:
+            wanted_statuses = split_filter_values(status_filter)
+            checks.append(lambda r: combine(t in _cell_tokens(r.get('status_ids')) for t in wanted_statuses))
+        else:
+            print("Warning: 'status_ids' column not found in Excel sheet. Status filter not applied.")
+
+    if status_exclude_filter:
+        if 'status_ids' in columns:
+            unwanted_statuses = split_filter_values(status_exclude_filter)
+            checks.append(lambda r: not any(t in _cell_tokens(r.get('status_ids')) for t in unwanted_statuses))
+        else:
+            print("Warning: 'status_ids' column not found in Excel sheet. Status exclusion filter not applied.")
+
+    if mail_zone_filter:
+        if 'MAIL_ZONE' in columns:
+            wanted_zone = normalize_token(mail_zone_filter)
+            checks.append(lambda r: normalize_token(cell_text(r.get('MAIL_ZONE'))) == wanted_zone)
+        else:
+            print("Warning: 'MAIL_ZONE' column not found in Excel sheet. Mail zone filter not applied.")
+
+    if publication_columns and isinstance(publication_columns, list) and any(publication_columns):
+        valid_publication_columns = [col for col in publication_columns if col in columns]
+        if valid_publication_columns:
+            checks.append(lambda r: any(_is_subscribed(r.get(col)) for col in valid_publication_columns))
+        else:
+            print(f"Warning: None of the specified publication columns {publication_columns} found in the Excel sheet. Returning no data for this filter.")
+            return lambda r: False
+
+    return lambda r: all(check(r) for check in checks)
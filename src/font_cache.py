@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persistent cache of parsed TrueType fonts.
+
+Constructing a ReportLab TTFont parses every table of the font file, which
+for a multi-megabyte CJK font such as SimSun takes a noticeable part of the
+first label job in each process. The parsed face (metrics, cmap, glyph
+offsets and the raw font bytes needed for subsetting) is pickled once into a
+file next to the TTF, named after the SHA-256 of the font, and later
+processes restore the TTFont from that file instead of re-parsing it.
+"""
+
+import os
+import pickle
+import tempfile
+from fnmatch import fnmatch
+from weakref import WeakKeyDictionary
+
+import reportlab
+from reportlab import rl_config
+from reportlab.pdfbase.ttfonts import TTFont, TTFontFace, TTEncoding, unShapedFontGlob
+
+from ingest_cache import file_sha256
+
+
+# Bump when the serialized layout changes so stale cache files are ignored
+CACHE_FORMAT_VERSION = 1
+
+CACHE_SUFFIX = ".fontcache"
+
+# Face attributes that cannot be pickled and are rebuilt on load
+_REBUILT_FACE_ATTRIBUTES = ("_pdfScale",)
+
+
+def cache_path_for(font_path):
+    """
+    Return the cache file path for a font: <font>.<hash prefix>.fontcache next to it.
+
+    Args:
+        font_path (str): Path to the TTF file.
+
+    Returns:
+        str: Path of the serialized cache file.
+    """
+    digest = file_sha256(font_path)
+    return f"{font_path}.{digest[:16]}{CACHE_SUFFIX}"
+
+
+def _pdf_scale(units_per_em):
+    # Same scaling TTFontFile.extractInfo sets up: glyph units to 1/1000 em
+    if units_per_em == 1000:
+        return lambda x: x
+    mult = 1000 / units_per_em
+    return lambda x: x * mult
+
+
+def _face_state(face):
+    return {k: v for k, v in vars(face).items() if k not in _REBUILT_FACE_ATTRIBUTES}
+
+
+def _restore_font(font_name, face_state):
+    """Rebuild a TTFont from a pickled face state, mirroring TTFont.__init__."""
+    face = TTFontFace.__new__(TTFontFace)
+    face.__dict__.update(face_state)
+    face._pdfScale = _pdf_scale(face.unitsPerEm)
+
+    font = TTFont.__new__(TTFont)
+    font.fontName = font_name
+    font.face = face
+    font.encoding = TTEncoding()
+    font.state = WeakKeyDictionary()
+    font._asciiReadable = rl_config.ttfAsciiReadable
+    font.shapable = not any(fnmatch(font_name, pattern) for pattern in unShapedFontGlob)
+    return font
+
+
+def _read_cache(cache_path, font_path):
+    with open(cache_path, 'rb') as f:
+        payload = pickle.load(f)
+    if (payload.get("format") != CACHE_FORMAT_VERSION
+            or payload.get("reportlab") != reportlab.Version
+            or payload.get("digest") != file_sha256(font_path)):
+        return None
+    return payload["face"]
+
+
+def _write_cache(cache_path, font_path, face):
+    payload = {
+        "format": CACHE_FORMAT_VERSION,
+        "reportlab": reportlab.Version,
+        "digest": file_sha256(font_path),
+        "face": _face_state(face),
+    }
+    # Write to a temp file and rename so concurrent workers never read a partial file
+    fd, tmp_path = tempfile.mkstemp(suffix=CACHE_SUFFIX + '.tmp', dir=os.path.dirname(os.path.abspath(cache_path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def _remove_stale_caches(font_path, keep_path):
+    # Cache files for earlier versions of the same font are named with their old hash
+    directory = os.path.dirname(os.path.abspath(font_path))
+    prefix = os.path.basename(font_path) + "."
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        if entry.startswith(prefix) and entry.endswith(CACHE_SUFFIX) and path != os.path.abspath(keep_path):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def load_ttfont(font_name, font_path):
+    """
+    Load a TrueType font through the persistent cache.
+
+    On a hit the parsed face is unpickled; on a miss (or if the cache file is
+    unreadable or was written by another ReportLab version) the font is parsed
+    normally and the cache file is (re)written. A read-only font directory just
+    means every load parses the font.
+
+    Args:
+        font_name (str): Name to register the font under.
+        font_path (str): Path to the TTF file.
+
+    Returns:
+        TTFont: The font, ready for pdfmetrics.registerFont.
+    """
+    cache_path = cache_path_for(font_path)
+    if os.path.exists(cache_path):
+        try:
+            face_state = _read_cache(cache_path, font_path)
+            if face_state is not None:
+                return _restore_font(font_name, face_state)
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable font cache {cache_path}: {e}")
+
+    font = TTFont(font_name, font_path)
+    try:
+        _write_cache(cache_path, font_path, font.face)
+        _remove_stale_caches(font_path, cache_path)
+    except Exception as e:
+        print(f"Warning: Could not write font cache for {font_path}: {e}")
+    return font
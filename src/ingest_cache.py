@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Content-addressed columnar cache for uploaded Excel workbooks.
+
+Parsing a large workbook with openpyxl takes seconds, so each distinct
+upload is converted once into a Parquet file named after the SHA-256 of
+the workbook bytes. Later loads read the Parquet file instead.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# (path, size, mtime_ns) -> digest, so repeated loads of an unchanged file skip re-hashing
+_digest_memo = {}
+
+
+def file_sha256(file_path):
+    """
+    Return the hex SHA-256 digest of a file, reading it in chunks.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    digest = _digest_memo.get(memo_key)
+    if digest is not None:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    _digest_memo[memo_key] = digest
+    return digest
+
+
+def record_sha256(file_path, digest):
+    """
+    Remember a digest computed elsewhere (e.g. while the file was being written),
+    so file_sha256 does not read the file again.
+
+    Args:
+        file_path (str): Path to the file, in its final location.
+        digest (str): Hex SHA-256 of its contents.
+    """
+    stat = os.stat(file_path)
+    _digest_memo[(os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)] = digest
+
+
+# Bumped whenever the stored layout changes, so entries in an older layout are never read
+CACHE_FORMAT = 3
+
+# Side column holding the original value types of a mixed-type column
+TYPE_COLUMN_PREFIX = "__ingest_type__"
+
+# Parquet metadata key mapping stored names of non-string headers to their type tags
+HEADER_TYPES_KEY = b"ingest_header_types"
+
+
+def _cache_file(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}.v{CACHE_FORMAT}.parquet")
+
+
+def _ref_file(cache_dir, excel_file_path):
+    # Records which digest a given upload name currently points at, so the entry
+    # can be dropped when that upload is replaced or cleaned up.
+    return os.path.join(cache_dir, f"{os.path.basename(excel_file_path)}.ref")
+
+
+# Type tag -> (encode to str, decode from str) for values of mixed-type columns
+_CODECS = {
+    "str": (str, str),
+    "int": (str, int),
+    "float": (repr, float),
+    "bool": (str, lambda text: text == "True"),
+    "timestamp": (lambda value: value.isoformat(), pd.Timestamp),
+    "datetime": (lambda value: value.isoformat(), datetime.datetime.fromisoformat),
+    "date": (lambda value: value.isoformat(), datetime.date.fromisoformat),
+    "time": (lambda value: value.isoformat(), datetime.time.fromisoformat),
+    "timedelta": (lambda value: str(value // datetime.timedelta(microseconds=1)),
+                  lambda text: datetime.timedelta(microseconds=int(text))),
+}
+
+_TAGS = {
+    str: "str", int: "int", float: "float", bool: "bool", pd.Timestamp: "timestamp",
+    datetime.datetime: "datetime", datetime.date: "date", datetime.time: "time", datetime.timedelta: "timedelta",
+}
+
+
+def _type_tag(value):
+    tag = _TAGS.get(type(value))
+    if tag is not None:
+        return tag
+    # numpy scalars, e.g. from a DataFrame built in code rather than read from Excel
+    if isinstance(value, np.bool_):
+        return "bool"
+    if isinstance(value, np.integer):
+        return "int"
+    if isinstance(value, np.floating):
+        return "float"
+    raise TypeError(f"values of type {type(value).__name__} cannot be cached")
+
+
+def _prepare_for_parquet(df):
+    """
+    Make object columns with mixed value types Parquet-safe without losing their types.
+
+    Excel columns such as status_ids mix ints (1) and strings ("1,8"). Such a
+    column is stored as the string form of each value, plus a side column
+    tagging each value's original type, so _restore_types returns exactly what
+    the workbook held. Missing values stay missing.
+
+    Parquet also requires string column names, so a header such as 2024 is
+    stored as "2024" and its type tag goes into the file's metadata.
+
+    Returns:
+        tuple: (DataFrame ready for Parquet, dict of stored header name -> type tag)
+    """
+    header_types = {}
+    names = []
+    for column in df.columns:
+        if isinstance(column, str):
+            names.append(column)
+        else:
+            tag = _type_tag(column)
+            names.append(_CODECS[tag][0](column))
+            header_types[names[-1]] = tag
+
+    df = df.copy()
+    df.columns = names
+    for column in names:
+        series = df[column]
+        if series.dtype != object:
+            continue
+        non_null = series.dropna()
+        if non_null.map(type).nunique() <= 1:
+            continue
+        tags = non_null.map(_type_tag)
+        encoded = pd.Series([None] * len(series), index=series.index, dtype=object)
+        for tag, values in non_null.groupby(tags):
+            encoded[values.index] = values.map(_CODECS[tag][0])
+        df[column] = encoded
+        df[f"{TYPE_COLUMN_PREFIX}{column}"] = tags.reindex(series.index).astype(object)
+    return df, header_types
+
+
+def _header_types(cache_path):
+    metadata = pq.read_schema(cache_path).metadata or {}
+    return json.loads(metadata.get(HEADER_TYPES_KEY, b"{}"))
+
+
+def _original_header(name, header_types):
+    tag = header_types.get(name)
+    return name if tag is None else _CODECS[tag][1](name)
+
+
+def _restore_types(df, header_types, stored_names=None):
+    """
+    Turn columns stored by _prepare_for_parquet back into their original values and
+    headers, and drop the tags.
+
+    stored_names lists every data column in the file, so the headers of a column
+    subset get the index type pandas gives the full set (e.g. object, not float,
+    for [2024, 2025.5] out of ["NAME1", 2024, 2025.5]).
+    """
+    tag_columns = [c for c in df.columns if c.startswith(TYPE_COLUMN_PREFIX)]
+    for tag_column in tag_columns:
+        column = tag_column[len(TYPE_COLUMN_PREFIX):]
+        if column not in df.columns:
+            continue
+        tags = df[tag_column]
+        restored = pd.Series([np.nan] * len(df), index=df.index, dtype=object)
+        for tag, texts in df[column][tags.notna()].groupby(tags[tags.notna()]):
+            restored[texts.index] = texts.map(_CODECS[tag][1])
+        df[column] = restored
+    df = df.drop(columns=tag_columns)
+    if header_types:
+        stored_names = list(stored_names if stored_names is not None else df.columns)
+        headers = pd.Index([_original_header(name, header_types) for name in stored_names])
+        df.columns = headers[[stored_names.index(name) for name in df.columns]]
+    return df
+
+
+def _write_parquet(df, path):
+    prepared, header_types = _prepare_for_parquet(df)
+    table = pa.Table.from_pandas(prepared, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[HEADER_TYPES_KEY] = json.dumps(header_types).encode("utf-8")
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def store(excel_file_path, df, cache_dir):
+    """
+    Store an already-parsed DataFrame as the cache entry for a workbook.
+
+    Args:
+        excel_file_path (str): Path to the source workbook.
+        df (pandas.DataFrame): DataFrame parsed from that workbook. Only used when
+            there is no entry for the workbook's contents yet.
+        cache_dir (str): Directory holding cache entries.
+
+    Returns:
+        str: SHA-256 digest of the workbook, or None if caching is unavailable.
+    """
+    if not PARQUET_AVAILABLE:
+        return None
+
+    digest = file_sha256(excel_file_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = _cache_file(cache_dir, digest)
+
+    try:
+        if not os.path.exists(cache_path):
+            # Write to a temp file and rename so concurrent workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(suffix='.parquet.tmp', dir=cache_dir)
+            os.close(fd)
+            try:
+                _write_parquet(df, tmp_path)
+                os.replace(tmp_path, cache_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+        with open(_ref_file(cache_dir, excel_file_path), 'w', encoding='utf-8') as f:
+            f.write(digest)
+    except Exception as e:
+        print(f"Warning: Could not write ingest cache for {excel_file_path}: {e}")
+        return None
+
+    return digest
+
+
+def _project(df, columns):
+    if columns is None:
+        return df
+    return df[[c for c in df.columns if c in columns]]
+
+
+def read_excel_cached(excel_file_path, cache_dir, columns=None):
+    """
+    Read a workbook through the ingest cache.
+
+    On a cache hit the Parquet copy is returned; on a miss the workbook is parsed
+    with pandas.read_excel and the result is stored for later calls.
+
+    Args:
+        excel_file_path (str): Path to the source workbook.
+        cache_dir (str): Directory holding cache entries.
+        columns (collection, optional): Only return these columns. Names missing
+            from the sheet are ignored. On a cache hit only these columns are read.
+
+    Returns:
+        pandas.DataFrame: The workbook's first sheet.
+    """
+    if not PARQUET_AVAILABLE:
+        return _project(pd.read_excel(excel_file_path), columns)
+
+    cache_path = _cache_file(cache_dir, file_sha256(excel_file_path))
+    if os.path.exists(cache_path):
+        try:
+            header_types = _header_types(cache_path)
+            if columns is None:
+                return _restore_types(pd.read_parquet(cache_path), header_types)
+            available = pq.read_schema(cache_path).names
+            stored_names = [c for c in available if not c.startswith(TYPE_COLUMN_PREFIX)]
+            wanted = [c for c in available if _original_header(c, header_types) in columns or
+                      (c.startswith(TYPE_COLUMN_PREFIX) and
+                       _original_header(c[len(TYPE_COLUMN_PREFIX):], header_types) in columns)]
+            return _restore_types(pd.read_parquet(cache_path, columns=wanted), header_types, stored_names)
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable ingest cache entry {cache_path}: {e}")
+
+    # The cache always holds the full sheet so exports can use it too
+    df = pd.read_excel(excel_file_path)
+    store(excel_file_path, df, cache_dir)
+    return _project(df, columns)
+
+
+def warm(excel_file_path, cache_dir):
+    """
+    Make sure a workbook has a cache entry, parsing it only if its contents are new.
+
+    Args:
+        excel_file_path (str): Path to the source workbook.
+        cache_dir (str): Directory holding cache entries.
+
+    Returns:
+        str: SHA-256 digest of the workbook, or None if caching is unavailable.
+    """
+    if not PARQUET_AVAILABLE:
+        return None
+    if os.path.exists(_cache_file(cache_dir, file_sha256(excel_file_path))):
+        # Same contents as an earlier upload: store only records the reference
+        return store(excel_file_path, None, cache_dir)
+    return store(excel_file_path, pd.read_excel(excel_file_path), cache_dir)
+
+
+def _read_ref(ref_path):
+    with open(ref_path, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def invalidate(excel_file_path, cache_dir):
+    """
+    Drop a workbook that is being replaced or removed from the cache.
+
+    Entries are shared by uploads with identical contents, so the entry itself
+    is only deleted once no other upload name refers to it.
+
+    Args:
+        excel_file_path (str): Path to the source workbook.
+        cache_dir (str): Directory holding cache entries.
+    """
+    ref_path = _ref_file(cache_dir, excel_file_path)
+    if not os.path.exists(ref_path):
+        return
+
+    try:
+        digest = _read_ref(ref_path)
+        os.unlink(ref_path)
+        if not digest:
+            return
+        for name in os.listdir(cache_dir):
+            if name.endswith('.ref'):
+                try:
+                    if _read_ref(os.path.join(cache_dir, name)) == digest:
+                        return
+                except OSError:
+                    continue  # Removed meanwhile
+        cache_path = _cache_file(cache_dir, digest)
+        if os.path.exists(cache_path):
+            os.unlink(cache_path)
+    except OSError as e:
+        print(f"Warning: Could not invalidate ingest cache for {excel_file_path}: {e}")
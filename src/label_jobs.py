@@ -0,0 +1,577 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Label pipeline steps and background jobs for the web application.
+
+The module-level pipeline functions take and return only plain, picklable
+values, so the web app can run them on a thread or process executor instead of
+on its event loop.
+
+A job runs the same load, filter and render pipeline as /generate, but in a
+bounded pool of worker processes instead of inside the request. Job state and
+progress live in a small SQLite database next to the uploads, so any web worker
+process can answer status queries for a job started by another one.
+"""
+
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+
+import openpyxl
+import pandas as pd
+
+import ingest_cache
+import memory_profile
+import metrics
+import render_cache
+from filter_cache import FilterCache, normalize_filters
+from simple_labels import load_data_from_excel, iter_records_from_excel, generate_labels, load_config, required_columns, resolve_config
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Minimum seconds between progress writes from a running job
+PROGRESS_INTERVAL = 0.5
+
+NO_DATA_MESSAGE = "No data found or data could not be loaded"
+
+# Filter results shared by the requests this process runs (see filter_cache)
+FILTER_CACHE_ENTRIES = int(os.environ.get('LABEL_FILTER_CACHE_ENTRIES', 128))
+FILTER_CACHE_MB = int(os.environ.get('LABEL_FILTER_CACHE_MB', 64))
+filter_cache = FilterCache(max_entries=FILTER_CACHE_ENTRIES, max_bytes=FILTER_CACHE_MB * 1024 * 1024)
+
+# Size of the upload preview
+PREVIEW_ROWS = 3
+PREVIEW_COLUMNS = 10
+
+
+def preview_upload(file_path):
+    """
+    Summarize an uploaded workbook from a bounded read.
+
+    Only the header and the first PREVIEW_ROWS rows are parsed. For .xlsx files the
+    row count comes from the sheet's dimension metadata, so the cost does not grow
+    with the size of the workbook; legacy .xls files are parsed in full.
+
+    Args:
+        file_path (str): Path to the uploaded workbook.
+
+    Returns:
+        dict: "rows" (data rows), "columns" (first PREVIEW_COLUMNS) and "sample_data"
+        (first PREVIEW_ROWS rows as dicts).
+    """
+    if not file_path.lower().endswith('.xlsx'):
+        df = pd.read_excel(file_path)
+        return {
+            # Count only non-empty rows (rows that have at least one non-null value)
+            "rows": df.dropna(how='all').shape[0],
+            "columns": list(df.columns[:PREVIEW_COLUMNS]),
+            "sample_data": df.head(PREVIEW_ROWS).to_dict(orient='records'),
+        }
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(max_row=PREVIEW_ROWS + 1, values_only=True)
+        header = next(rows, ())
+        # Name blank headers the way pandas does
+        columns = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        sample_data = [dict(zip(columns, row)) for row in rows if any(value is not None for value in row)]
+
+        if sheet.max_row is not None:
+            # The dimension covers the header row too
+            row_count = max(sheet.max_row - 1, 0)
+        else:
+            # Workbook written without a dimension record: count rows in one streaming pass
+            row_count = sum(1 for row in sheet.iter_rows(min_row=2, values_only=True)
+                            if any(value is not None for value in row))
+    finally:
+        workbook.close()
+
+    return {
+        "rows": row_count,
+        "columns": columns[:PREVIEW_COLUMNS],
+        "sample_data": sample_data,
+    }
+
+
+def _apply_batch(df, config_dict):
+    # Apply batch processing if specified
+    if config_dict.get('batch_size'):
+        start_idx = config_dict.get('start_index', 0)
+        end_idx = start_idx + config_dict['batch_size']
+        return df.iloc[start_idx:end_idx]
+    if config_dict.get('limit'):
+        return df.head(config_dict['limit'])
+    return df
+
+
+def export_filtered_upload(file_path, config_dict, output_path, cache_dir=None):
+    """
+    Write the filtered rows of an uploaded workbook to a new Excel file.
+
+    Args:
+        file_path (str): Path to the uploaded workbook.
+        config_dict (dict): Request options, as in LabelConfig.
+        output_path (str or file-like): Path of the .xlsx file to write, or a binary stream.
+        cache_dir (str, optional): Ingest cache directory.
+
+    Returns:
+        int: Number of rows exported. 0 means no rows matched and nothing was written.
+    """
+    df = load_data_from_excel(file_path, cache_dir=cache_dir, filter_cache=filter_cache,
+                              **_filter_kwargs(config_dict))
+
+    if df is None or df.empty:
+        return 0
+
+    df = _apply_batch(df, config_dict)
+    df.to_excel(output_path, index=False, engine='openpyxl')
+    return len(df)
+
+
+def export_filtered_bytes(file_path, config_dict, cache_dir=None):
+    """
+    Export the filtered rows of an uploaded workbook in memory.
+
+    Returns:
+        bytes: The .xlsx file, or None if no rows matched.
+    """
+    buffer = io.BytesIO()
+    if export_filtered_upload(file_path, config_dict, buffer, cache_dir=cache_dir) == 0:
+        return None
+    return buffer.getvalue()
+
+
+def _config_overrides(config_dict):
+    # Prepare config overrides for publication codes display
+    temp_config_overrides = {}
+
+    # If publication_columns are specified, use them for display on labels
+    if config_dict.get('publication_columns'):
+        # The publication_columns from the request are the same as what should be displayed
+        # For example, if filtering by ["BE"], display "BE" codes on labels
+        temp_config_overrides['display_publication_codes_on_label'] = config_dict['publication_columns']
+    return temp_config_overrides
+
+
+def _filter_kwargs(config_dict):
+    return dict(
+        category_filter=config_dict.get('category_filter'),
+        category_exclude_filter=config_dict.get('category_exclude_filter'),
+        status_filter=config_dict.get('status_filter'),
+        status_exclude_filter=config_dict.get('status_exclude_filter'),
+        mail_zone_filter=config_dict.get('mail_zone_filter'),
+        publication_columns=config_dict.get('publication_columns'),
+        filter_mode=config_dict.get('filter_mode', 'OR'),
+    )
+
+
+def render_cache_key(content_hash, config_dict, config_path):
+    """
+    Render cache key (and ETag) for rendering an upload with the given request options.
+
+    Args:
+        content_hash (str): SHA-256 of the uploaded workbook.
+        config_dict (dict): Request options, as in LabelConfig.
+        config_path (str): Path to the label configuration file.
+
+    Returns:
+        str: Key from render_cache.make_key.
+    """
+    if config_dict.get('batch_size'):
+        window = ("batch", config_dict.get('start_index', 0), config_dict['batch_size'])
+    elif config_dict.get('limit'):
+        window = ("limit", config_dict['limit'])
+    else:
+        window = None
+
+    return render_cache.make_key(
+        content_hash=content_hash,
+        filters=normalize_filters(**_filter_kwargs(config_dict)),
+        window=window,
+        # Streaming compares cells as stored rather than as pandas reads them
+        streaming=bool(config_dict.get('streaming')),
+        config=resolve_config(config_path, _config_overrides(config_dict)),
+    )
+
+
+def render_labels_from_upload(file_path, config_dict, output_path, config_path, cache_dir=None, progress_callback=None):
+    """
+    Load, filter and render an uploaded workbook the way the web API does.
+
+    Args:
+        file_path (str): Path to the uploaded workbook.
+        config_dict (dict): Request options (filters, publication_columns, limit,
+            start_index, batch_size, streaming), as in LabelConfig.
+        output_path (str or file-like): Path of the PDF to write, or a binary stream.
+        config_path (str): Path to the label configuration file.
+        cache_dir (str, optional): Ingest cache directory.
+        progress_callback (callable, optional): Called with (labels_done, labels_total)
+            as pages are finished. labels_total is None when streaming.
+
+    Returns:
+        int: Number of labels generated. 0 means no rows matched; in the non-streaming
+        case no PDF is written at all.
+    """
+    temp_config_overrides = _config_overrides(config_dict)
+
+    # Only read the columns the filters and the label layout actually use
+    effective_config = load_config(config_path)
+    effective_config.update(temp_config_overrides)
+    columns = required_columns(effective_config, config_dict.get('publication_columns'))
+
+    filter_kwargs = _filter_kwargs(config_dict)
+
+    if config_dict.get('streaming'):
+        # Stream filtered rows straight from the workbook into the renderer
+        records = iter_records_from_excel(file_path, columns=columns, **filter_kwargs)
+        labels_total = None
+
+        # Apply batch processing if specified
+        if config_dict.get('batch_size'):
+            start_idx = config_dict.get('start_index', 0)
+            records = itertools.islice(records, start_idx, start_idx + config_dict['batch_size'])
+        elif config_dict.get('limit'):
+            records = itertools.islice(records, config_dict['limit'])
+    else:
+        df = load_data_from_excel(file_path, cache_dir=cache_dir, columns=columns, filter_cache=filter_cache,
+                                  **filter_kwargs)
+
+        if df is None or df.empty:
+            return 0
+
+        df = _apply_batch(df, config_dict)
+
+        # Convert to records
+        with metrics.timer("to_dict"):
+            records = df.to_dict(orient='records')
+        labels_total = len(records)
+
+    page_callback = None
+    if progress_callback:
+        page_callback = lambda labels_done: progress_callback(labels_done, labels_total)
+
+    return generate_labels(records, output_path, config_file=config_path,
+                           temp_config_overrides=temp_config_overrides, progress_callback=page_callback)
+
+
+def render_labels_bytes(file_path, config_dict, config_path, cache_dir=None):
+    """
+    Render an uploaded workbook to a PDF in memory, as render_labels_from_upload does.
+
+    The result is returned rather than written to a caller's stream, so this also
+    works across a process pool.
+
+    Returns:
+        bytes: The PDF, or None if no rows matched.
+    """
+    buffer = io.BytesIO()
+    if render_labels_from_upload(file_path, config_dict, buffer, config_path, cache_dir=cache_dir) == 0:
+        return None
+    return buffer.getvalue()
+
+
+class JobStore:
+    """
+    SQLite-backed job records shared by all web worker processes.
+
+    Each call opens its own short-lived connection, so the store can be used from
+    the event loop, executor threads and job processes alike.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            # WAL lets status reads proceed while a job process writes progress
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    labels_done INTEGER NOT NULL DEFAULT 0,
+                    labels_total INTEGER,
+                    label_count INTEGER,
+                    result_path TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    memory_report TEXT
+                )
+            """)
+            # Databases created before memory reports were recorded lack the column
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "memory_report" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN memory_report TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state_created ON jobs (state, created_at)")
+            # One row per render cache key some worker is currently rendering
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS render_claims (
+                    cache_key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    claimed_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _execute(self, sql, params=()):
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(sql, params).rowcount
+
+    def create(self, filename, params):
+        """
+        Record a new queued job.
+
+        Args:
+            filename (str): Uploaded file the job renders.
+            params (dict): Request options for render_labels_from_upload.
+
+        Returns:
+            str: The new job id.
+        """
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, filename, params, state, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, filename, json.dumps(params), JOB_QUEUED, time.time()),
+        )
+        return job_id
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if there is no such job."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        if job["memory_report"] is not None:
+            job["memory_report"] = json.loads(job["memory_report"])
+        return job
+
+    def mark_running(self, job_id):
+        self._execute("UPDATE jobs SET state = ?, started_at = ? WHERE id = ?", (JOB_RUNNING, time.time(), job_id))
+
+    def update_progress(self, job_id, labels_done, labels_total=None):
+        self._execute("UPDATE jobs SET labels_done = ?, labels_total = ? WHERE id = ?", (labels_done, labels_total, job_id))
+
+    def mark_done(self, job_id, result_path, label_count):
+        self._execute(
+            "UPDATE jobs SET state = ?, result_path = ?, label_count = ?, labels_done = ?, finished_at = ? WHERE id = ?",
+            (JOB_DONE, result_path, label_count, label_count, time.time(), job_id),
+        )
+
+    def set_memory_report(self, job_id, report):
+        self._execute("UPDATE jobs SET memory_report = ? WHERE id = ?", (json.dumps(report), job_id))
+
+    def mark_failed(self, job_id, error):
+        # Only unfinished jobs can fail, so a late error report never overwrites a result
+        self._execute(
+            "UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE id = ? AND state IN (?, ?)",
+            (JOB_FAILED, error, time.time(), job_id, JOB_QUEUED, JOB_RUNNING),
+        )
+
+    def count(self, state):
+        """Return the number of jobs in the given state."""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (state,)).fetchone()[0]
+
+    def claim_render(self, cache_key, owner, lease):
+        """
+        Claim the render of a cache key, so other workers wait for it instead of rendering it too.
+
+        Args:
+            cache_key (str): Render cache key about to be rendered.
+            owner (str): Identifies the claiming worker.
+            lease (float): Seconds after which a claim is considered abandoned
+                (its worker died) and can be taken over.
+
+        Returns:
+            bool: True if the caller now holds the claim.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM render_claims WHERE cache_key = ? AND claimed_at < ?", (cache_key, now - lease))
+            return conn.execute(
+                "INSERT OR IGNORE INTO render_claims (cache_key, owner, claimed_at) VALUES (?, ?, ?)",
+                (cache_key, owner, now),
+            ).rowcount > 0
+
+    def render_claimed(self, cache_key, lease):
+        """
+        Return True while some worker holds a live claim on cache_key.
+
+        Claims older than lease seconds were abandoned (their worker died) and
+        don't count, so waiters stop waiting and can take the render over.
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT 1 FROM render_claims WHERE cache_key = ? AND claimed_at >= ?",
+                (cache_key, time.time() - lease),
+            ).fetchone() is not None
+
+    def release_render(self, cache_key, owner):
+        self._execute("DELETE FROM render_claims WHERE cache_key = ? AND owner = ?", (cache_key, owner))
+
+    def expire(self, max_age):
+        """
+        Delete finished jobs (and their PDFs) that finished more than max_age seconds ago.
+
+        Returns:
+            int: Number of jobs removed.
+        """
+        cutoff = time.time() - max_age
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT id, result_path FROM jobs WHERE state IN (?, ?) AND finished_at < ?",
+                (JOB_DONE, JOB_FAILED, cutoff),
+            ).fetchall()
+            for row in rows:
+                if row["result_path"] and os.path.exists(row["result_path"]):
+                    try:
+                        os.unlink(row["result_path"])
+                    except OSError as e:
+                        print(f"Error removing job result {row['result_path']}: {e}")
+                conn.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+        return len(rows)
+
+
+def run_job(db_path, job_id, file_path, config_dict, output_path, config_path, cache_dir=None, memory_trace=False):
+    """
+    Worker-process entry point: run one job and record its outcome in the store.
+
+    The job's per-stage memory use (RSS, plus tracemalloc figures and top
+    allocation sites when memory_trace is set) is stored with it as well.
+
+    Args:
+        db_path (str): Path of the job database.
+        job_id (str): Job to run.
+        memory_trace (bool): Trace Python allocations with tracemalloc (slower).
+        Remaining arguments are passed to render_labels_from_upload.
+    """
+    store = JobStore(db_path)
+    store.mark_running(job_id)
+
+    last_write = 0.0
+
+    def report(labels_done, labels_total):
+        nonlocal last_write
+        now = time.monotonic()
+        if now - last_write >= PROGRESS_INTERVAL:
+            store.update_progress(job_id, labels_done, labels_total)
+            last_write = now
+
+    try:
+        with memory_profile.recording(trace=memory_trace) as memory_report:
+            try:
+                label_count = render_labels_from_upload(file_path, config_dict, output_path, config_path,
+                                                        cache_dir=cache_dir, progress_callback=report)
+            finally:
+                # Also kept for failed jobs: an out-of-memory failure is what it is there for
+                store.set_memory_report(job_id, memory_report.to_dict())
+    except Exception as e:
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        store.mark_failed(job_id, f"Error generating labels: {e}")
+        return
+
+    if label_count == 0:
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        store.mark_failed(job_id, NO_DATA_MESSAGE)
+        return
+
+    store.mark_done(job_id, output_path, label_count)
+
+
+class JobQueue:
+    """
+    Bounded pool of worker processes running label jobs.
+
+    The pool is created on first use. Jobs beyond max_workers wait in the pool's
+    queue and stay in the "queued" state until a worker picks them up. When a
+    worker process dies (killed for running out of memory, say), the jobs in the
+    pool fail and the next submit starts a fresh pool.
+    """
+
+    def __init__(self, store, max_workers=2, memory_trace=False):
+        self.store = store
+        self.max_workers = max_workers
+        self.memory_trace = memory_trace
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers don't inherit the server's threads or open sockets
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _discard_executor(self, executor):
+        # A broken pool refuses new work, so drop it and let the next submit replace it
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, job_id, file_path, config_dict, output_path, config_path, cache_dir=None):
+        """
+        Queue a job created with JobStore.create.
+
+        If the job can't be queued, it is marked failed before the error is raised,
+        so it doesn't stay "queued" forever.
+        """
+        args = (run_job, self.store.db_path, job_id, file_path, config_dict, output_path, config_path,
+                cache_dir, self.memory_trace)
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(*args)
+            except BrokenProcessPool:
+                # The pool broke before a done callback could replace it
+                self._discard_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(*args)
+        except Exception as e:
+            self.store.mark_failed(job_id, f"Job could not be queued: {e}")
+            raise
+        future.add_done_callback(lambda f: self._record_crash(job_id, executor, f))
+        return future
+
+    def _record_crash(self, job_id, executor, future):
+        # run_job records its own errors; this catches cancelled jobs and dead worker processes
+        if future.cancelled():
+            self.store.mark_failed(job_id, "Job was cancelled before it ran (server shutting down)")
+        elif future.exception() is not None:
+            self.store.mark_failed(job_id, f"Job worker failed: {future.exception()}")
+            if isinstance(future.exception(), BrokenProcessPool):
+                self._discard_executor(executor)
+
+    def shutdown(self):
+        """Stop the pool, cancelling jobs that have not started."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Load test for the web service, run the way it is deployed.
+
+Starts web_app:app under gunicorn (uvicorn workers, as run_gunicorn_socket.py
+does) or plain uvicorn on a temporary Unix socket, in a scratch working
+directory so uploads, caches and config edits don't touch the repository. A
+workbook is uploaded once, then a weighted mix of requests is replayed by a
+number of concurrent clients, one stage per concurrency level of the ramp:
+
+- upload: POST /upload of the workbook under a second name
+- generate: POST /generate
+- export: POST /export-filtered
+- config: GET /config
+- config_update: POST /config with no changes (rewrites the config file)
+- health: GET /health
+
+Each stage reports, per endpoint, requests, error rate, throughput and the
+p50/p95/p99/max latency. Requests answered with a 4xx/5xx status, or not
+answered at all (e.g. a worker killed by gunicorn's --timeout), count as errors.
+
+Example:
+    # Compare worker counts for the systemd unit
+    python src/load_test.py --workers 2 --ramp 1,4,8,16 --duration 30
+    python src/load_test.py --workers 4 --ramp 1,4,8,16 --duration 30 --json output/load_4.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from synthetic_data import SIZES, ensure_workbook
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_DIR, "src")
+
+ENDPOINTS = ("upload", "generate", "export", "config", "config_update", "health")
+DEFAULT_MIX = "generate=3,export=2,config=2,health=2,upload=1"
+WORKBOOK_NAME = "loadtest.xlsx"
+UPLOAD_NAME = "loadtest-upload.xlsx"
+
+
+def parse_mix(text):
+    """Turn "generate=3,health=1" into {"generate": 3.0, "health": 1.0}."""
+    mix = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight) if weight else 1.0
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The request mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+def parse_ramp(text):
+    """Turn "1,4,8" into [1, 4, 8]."""
+    return [int(level) for level in text.split(",") if level.strip()]
+
+
+def prepare_work_dir(work_dir):
+    """
+    Lay out a working directory the app can run in.
+
+    static, templates and icon are linked from the repository. config is a real
+    directory holding a copy of label_config.json (config_update requests write
+    to it) and links to the other files, such as the font.
+    """
+    for name in ("static", "templates", "icon"):
+        os.symlink(os.path.join(PROJECT_DIR, name), os.path.join(work_dir, name))
+    config_dir = os.path.join(work_dir, "config")
+    os.makedirs(config_dir)
+    for name in os.listdir(os.path.join(PROJECT_DIR, "config")):
+        source = os.path.join(PROJECT_DIR, "config", name)
+        if name == "label_config.json":
+            shutil.copy(source, os.path.join(config_dir, name))
+        else:
+            os.symlink(source, os.path.join(config_dir, name))
+
+
+def server_command(server, socket_path, workers, timeout):
+    """Command line starting web_app:app on socket_path with gunicorn or uvicorn."""
+    if server == "gunicorn":
+        return [sys.executable, "-m", "gunicorn", "web_app:app",
+                "--bind", f"unix:{socket_path}",
+                "--workers", str(workers),
+                "--worker-class", "uvicorn.workers.UvicornWorker",
+                "--timeout", str(timeout),
+                "--log-level", "warning"]
+    if server == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "web_app:app",
+                "--uds", socket_path,
+                "--workers", str(workers),
+                "--log-level", "warning"]
+    raise ValueError(f"Unknown server '{server}'; use gunicorn or uvicorn")
+
+
+def start_server(server, work_dir, workers=4, timeout=120, env=None):
+    """
+    Start the app in work_dir on a Unix socket there.
+
+    Returns:
+        tuple: (Popen of the server, socket path, server log path)
+    """
+    socket_path = os.path.join(work_dir, "label-generator.sock")
+    log_path = os.path.join(work_dir, "server.log")
+    server_env = os.environ.copy()
+    server_env.update(env or {})
+    server_env["PYTHONPATH"] = SRC_DIR
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(server_command(server, socket_path, workers, timeout), cwd=work_dir,
+                                   env=server_env, stdout=log, stderr=subprocess.STDOUT)
+    return process, socket_path, log_path
+
+
+def wait_until_ready(process, socket_path, log_path, timeout=60):
+    """Wait until /health answers on the socket; raise RuntimeError if the server dies or never answers."""
+    deadline = time.monotonic() + timeout
+    transport = httpx.HTTPTransport(uds=socket_path)
+    with httpx.Client(transport=transport, base_url="http://localhost", timeout=5) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                with open(log_path, encoding="utf-8", errors="replace") as f:
+                    raise RuntimeError(f"Server exited with status {process.returncode}:\n{f.read()[-2000:]}")
+            if os.path.exists(socket_path):
+                try:
+                    if client.get("/health").status_code == 200:
+                        return
+                except httpx.TransportError:
+                    pass
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not answer on {socket_path} within {timeout}s")
+
+
+def stop_server(process, timeout=30):
+    """Stop the server gracefully, killing it if it doesn't exit in time."""
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """
+    Per-endpoint statistics for one stage.
+
+    Args:
+        samples (list): (endpoint, seconds, status) tuples; status is the HTTP status
+            or the name of the exception the request failed with.
+        elapsed (float): Wall time of the stage in seconds.
+
+    Returns:
+        dict: Endpoint (and "all") -> requests, errors, error_rate, throughput
+        (requests per second) and p50/p95/p99/max latency in seconds.
+    """
+    grouped = {}
+    for endpoint, seconds, status in samples:
+        grouped.setdefault(endpoint, []).append((seconds, status))
+    grouped["all"] = [(seconds, status) for _, seconds, status in samples]
+
+    summary = {}
+    for endpoint, results in grouped.items():
+        latencies = sorted(seconds for seconds, _ in results)
+        errors = sum(1 for _, status in results if not isinstance(status, int) or status >= 400)
+        summary[endpoint] = {
+            "requests": len(results),
+            "errors": errors,
+            "error_rate": errors / len(results) if results else 0.0,
+            "throughput": len(results) / elapsed if elapsed > 0 else None,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else None,
+        }
+    return summary
+
+
+class RequestFactory:
+    """
+    Builds the request for each endpoint.
+
+    Args:
+        workbook (bytes): Workbook uploaded by upload requests.
+        render_rows (int, optional): Label limit for generate and export requests.
+        variants (int): Distinct generate/export requests to cycle through; 1 means
+            they repeat and mostly hit the server's render and filter caches.
+    """
+
+    def __init__(self, workbook, render_rows=None, variants=1):
+        self.workbook = workbook
+        self.render_rows = render_rows
+        self.variants = max(1, variants)
+
+    def _labels_request(self, rng):
+        config = {"start_index": rng.randrange(self.variants)}
+        if self.render_rows is not None:
+            config["limit"] = self.render_rows
+        return {"filename": WORKBOOK_NAME, "config": config}
+
+    def build(self, endpoint, rng):
+        """Return (method, url, httpx request keyword arguments)."""
+        if endpoint == "upload":
+            return "POST", "/upload", {"files": {"file": (UPLOAD_NAME, self.workbook)}}
+        if endpoint == "generate":
+            return "POST", "/generate", {"json": self._labels_request(rng)}
+        if endpoint == "export":
+            return "POST", "/export-filtered", {"json": self._labels_request(rng)}
+        if endpoint == "config":
+            return "GET", "/config", {}
+        if endpoint == "config_update":
+            return "POST", "/config", {"json": {}}
+        return "GET", "/health", {}
+
+
+async def run_stage(client, factory, mix, concurrency, duration, seed=0):
+    """
+    Replay the mix with concurrency clients for duration seconds.
+
+    Each client sends its next request as soon as the previous one finished.
+
+    Returns:
+        tuple: (samples, elapsed seconds) for summarize()
+    """
+    endpoints = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in endpoints]
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    async def user(index):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            method, url, kwargs = factory.build(endpoint, rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            samples.append((endpoint, time.perf_counter() - start, status))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(index) for index in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+async def run_load(socket_path, factory, mix, ramp, duration, seed=0, request_timeout=300):
+    """
+    Upload the workbook, then run one stage per concurrency level in ramp.
+
+    Returns:
+        list: {"concurrency": ..., "seconds": ..., "endpoints": summarize()} per stage
+    """
+    limits = httpx.Limits(max_connections=max(ramp), max_keepalive_connections=max(ramp))
+    transport = httpx.AsyncHTTPTransport(uds=socket_path, limits=limits)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost",
+                                 timeout=request_timeout) as client:
+        response = await client.post("/upload", files={"file": (WORKBOOK_NAME, factory.workbook)})
+        response.raise_for_status()
+
+        stages = []
+        for concurrency in ramp:
+            samples, elapsed = await run_stage(client, factory, mix, concurrency, duration, seed=seed)
+            stages.append({"concurrency": concurrency, "seconds": elapsed,
+                           "endpoints": summarize(samples, elapsed)})
+            print(format_stage(stages[-1]))
+    return stages
+
+
+def format_stage(stage):
+    """Table of one stage's per-endpoint statistics."""
+    def ms(value):
+        return f"{value * 1000:.0f}" if value is not None else "-"
+
+    lines = [f"concurrency {stage['concurrency']} ({stage['seconds']:.1f}s)",
+             f"  {'endpoint':<15}{'requests':>9}{'errors':>8}{'req/s':>8}"
+             f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"]
+    endpoints = stage["endpoints"]
+    for name in [name for name in ENDPOINTS if name in endpoints] + ["all"]:
+        entry = endpoints[name]
+        throughput = f"{entry['throughput']:.1f}" if entry["throughput"] is not None else "-"
+        lines.append(f"  {name:<15}{entry['requests']:>9}{entry['error_rate']:>8.1%}{throughput:>8}"
+                     f"{ms(entry['p50']):>9}{ms(entry['p95']):>9}{ms(entry['p99']):>9}{ms(entry['max']):>9}")
+    return "\n".join(lines)
+
+
+def run(server="gunicorn", workers=4, timeout=120, workbook_path=None, rows=SIZES["1k"],
+        data_dir=None, mix=None, ramp=(1, 4, 8), duration=10.0, render_rows=None, variants=1,
+        seed=0, env=None):
+    """
+    Start the server, run the load and stop the server again.
+
+    Returns:
+        dict: The settings and the per-stage results.
+    """
+    if workbook_path is None:
+        workbook_path = ensure_workbook(rows, data_dir or os.path.join(PROJECT_DIR, "output", "benchmark_data"),
+                                        seed=seed)
+    with open(workbook_path, "rb") as f:
+        factory = RequestFactory(f.read(), render_rows=render_rows, variants=variants)
+    mix = mix or parse_mix(DEFAULT_MIX)
+
+    with tempfile.TemporaryDirectory(prefix="label-load-") as work_dir:
+        prepare_work_dir(work_dir)
+        process, socket_path, log_path = start_server(server, work_dir, workers=workers, timeout=timeout, env=env)
+        try:
+            wait_until_ready(process, socket_path, log_path)
+            stages = asyncio.run(run_load(socket_path, factory, mix, list(ramp), duration, seed=seed,
+                                          request_timeout=max(timeout * 2, 60)))
+        finally:
+            stop_server(process)
+
+    return {
+        "server": server, "workers": workers, "timeout": timeout,
+        "workbook": os.path.basename(workbook_path), "render_rows": render_rows, "variants": variants,
+        "mix": mix, "duration": duration, "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the web service on a local Unix socket.")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default="gunicorn",
+                        help="Server to run the app under (default: gunicorn with uvicorn workers)")
+    parser.add_argument("--workers", type=int, default=4, help="Server worker processes (default: 4)")
+    parser.add_argument("--timeout", type=int, default=120, help="Gunicorn worker timeout in seconds (default: 120)")
+    parser.add_argument("--workbook", help="Workbook to upload (default: a synthetic one, see --rows)")
+    parser.add_argument("--rows", default="1k", help="Synthetic workbook size: " + ", ".join(SIZES) + " or a row count")
+    parser.add_argument("--data-dir", default=os.path.join(PROJECT_DIR, "output", "benchmark_data"),
+                        help="Where generated workbooks are kept between runs")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Endpoint weights, from {', '.join(ENDPOINTS)} (default: {DEFAULT_MIX})")
+    parser.add_argument("--ramp", default="1,4,8", help="Concurrency levels, one stage each (default: 1,4,8)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per stage (default: 10)")
+    parser.add_argument("--render-rows", type=int, default=None, help="Limit generate/export requests to this many labels")
+    parser.add_argument("--variants", type=int, default=1,
+                        help="Distinct generate/export requests to cycle through; raise it to defeat the caches")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the data and the request mix")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    rows = SIZES.get(args.rows.lower()) or int(args.rows)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"Load testing {args.server} with {args.workers} workers (timeout {args.timeout}s), "
+          f"ramp {args.ramp}, {args.duration:g}s per stage")
+    report = run(server=args.server, workers=args.workers, timeout=args.timeout, workbook_path=args.workbook,
+                 rows=rows, data_dir=args.data_dir, mix=mix, ramp=parse_ramp(args.ramp), duration=args.duration,
+                 render_rows=args.render_rows, variants=args.variants, seed=args.seed)
+
+    slowest = max((stage["endpoints"]["all"]["max"] or 0 for stage in report["stages"]), default=0)
+    if args.server == "gunicorn" and slowest > args.timeout * 0.5:
+        print(f"\nWarning: the slowest request took {slowest:.1f}s, over half of --timeout {args.timeout}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
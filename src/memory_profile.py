@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-stage memory accounting for the label pipeline.
+
+While a recording is active (see recording()), every pipeline stage -
+ingest (the Excel parse), filter and each filter inside it, to_dict, render and
+pdf_save - records:
+
+- the peak of Python-allocated memory traced by tracemalloc during the stage,
+  and the traced memory at its start and end;
+- the process RSS at its start and end, and the peak RSS sampled while it ran;
+- the call sites whose allocations grew the most over the stage.
+
+Stages nest (each filter inside filter, pdf_save inside render when rolling
+over part files) and report their own peaks. Outside a recording the stage hooks
+cost one global lookup. tracemalloc slows allocation-heavy code down
+noticeably, so it can be left off (trace=False): the report then only holds the
+RSS figures, which cost a sampling thread per stage.
+
+The recording is per process, so concurrent renders in one process would be
+mixed together; the web app records it for background jobs, which run one at a
+time in each job worker process.
+"""
+
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+
+# Frames kept per allocation; 1 groups allocations by the line that made them
+TRACE_FRAMES = 1
+
+_report = None
+
+
+def process_rss_bytes():
+    """Resident set size of this process in bytes, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class PeakRSS:
+    """
+    Context manager sampling the process RSS in a background thread.
+
+    After the block, start, end and peak hold resident sizes in bytes (None
+    where RSS can't be read).
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start = self.end = self.peak = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        rss = process_rss_bytes()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start = self._sample()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.end = self._sample()
+        return False
+
+
+def _site(frame):
+    # Last two path components are enough to tell files apart
+    parts = frame.filename.replace("\\", "/").split("/")
+    return f"{'/'.join(parts[-2:])}:{frame.lineno}"
+
+
+class MemoryReport:
+    """
+    Memory figures for the stages run during one recording.
+
+    Args:
+        top (int): Allocation sites to keep per stage; 0 skips the tracemalloc
+            snapshots that finding them takes.
+        trace (bool): Record traced memory with tracemalloc, not only RSS.
+    """
+
+    def __init__(self, top=10, trace=True):
+        self.trace = trace
+        self.top = top if trace else 0
+        self.stages = []
+        self._open = []
+        self._lock = threading.Lock()
+
+    def _traced_memory(self):
+        return tracemalloc.get_traced_memory()[0] if self.trace else None
+
+    def _fold_peak(self):
+        # Credit the peak since the last reset to every open stage, then start a new window
+        if not self.trace:
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._open:
+            frame["peak"] = max(frame["peak"], peak)
+        tracemalloc.reset_peak()
+
+    def _snapshot(self):
+        if not self.top:
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        # Taking the snapshot is not part of the stage's own peak
+        tracemalloc.reset_peak()
+        return snapshot
+
+    def _top_sites(self, start_snapshot):
+        if start_snapshot is None:
+            return []
+        differences = self._snapshot().compare_to(start_snapshot, "lineno")
+        grown = [diff for diff in differences if diff.size_diff > 0][:self.top]
+        return [{"site": _site(diff.traceback[0]), "size_diff": diff.size_diff, "count_diff": diff.count_diff}
+                for diff in grown]
+
+    @contextmanager
+    def stage(self, name):
+        """Record the memory use of the enclosed block as stage name."""
+        with self._lock:
+            self._fold_peak()
+            record = {"stage": name, "depth": len(self._open)}
+            self.stages.append(record)
+            frame = {"peak": 0}
+            self._open.append(frame)
+            start_snapshot = self._snapshot()
+            record["traced_start"] = self._traced_memory()
+        try:
+            with PeakRSS() as rss:
+                yield
+        finally:
+            with self._lock:
+                self._fold_peak()
+                # Frames compare equal by value, so find this one by identity
+                del self._open[next(i for i, open_frame in enumerate(self._open) if open_frame is frame)]
+                record.update(
+                    traced_end=self._traced_memory(),
+                    traced_peak=frame["peak"] if self.trace else None,
+                    rss_start=rss.start,
+                    rss_end=rss.end,
+                    rss_peak=rss.peak,
+                    top_sites=self._top_sites(start_snapshot),
+                )
+
+    def to_dict(self):
+        """JSON-serializable form of the report."""
+        return {"stages": [dict(record) for record in self.stages]}
+
+
+@contextmanager
+def stage(name):
+    """Record the enclosed block as a stage of the active recording; a no-op without one."""
+    report = _report
+    if report is None:
+        yield
+        return
+    with report.stage(name):
+        yield
+
+
+@contextmanager
+def recording(top=10, trace=True):
+    """
+    Record per-stage memory use in this process for the duration of the block.
+
+    Args:
+        top (int): Allocation sites to keep per stage.
+        trace (bool): Use tracemalloc; with False only RSS is recorded.
+
+    Yields the MemoryReport, which is complete once the block exits.
+    """
+    global _report
+    started = trace and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(TRACE_FRAMES)
+    _report = MemoryReport(top=top, trace=trace)
+    try:
+        yield _report
+    finally:
+        _report = None
+        if started:
+            tracemalloc.stop()
+
+
+def _megabytes(value):
+    return f"{value / (1024 * 1024):.1f}" if value is not None else "-"
+
+
+def format_report(report, top=3):
+    """
+    Readable table of a MemoryReport (or its to_dict() form), with the top allocation sites.
+
+    Args:
+        report (MemoryReport or dict): The report.
+        top (int): Allocation sites to list under each stage.
+    """
+    stages = report.to_dict()["stages"] if isinstance(report, MemoryReport) else report["stages"]
+    header = f"{'stage':<26}{'traced peak MB':>15}{'traced +MB':>12}{'RSS peak MB':>13}{'RSS +MB':>10}"
+    lines = ["Memory by stage:", header, "-" * len(header)]
+    for record in stages:
+        traced_growth = None
+        if record["traced_end"] is not None and record["traced_start"] is not None:
+            traced_growth = record["traced_end"] - record["traced_start"]
+        rss_growth = None
+        if record["rss_end"] is not None and record["rss_start"] is not None:
+            rss_growth = record["rss_end"] - record["rss_start"]
+        name = "  " * record["depth"] + record["stage"]
+        lines.append(f"{name:<26}{_megabytes(record['traced_peak']):>15}{_megabytes(traced_growth):>12}"
+                     f"{_megabytes(record['rss_peak']):>13}{_megabytes(rss_growth):>10}")
+        for site in record["top_sites"][:top]:
+            lines.append(f"{'':<4}{'  ' * record['depth']}{_megabytes(site['size_diff']):>8} MB  "
+                         f"{site['count_diff']:>9} blocks  {site['site']}")
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+In-process timers and counters for the label pipeline.
+
+load_data_from_excel, the record conversion and generate_labels record how long
+each stage takes (ingest, filter, to_dict, render, pdf_save) and how many labels
+and pages they produce. The web app exposes the numbers at /metrics in the
+Prometheus text format; the CLI prints them with --timings. Recording is a
+perf_counter call and a short locked update per stage, not per label.
+
+Numbers are kept per process: each gunicorn worker reports its own, and stages
+run in executor or job worker processes are counted in those processes.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+import memory_profile
+from memory_profile import process_rss_bytes
+
+
+STAGES = ("ingest", "filter", "to_dict", "render", "pdf_save")
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    """Thread-safe duration histogram with fixed buckets, in the Prometheus sense."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """Return (cumulative bucket counts including +Inf, sum, count)."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+stage_seconds = {stage: Histogram() for stage in STAGES}
+labels_total = Counter()
+pages_total = Counter()
+
+
+def observe(stage, seconds):
+    """Record one run of a pipeline stage."""
+    stage_seconds[stage].observe(seconds)
+
+
+class _Timer:
+    elapsed = 0.0
+
+
+@contextmanager
+def timer(stage):
+    """
+    Time the enclosed block as one run of stage.
+
+    Yields an object whose elapsed attribute holds the duration once the block exits.
+    Blocks that raise are not recorded. During a memory_profile recording the
+    block's memory use is recorded as well.
+    """
+    result = _Timer()
+    with memory_profile.stage(stage):
+        start = time.perf_counter()
+        yield result
+        result.elapsed = time.perf_counter() - start
+    observe(stage, result.elapsed)
+
+
+def reset():
+    """Clear every timer and counter (for tests and repeated CLI runs)."""
+    for stage in STAGES:
+        stage_seconds[stage] = Histogram()
+    labels_total.value = 0
+    pages_total.value = 0
+
+
+def format_timings():
+    """Human-readable summary of the stage timers and counters, for the CLI."""
+    lines = ["Stage timings:"]
+    for stage in STAGES:
+        _, total, count = stage_seconds[stage].snapshot()
+        if count:
+            lines.append(f"  {stage:<9} {total:9.3f}s  ({count} run{'s' if count != 1 else ''})")
+    lines.append(f"Labels: {labels_total.value}  Pages: {pages_total.value}")
+    return "\n".join(lines)
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(gauges=None):
+    """
+    Render the timers, counters and extra gauges in the Prometheus text format.
+
+    Args:
+        gauges (list, optional): (name, help, labels dict or None, value) tuples for
+            values owned elsewhere, e.g. cache hit ratios and queue depth. Values
+            that are None are skipped.
+
+    Returns:
+        str: The exposition text.
+    """
+    lines = [
+        "# HELP label_stage_duration_seconds Time spent in each label pipeline stage.",
+        "# TYPE label_stage_duration_seconds histogram",
+    ]
+    for stage in STAGES:
+        histogram = stage_seconds[stage]
+        cumulative, total, count = histogram.snapshot()
+        for bound, bucket_count in zip(histogram.buckets + ("+Inf",), cumulative):
+            le = bound if bound == "+Inf" else _format_value(bound)
+            lines.append(f'label_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {bucket_count}')
+        lines.append(f'label_stage_duration_seconds_sum{{stage="{stage}"}} {_format_value(total)}')
+        lines.append(f'label_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+    for name, help_text, counter in (("label_labels_total", "Labels drawn.", labels_total),
+                                     ("label_pages_total", "PDF pages produced.", pages_total)):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {counter.value}"]
+
+    described = set()
+    for name, help_text, labels, value in gauges or ():
+        if value is None:
+            continue
+        if name not in described:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            described.add(name)
+        label_text = ""
+        if labels:
+            label_text = "{" + ",".join(f'{key}="{val}"' for key, val in labels.items()) + "}"
+        lines.append(f"{name}{label_text} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Multi-process label rendering.
+
+The record list is split into page-aligned shards, each shard is rendered to
+its own PDF in a worker process with simple_labels.generate_labels, and the
+shards are merged in page order (or delivered as ordered part files). Because
+every shard starts on a page boundary, each label lands in the same slot as in
+a serial run.
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from simple_labels import generate_labels, resolve_config, part_path, write_parts_manifest
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+
+def _render_shard(records, shard_path, render_kwargs):
+    """Worker entry point: render one shard to its own PDF."""
+    return generate_labels(records, shard_path, **render_kwargs)
+
+
+def shard_records(records, labels_per_page, pages_per_shard):
+    """
+    Split records into page-aligned shards.
+
+    Args:
+        records (list): Label records.
+        labels_per_page (int): Label slots on one page.
+        pages_per_shard (int): Pages rendered by each shard.
+
+    Returns:
+        list: Record lists, each holding a whole number of pages except the last.
+    """
+    shard_size = labels_per_page * pages_per_shard
+    return [records[i:i + shard_size] for i in range(0, len(records), shard_size)]
+
+
+def merge_pdfs(part_paths, output_path):
+    """Concatenate PDFs in order into output_path."""
+    writer = PdfWriter()
+    for path in part_paths:
+        writer.append(path)
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+
+
+def generate_labels_parallel(data, output_path, config_file=None, labels_per_page=None, label_width=None, label_height=None, temp_config_overrides=None, static_forms=None, workers=None, pages_per_shard=None, merge=True):
+    """
+    Generate a label PDF by rendering page-aligned shards in parallel.
+
+    Args:
+        data: List of dictionaries containing label data. Other iterables are read
+            into a list first, since sharding needs the full record count.
+        output_path (str): Path of the merged PDF. When merge is False, parts are
+            written next to it as <name>_part001.pdf, <name>_part002.pdf, ...
+        workers (int, optional): Worker processes. Defaults to the CPU count.
+        pages_per_shard (int, optional): Pages per shard. Defaults to an even split
+            of the pages across the workers.
+        merge (bool): Merge the shards into output_path (requires pypdf). If False,
+            or pypdf is not installed, the ordered part files are kept instead,
+            with a <name>_manifest.json listing them.
+        Remaining arguments are passed through to simple_labels.generate_labels.
+
+    Returns:
+        list: Paths of the written PDF files, in page order.
+    """
+    records = list(data)
+    workers = workers or os.cpu_count() or 1
+
+    config = resolve_config(config_file, temp_config_overrides, labels_per_page, label_width, label_height)
+    labels_on_page = config["rows"] * config["columns"]
+    total_pages = max(1, math.ceil(len(records) / labels_on_page))
+    if pages_per_shard is None:
+        pages_per_shard = math.ceil(total_pages / workers)
+
+    render_kwargs = dict(
+        config_file=config_file,
+        labels_per_page=labels_per_page,
+        label_width=label_width,
+        label_height=label_height,
+        temp_config_overrides=temp_config_overrides,
+        static_forms=static_forms,
+    )
+
+    shards = shard_records(records, labels_on_page, pages_per_shard) or [[]]
+    if len(shards) == 1:
+        # Nothing to parallelize, but unmerged output is still a part file with a manifest
+        if not merge:
+            generate_labels(shards[0], output_path, pages_per_file=pages_per_shard, **render_kwargs)
+            return [part_path(output_path, 1)]
+        generate_labels(shards[0], output_path, **render_kwargs)
+        return [output_path]
+
+    if merge and PdfWriter is None:
+        print("Warning: pypdf is not installed, so shards cannot be merged. Writing ordered part files instead.")
+        merge = False
+
+    shard_dir = tempfile.mkdtemp(prefix="labels_shards_")
+    try:
+        shard_paths = [os.path.join(shard_dir, f"shard_{i:04d}.pdf") for i in range(len(shards))]
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            futures = [
+                executor.submit(_render_shard, shard, shard_path, render_kwargs)
+                for shard, shard_path in zip(shards, shard_paths)
+            ]
+            for future in futures:
+                future.result()  # Re-raise any worker error
+
+        if merge:
+            merge_pdfs(shard_paths, output_path)
+            print(f"Merged {len(shard_paths)} shards ({len(records)} labels) into {output_path}")
+            return [output_path]
+
+        parts = []
+        first_label = 0
+        for i, (shard, shard_path) in enumerate(zip(shards, shard_paths), start=1):
+            path = part_path(output_path, i)
+            shutil.move(shard_path, path)
+            parts.append({"path": path, "pages": math.ceil(len(shard) / labels_on_page),
+                          "first_label": first_label, "labels": len(shard)})
+            first_label += len(shard)
+        manifest_path = write_parts_manifest(output_path, parts)
+        print(f"Wrote {len(parts)} part files ({len(records)} labels), listed in {manifest_path}")
+        return [part["path"] for part in parts]
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Performance regression gate for benchmark results.
+
+Baselines are benchmark reports (see benchmark.py) stored as JSON, one per
+machine profile, since timings are only comparable on the same kind of
+machine. A new report is compared stage by stage against the baseline for its
+machine: a stage fails when its time, or the peak RSS while it ran, grows by
+more than the threshold. Tiny absolute differences are ignored as noise.
+
+Example:
+    # Record a baseline for this machine
+    python src/benchmark.py --sizes 1k,10k --json output/benchmark.json
+    python src/perf_gate.py record output/benchmark.json
+
+    # Later: run the benchmarks again and gate on the result (exit status 1 on regression)
+    python src/perf_gate.py check --sizes 1k,10k --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(PROJECT_DIR, "benchmarks", "baselines")
+
+# Allowed relative growth before a stage counts as regressed
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_MEMORY_THRESHOLD = 0.2
+# Differences below these are noise, whatever their relative size
+MIN_SECONDS = 0.02
+MIN_RSS_BYTES = 16 * 1024 * 1024
+
+
+def machine_key(machine):
+    """File-name-safe key for a benchmark report's machine profile."""
+    python = ".".join(str(machine.get("python", "")).split(".")[:2])
+    key = f"{machine.get('platform', 'unknown').split('-')[0]}-{machine.get('machine', '')}-{machine.get('cpu_count')}cpu-py{python}"
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", key)
+
+
+def baseline_path(machine, baseline_dir=BASELINE_DIR):
+    return os.path.join(baseline_dir, f"{machine_key(machine)}.json")
+
+
+def record_baseline(report, baseline_dir=BASELINE_DIR):
+    """Store a benchmark report as the baseline for its machine profile. Returns the path."""
+    os.makedirs(baseline_dir, exist_ok=True)
+    path = baseline_path(report["machine"], baseline_dir)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load_baseline(machine, baseline_dir=BASELINE_DIR):
+    """Return the baseline report for a machine profile, or None if none was recorded."""
+    path = baseline_path(machine, baseline_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_stage_thresholds(items):
+    """Turn ["render=0.5", "filter=0.3"] into {"render": 0.5, "filter": 0.3}."""
+    thresholds = {}
+    for item in items or ():
+        stage, _, value = item.partition("=")
+        thresholds[stage.strip()] = float(value)
+    return thresholds
+
+
+def _threshold_for(stage, threshold, stage_thresholds):
+    # The longest matching prefix wins, so "filter" covers every filter_* stage
+    matches = [prefix for prefix in stage_thresholds if stage.startswith(prefix)]
+    return stage_thresholds[max(matches, key=len)] if matches else threshold
+
+
+def _check(baseline_value, current_value, threshold, min_delta):
+    if baseline_value is None or current_value is None:
+        return "n/a", None
+    change = (current_value - baseline_value) / baseline_value if baseline_value else None
+    delta = current_value - baseline_value
+    if change is not None and change > threshold and delta > min_delta:
+        return "REGRESSED", change
+    if change is not None and change < -threshold and -delta > min_delta:
+        return "improved", change
+    return "ok", change
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, memory_threshold=DEFAULT_MEMORY_THRESHOLD,
+            stages=None, stage_thresholds=None, min_seconds=MIN_SECONDS, min_rss_bytes=MIN_RSS_BYTES):
+    """
+    Compare two benchmark reports stage by stage.
+
+    Args:
+        baseline (dict): Baseline report.
+        current (dict): New report.
+        threshold (float): Allowed relative growth in seconds (0.2 = 20%).
+        memory_threshold (float): Allowed relative growth in peak RSS.
+        stages (list, optional): Stage name prefixes to gate, e.g. ["ingest", "filter",
+            "render"]; all stages by default.
+        stage_thresholds (dict, optional): Time thresholds for stage name prefixes.
+        min_seconds (float): Time differences below this never count.
+        min_rss_bytes (int): Peak RSS differences below this never count.
+
+    Returns:
+        list: One dict per compared (size, stage) with the baseline and current
+        values, relative changes and "time"/"memory" statuses ("ok", "REGRESSED",
+        "improved", "n/a", or "new"/"missing" when only one report has the stage).
+    """
+    stage_thresholds = stage_thresholds or {}
+    rows = []
+    for size, current_size in current["sizes"].items():
+        baseline_stages = baseline["sizes"].get(size, {}).get("stages", {})
+        current_stages = current_size["stages"]
+        for stage in list(current_stages) + [name for name in baseline_stages if name not in current_stages]:
+            if stages and not any(stage.startswith(prefix) for prefix in stages):
+                continue
+            old = baseline_stages.get(stage)
+            new = current_stages.get(stage)
+            row = {"size": size, "stage": stage,
+                   "baseline_seconds": old and old["seconds"], "current_seconds": new and new["seconds"],
+                   "baseline_rss": old and old.get("peak_rss_bytes"), "current_rss": new and new.get("peak_rss_bytes"),
+                   "time_change": None, "memory_change": None}
+            if old is None or new is None:
+                row["time"] = row["memory"] = "new" if old is None else "missing"
+            else:
+                row["time"], row["time_change"] = _check(
+                    old["seconds"], new["seconds"], _threshold_for(stage, threshold, stage_thresholds), min_seconds)
+                row["memory"], row["memory_change"] = _check(
+                    row["baseline_rss"], row["current_rss"], memory_threshold, min_rss_bytes)
+            rows.append(row)
+    return rows
+
+
+def regressions(rows):
+    """The compared rows that regressed in time or memory."""
+    return [row for row in rows if "REGRESSED" in (row["time"], row["memory"])]
+
+
+def format_table(rows):
+    """Readable diff table of compare() results."""
+    def seconds(value):
+        return f"{value:.3f}" if value is not None else "-"
+
+    def megabytes(value):
+        return f"{value / (1024 * 1024):.0f}" if value is not None else "-"
+
+    def change(value):
+        return f"{value:+.1%}" if value is not None else ""
+
+    header = (f"{'size':<6} {'stage':<24} {'base s':>9} {'now s':>9} {'change':>8} {'time':<10}"
+              f" {'base MB':>8} {'now MB':>8} {'change':>8} {'memory':<10}")
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['size']:<6} {row['stage']:<24} {seconds(row['baseline_seconds']):>9} {seconds(row['current_seconds']):>9}"
+            f" {change(row['time_change']):>8} {row['time']:<10}"
+            f" {megabytes(row['baseline_rss']):>8} {megabytes(row['current_rss']):>8}"
+            f" {change(row['memory_change']):>8} {row['memory']:<10}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a stored baseline.")
+    parser.add_argument("--baseline-dir", default=BASELINE_DIR, help="Directory of per-machine baselines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Store a benchmark report as this machine's baseline")
+    record.add_argument("report", help="JSON written by benchmark.py --json")
+
+    check = commands.add_parser("check", help="Compare a report (or a fresh run) against the baseline")
+    check.add_argument("report", nargs="?", help="JSON written by benchmark.py --json; runs the benchmarks if omitted")
+    check.add_argument("--sizes", default="1k,10k", help="Sizes to run when no report is given")
+    check.add_argument("--render-rows", type=int, default=None, help="Render at most this many labels per size")
+    check.add_argument("--no-web", action="store_true", help="Skip the web endpoint benchmarks")
+    check.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="Allowed relative slowdown per stage (default: 0.2 = 20%%)")
+    check.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                       help="Allowed relative peak RSS growth per stage (default: 0.2)")
+    check.add_argument("--stage-threshold", action="append", default=[], metavar="STAGE=RATIO",
+                       help="Threshold for stages starting with STAGE, e.g. render=0.5 (repeatable)")
+    check.add_argument("--stages", help="Only gate stages starting with these comma-separated prefixes, e.g. ingest,filter,render")
+    check.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="Ignore time differences below this")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        with open(args.report, encoding="utf-8") as f:
+            report = json.load(f)
+        print(f"Baseline stored in {record_baseline(report, args.baseline_dir)}")
+        return
+
+    if args.report:
+        with open(args.report, encoding="utf-8") as f:
+            report = json.load(f)
+    else:
+        import benchmark
+        report = benchmark.run_benchmarks(benchmark.parse_sizes(args.sizes),
+                                          os.path.join(PROJECT_DIR, "output", "benchmark_data"),
+                                          render_rows=args.render_rows, web=not args.no_web)
+
+    baseline = load_baseline(report["machine"], args.baseline_dir)
+    if baseline is None:
+        print(f"No baseline for this machine ({machine_key(report['machine'])}) in {args.baseline_dir}; "
+              f"record one with: perf_gate.py record <report.json>")
+        sys.exit(2)
+
+    rows = compare(baseline, report, threshold=args.threshold, memory_threshold=args.memory_threshold,
+                   stages=args.stages.split(",") if args.stages else None,
+                   stage_thresholds=parse_stage_thresholds(args.stage_threshold), min_seconds=args.min_seconds)
+    print(format_table(rows))
+
+    failed = regressions(rows)
+    if failed:
+        print(f"\n{len(failed)} stage(s) regressed: " + ", ".join(f"{row['size']}/{row['stage']}" for row in failed))
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in profiling of label generation runs.
+
+A profiled run is traced with cProfile and, at the same time, sampled by a
+background thread that records the profiled thread's call stack every few
+milliseconds. Two artifacts are written next to each other:
+
+- <stem>.pstats: the cProfile dump, for pstats, snakeviz and similar tools.
+- <stem>.collapsed: one "outer;...;inner count" line per sampled stack, the
+  input format of flamegraph.pl and speedscope.
+
+The CLI switches this on with --profile and the web app per request (see
+WEB_README.md); nothing is recorded otherwise.
+"""
+
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# Newer Pythons allow only one active cProfile per process, so profiled runs take turns
+_profile_lock = threading.Lock()
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Periodically record the call stack of one thread.
+
+    Args:
+        thread_id (int): threading.get_ident() of the thread to sample.
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path):
+        """Write the samples as collapsed stacks, most frequent first."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Context manager that profiles the enclosed block in the current thread.
+
+    Artifacts are written when the block exits, also when it raises, since a
+    failing slow run is just as worth looking at. Profiled blocks in the same
+    process run one at a time.
+
+    Args:
+        output_stem (str): Path without extension; .pstats and .collapsed are appended.
+        interval (float): Seconds between stack samples.
+    """
+
+    def __init__(self, output_stem, interval=SAMPLE_INTERVAL):
+        self.output_stem = str(output_stem)
+        self.interval = interval
+        self.paths = {}
+
+    def __enter__(self):
+        _profile_lock.acquire()
+        self._profile = cProfile.Profile()
+        self._sampler = StackSampler(threading.get_ident(), self.interval)
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._profile.disable()
+            self._sampler.stop()
+        finally:
+            _profile_lock.release()
+
+        directory = os.path.dirname(os.path.abspath(self.output_stem))
+        os.makedirs(directory, exist_ok=True)
+        self.paths = {"pstats": f"{self.output_stem}.pstats", "collapsed": f"{self.output_stem}.collapsed"}
+        self._profile.dump_stats(self.paths["pstats"])
+        self._sampler.write_collapsed(self.paths["collapsed"])
+        return False
+
+
+def run_profiled(output_stem, func, *args, **kwargs):
+    """
+    Call func(*args, **kwargs) under a Profiler and return its result.
+
+    This is a module-level function so it can be sent to an executor, thread or
+    process alike, and profile the call where it actually runs.
+    """
+    with Profiler(output_stem):
+        return func(*args, **kwargs)
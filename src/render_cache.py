@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Disk cache of rendered label PDFs.
+
+The same upload contents, filters, batch window and label configuration always
+produce the same labels, so a finished PDF is kept under a key hashed from
+those inputs and served again instead of being re-rendered. The key doubles as
+the response's ETag. Entries are evicted least recently used first once the
+cache grows past its size limit. All web workers share the directory; entries
+are written to a temp file and renamed into place.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import reportlab
+
+
+# Bump when a renderer change alters the output for the same inputs
+RENDER_CACHE_VERSION = 1
+
+
+def make_key(**inputs):
+    """
+    Hash the render inputs into a cache key.
+
+    Args:
+        **inputs: JSON-serializable values that fully determine the PDF
+            (content hash, normalized filters, batch window, effective config, ...).
+
+    Returns:
+        str: Hex SHA-256 of the canonical JSON form of the inputs.
+    """
+    inputs = dict(inputs, render_cache_version=RENDER_CACHE_VERSION, reportlab=reportlab.Version)
+    canonical = json.dumps(inputs, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """
+    Size-bounded LRU cache of PDFs in a directory.
+
+    Recency is tracked through file modification times, which hits refresh, so
+    every worker process sharing the directory sees the same order.
+
+    Args:
+        cache_dir (str): Directory holding the cached PDFs.
+        max_bytes (int): Total size the cache is trimmed back to after each store.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get(self, key):
+        """Return the path of the cached PDF for key (marking it recently used), or None."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key, pdf_path):
+        """
+        Move a freshly rendered PDF into the cache and trim the cache to size.
+
+        Args:
+            key (str): Key from make_key.
+            pdf_path (str): The rendered PDF. It is moved, not copied.
+
+        Returns:
+            str: Path of the cached PDF.
+        """
+        path = self.path_for(key)
+        # Rename within the cache directory so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(suffix='.pdf.tmp', dir=self.cache_dir)
+        os.close(fd)
+        try:
+            shutil.move(pdf_path, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self.evict(keep=path)
+        return path
+
+    def put_bytes(self, key, data):
+        """
+        Write a PDF rendered in memory into the cache and trim the cache to size.
+
+        Args:
+            key (str): Key from make_key.
+            data (bytes): The PDF.
+
+        Returns:
+            str: Path of the cached PDF.
+        """
+        path = self.path_for(key)
+        fd, tmp_path = tempfile.mkstemp(suffix='.pdf.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self.evict(keep=path)
+        return path
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.pdf'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Evicted by another worker meanwhile
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, keep=None):
+        """Delete least recently used PDFs until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        """Return entry count, size, limit and this process's hit/miss counts as a dict."""
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,761 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Render-equivalence checks for the label renderers.
+
+A faster way of drawing labels must still put the same things on the page. This
+module reads back what a PDF actually draws by walking its content streams
+(expanding form XObjects such as the static label chrome):
+
+- text runs: decoded text, font (without the subset prefix), effective size,
+  fill color and the position of the run on the page;
+- drawing ops: each painted path (stroke and/or fill) with its points on the
+  page, line width and colors.
+
+Elements are assigned to label slots by position, using the page grid of the
+label config, and two PDFs match when every label holds the same elements with
+coordinates, sizes and line widths within a tolerance. Order within a label
+doesn't matter, since the form-based renderer draws the chrome first.
+
+check_equivalence renders one record set through each rendering path (a
+per-label legacy loop over a frozen copy of the original create_label, the
+compiled style, static forms, parallel shards, part files and stream output)
+and compares each with the legacy output, or with a reference PDF rendered from
+the same records by an earlier release.
+
+Example:
+    # Compare two PDFs rendered with the current config
+    python src/render_equivalence.py compare old.pdf new.pdf
+
+    # Render a workbook through every path and check they agree (exit status 1 if not)
+    python src/render_equivalence.py check --workbook data/sample.xlsx --limit 200
+
+    # Check every path, legacy included, against the output of an earlier release
+    python src/render_equivalence.py check --workbook data/sample.xlsx --limit 200 --reference release.pdf
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+from collections import namedtuple
+
+from pypdf import PdfReader
+from pypdf.generic import ContentStream
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+from simple_labels import LabelStyle, generate_labels, register_cjk_font, resolve_config
+
+
+TextRun = namedtuple("TextRun", "page x y font size color text")
+DrawOp = namedtuple("DrawOp", "page kind points line_width stroke_color fill_color")
+
+RENDER_PATHS = ("legacy", "compiled", "static_forms", "parallel", "parts", "stream")
+
+# Points; generous next to float noise, far below anything visible in print
+DEFAULT_TOLERANCE = 0.05
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+_PAINT_OPS = {
+    b"S": "stroke", b"s": "stroke",
+    b"f": "fill", b"F": "fill", b"f*": "fill",
+    b"B": "fill_stroke", b"B*": "fill_stroke", b"b": "fill_stroke", b"b*": "fill_stroke",
+}
+
+
+def _multiply(m, n):
+    """Matrix product m x n of PDF matrices [a b c d e f]."""
+    a, b, c, d, e, f = m
+    A, B, C, D, E, F = n
+    return (a * A + b * C, a * B + b * D, c * A + d * C, c * B + d * D, e * A + f * C + E, e * B + f * D + F)
+
+
+def _apply(m, x, y):
+    return (m[0] * x + m[2] * y + m[4], m[1] * x + m[3] * y + m[5])
+
+
+def _scale(m):
+    # Uniform scale factor of a matrix, for line widths
+    return math.sqrt(abs(m[0] * m[3] - m[1] * m[2]))
+
+
+def _raw_bytes(operand):
+    original = getattr(operand, "original_bytes", None)
+    if original is not None:
+        return bytes(original)
+    return bytes(operand) if isinstance(operand, bytes) else str(operand).encode("latin-1", "replace")
+
+
+def _parse_to_unicode(data):
+    """Return (code length in bytes, {code bytes: text}) from a ToUnicode CMap."""
+    def hex_bytes(text):
+        return bytes.fromhex(text)
+
+    def hex_text(text):
+        return bytes.fromhex(text).decode("utf-16-be", "replace")
+
+    code_length = 1
+    codespace = re.search(r"begincodespacerange\s*<([0-9A-Fa-f]+)>", data)
+    if codespace:
+        code_length = len(codespace.group(1)) // 2
+
+    mapping = {}
+    for block in re.findall(r"beginbfchar(.*?)endbfchar", data, re.S):
+        for source, target in re.findall(r"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]*)>", block):
+            mapping[hex_bytes(source)] = hex_text(target)
+    for block in re.findall(r"beginbfrange(.*?)endbfrange", data, re.S):
+        for start, end, target in re.findall(r"<([0-9A-Fa-f]+)>\s*<([0-9A-Fa-f]+)>\s*(<[0-9A-Fa-f]*>|\[[^\]]*\])", block):
+            first, last = int(start, 16), int(end, 16)
+            width = len(start) // 2
+            if target.startswith("["):
+                targets = re.findall(r"<([0-9A-Fa-f]*)>", target)
+                for offset, value in enumerate(targets[:last - first + 1]):
+                    mapping[(first + offset).to_bytes(width, "big")] = hex_text(value)
+            else:
+                base = int(target[1:-1], 16)
+                target_width = len(target[1:-1]) // 2
+                for offset in range(last - first + 1):
+                    mapping[(first + offset).to_bytes(width, "big")] = (
+                        (base + offset).to_bytes(target_width, "big").decode("utf-16-be", "replace"))
+    return code_length, mapping
+
+
+class _Font:
+    """Name and text decoding of one font resource."""
+
+    def __init__(self, font):
+        # Subset fonts are named like AAAAAB+SimSun, with a prefix that varies per document
+        self.name = re.sub(r"^[A-Z]{6}\+", "", str(font.get("/BaseFont", "")).lstrip("/"))
+        self._code_length, self._mapping = 1, None
+        if "/ToUnicode" in font:
+            data = font["/ToUnicode"].get_object().get_data().decode("latin-1")
+            self._code_length, self._mapping = _parse_to_unicode(data)
+
+    def decode(self, raw):
+        if self._mapping is None:
+            # The standard fonts ReportLab writes use WinAnsiEncoding
+            return raw.decode("cp1252", "replace")
+        step = self._code_length
+        return "".join(self._mapping.get(raw[i:i + step], "\ufffd") for i in range(0, len(raw), step))
+
+
+class _State:
+    __slots__ = ("ctm", "font", "font_size", "leading", "fill_color", "stroke_color", "line_width")
+
+    def __init__(self):
+        self.ctm = IDENTITY
+        self.font = None
+        self.font_size = 0.0
+        self.leading = 0.0
+        self.fill_color = (0.0,)
+        self.stroke_color = (0.0,)
+        self.line_width = 1.0
+
+    def copy(self):
+        state = _State()
+        for name in self.__slots__:
+            setattr(state, name, getattr(self, name))
+        return state
+
+
+class _PageWalker:
+    """Collects the text runs and drawing ops of one page."""
+
+    def __init__(self, reader, page_number):
+        self.reader = reader
+        self.page_number = page_number
+        self.elements = []
+        self._fonts = {}
+
+    def _font(self, resources, name):
+        fonts = resources.get("/Font", {}) if resources else {}
+        ref = fonts.get(name)
+        if ref is None:
+            return None
+        key = getattr(ref, "idnum", None) or id(ref.get_object())
+        if key not in self._fonts:
+            self._fonts[key] = _Font(ref.get_object())
+        return self._fonts[key]
+
+    def walk(self, contents, resources, state=None, depth=0):
+        state = state or _State()
+        stack = []
+        path = []
+        text_matrix = line_matrix = IDENTITY
+
+        def show(raw):
+            if state.font is None:
+                return
+            text = state.font.decode(raw)
+            if not text:
+                return
+            matrix = _multiply(text_matrix, state.ctm)
+            x, y = _apply(matrix, 0, 0)
+            self.elements.append(TextRun(self.page_number, x, y, state.font.name,
+                                         state.font_size * math.hypot(matrix[2], matrix[3]),
+                                         state.fill_color, text))
+
+        def move_line(tx, ty):
+            nonlocal text_matrix, line_matrix
+            line_matrix = _multiply((1.0, 0.0, 0.0, 1.0, tx, ty), line_matrix)
+            text_matrix = line_matrix
+
+        for operands, operator in ContentStream(contents, self.reader).operations:
+            values = operands
+            if operator == b"q":
+                stack.append(state.copy())
+            elif operator == b"Q":
+                if stack:
+                    state = stack.pop()
+            elif operator == b"cm":
+                state.ctm = _multiply(tuple(float(v) for v in values), state.ctm)
+            elif operator == b"w":
+                state.line_width = float(values[0])
+            elif operator in (b"rg", b"g", b"k", b"sc", b"scn"):
+                state.fill_color = tuple(round(float(v), 4) for v in values if not hasattr(v, "startswith"))
+            elif operator in (b"RG", b"G", b"K", b"SC", b"SCN"):
+                state.stroke_color = tuple(round(float(v), 4) for v in values if not hasattr(v, "startswith"))
+            elif operator == b"BT":
+                text_matrix = line_matrix = IDENTITY
+            elif operator == b"Tf":
+                state.font = self._font(resources, values[0])
+                state.font_size = float(values[1])
+            elif operator == b"TL":
+                state.leading = float(values[0])
+            elif operator == b"Tm":
+                text_matrix = line_matrix = tuple(float(v) for v in values)
+            elif operator == b"Td":
+                move_line(float(values[0]), float(values[1]))
+            elif operator == b"TD":
+                state.leading = -float(values[1])
+                move_line(float(values[0]), float(values[1]))
+            elif operator == b"T*":
+                move_line(0.0, -state.leading)
+            elif operator == b"Tj":
+                show(_raw_bytes(values[0]))
+            elif operator == b"TJ":
+                show(b"".join(_raw_bytes(item) for item in values[0] if not isinstance(item, (int, float))))
+            elif operator in (b"'", b'"'):
+                move_line(0.0, -state.leading)
+                show(_raw_bytes(values[-1]))
+            elif operator == b"m" or operator == b"l":
+                path.append(_apply(state.ctm, float(values[0]), float(values[1])))
+            elif operator in (b"c", b"v", b"y"):
+                coords = [float(v) for v in values]
+                path.extend(_apply(state.ctm, coords[i], coords[i + 1]) for i in range(0, len(coords), 2))
+            elif operator == b"re":
+                x, y, width, height = (float(v) for v in values)
+                path.extend(_apply(state.ctm, px, py)
+                            for px, py in ((x, y), (x + width, y), (x + width, y + height), (x, y + height)))
+            elif operator in _PAINT_OPS:
+                kind = _PAINT_OPS[operator]
+                self.elements.append(DrawOp(
+                    self.page_number, kind, tuple(path),
+                    state.line_width * _scale(state.ctm) if kind != "fill" else None,
+                    state.stroke_color if kind != "fill" else None,
+                    state.fill_color if kind != "stroke" else None))
+                path = []
+            elif operator == b"n":
+                path = []
+            elif operator == b"Do":
+                xobjects = resources.get("/XObject", {}) if resources else {}
+                xobject = xobjects.get(values[0])
+                xobject = xobject.get_object() if xobject is not None else None
+                if xobject is not None and xobject.get("/Subtype") == "/Form" and depth < 16:
+                    form_state = state.copy()
+                    matrix = tuple(float(v) for v in xobject.get("/Matrix", IDENTITY))
+                    form_state.ctm = _multiply(matrix, state.ctm)
+                    form_resources = xobject.get("/Resources")
+                    form_resources = form_resources.get_object() if form_resources is not None else resources
+                    self.walk(xobject, form_resources, form_state, depth + 1)
+        return self.elements
+
+
+def _readers(source):
+    if isinstance(source, (list, tuple)):
+        for item in source:
+            yield from _readers(item)
+    elif isinstance(source, (bytes, bytearray)):
+        yield PdfReader(io.BytesIO(bytes(source)))
+    else:
+        yield PdfReader(source)
+
+
+def extract_elements(source):
+    """
+    Read the text runs and drawing ops of a PDF.
+
+    Args:
+        source: Path of a PDF, its bytes, or a list of those read as one document
+            (e.g. the part files of a split run, in order).
+
+    Returns:
+        list: One list of TextRun and DrawOp tuples per page, in drawing order.
+    """
+    pages = []
+    for reader in _readers(source):
+        for page in reader.pages:
+            resources = page.get("/Resources")
+            resources = resources.get_object() if resources is not None else {}
+            contents = page.get_contents()
+            walker = _PageWalker(reader, len(pages))
+            pages.append(walker.walk(contents, resources) if contents is not None else [])
+    return pages
+
+
+def label_layout(config_file=None, temp_config_overrides=None):
+    """Return (slot corners, label width, label height) for a label config, in points."""
+    config = resolve_config(config_file, temp_config_overrides)
+    # The CJK font must be registered for the style to resolve the same fonts as the renderers
+    register_cjk_font(config, config_file)
+    style = LabelStyle(config, page_size=A4)
+    return style.slots, style.width, style.height
+
+
+def _anchor(element):
+    if isinstance(element, TextRun):
+        return element.x, element.y
+    xs = [x for x, _ in element.points] or [0.0]
+    ys = [y for _, y in element.points] or [0.0]
+    return (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+
+
+def group_by_label(pages, slots, width, height):
+    """
+    Assign each element to the label slot it belongs to.
+
+    Slots can overlap a little (e.g. two 103 mm columns on A4) and long address
+    blocks run past the bottom of their label, so an element goes to the slot
+    its anchor lies deepest inside, or nearest to when it is outside them all.
+    An address line that runs into the next slot is attributed to that slot;
+    that happens the same way in both PDFs, so comparisons are unaffected.
+
+    Returns:
+        dict: Label index (page * slots per page + slot) -> elements.
+    """
+    labels = {}
+    for page_number, elements in enumerate(pages):
+        for element in elements:
+            x, y = _anchor(element)
+            depths = [min(x - slot_x, slot_x + width - x, y - slot_y, slot_y + height - y)
+                      for slot_x, slot_y in slots]
+            slot = max(range(len(slots)), key=depths.__getitem__)
+            labels.setdefault(page_number * len(slots) + slot, []).append(element)
+    return labels
+
+
+def _close(a, b, tolerance):
+    if a is None or b is None:
+        return a is b
+    return abs(a - b) <= tolerance
+
+
+def elements_match(expected, actual, tolerance=DEFAULT_TOLERANCE):
+    """Whether two elements are the same within tolerance (points) for positions, sizes and widths."""
+    if type(expected) is not type(actual):
+        return False
+    if isinstance(expected, TextRun):
+        return (expected.text == actual.text and expected.font == actual.font and expected.color == actual.color
+                and _close(expected.size, actual.size, tolerance)
+                and _close(expected.x, actual.x, tolerance) and _close(expected.y, actual.y, tolerance))
+    return (expected.kind == actual.kind and len(expected.points) == len(actual.points)
+            and expected.stroke_color == actual.stroke_color and expected.fill_color == actual.fill_color
+            and _close(expected.line_width, actual.line_width, tolerance)
+            and all(_close(ex, ax, tolerance) and _close(ey, ay, tolerance)
+                    for (ex, ey), (ax, ay) in zip(expected.points, actual.points)))
+
+
+def describe(element):
+    """Short readable form of an element for difference reports."""
+    if isinstance(element, TextRun):
+        return f"text {element.text!r} at ({element.x:.2f}, {element.y:.2f}) in {element.font} {element.size:g}"
+    points = " ".join(f"({x:.2f}, {y:.2f})" for x, y in element.points)
+    return f"{element.kind} path {points}"
+
+
+def compare_elements(expected_pages, actual_pages, slots, width, height, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare the pages of two PDFs label by label.
+
+    Args:
+        expected_pages, actual_pages (list): extract_elements() results.
+        slots, width, height: The page grid, see label_layout().
+        tolerance (float): Allowed difference in points for positions, sizes and line widths.
+
+    Returns:
+        list: Readable differences; empty when the PDFs are equivalent.
+    """
+    differences = []
+    if len(expected_pages) != len(actual_pages):
+        differences.append(f"page count differs: {len(expected_pages)} != {len(actual_pages)}")
+
+    expected_labels = group_by_label(expected_pages, slots, width, height)
+    actual_labels = group_by_label(actual_pages, slots, width, height)
+    for key in sorted(set(expected_labels) | set(actual_labels)):
+        where = f"label {key} (page {key // len(slots) + 1}, slot {key % len(slots) + 1})"
+        unmatched = list(actual_labels.get(key, []))
+        for element in expected_labels.get(key, []):
+            match = next((i for i, candidate in enumerate(unmatched) if elements_match(element, candidate, tolerance)),
+                         None)
+            if match is None:
+                differences.append(f"{where}: missing {describe(element)}")
+            else:
+                del unmatched[match]
+        differences.extend(f"{where}: unexpected {describe(element)}" for element in unmatched)
+    return differences
+
+
+def compare_pdfs(expected, actual, config_file=None, temp_config_overrides=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare two label PDFs (paths, bytes or lists of part files) label by label.
+
+    Returns:
+        list: Readable differences; empty when the PDFs are equivalent.
+    """
+    slots, width, height = label_layout(config_file, temp_config_overrides)
+    return compare_elements(extract_elements(expected), extract_elements(actual), slots, width, height, tolerance)
+
+
+def _legacy_hex_to_color(hex_str):
+    hex_str = str(hex_str).lstrip('#')
+    if len(hex_str) == 6:
+        try:
+            return colors.Color(int(hex_str[0:2], 16)/255, int(hex_str[2:4], 16)/255, int(hex_str[4:6], 16)/255)
+        except ValueError:
+            return colors.black
+    return colors.black
+
+
+def _legacy_create_label(c, data, x, y, width, height, config):
+    """
+    Frozen copy of create_label as it was before the compiled style, static forms
+    and the width tables were introduced.
+
+    Everything is looked up in the config for every label and every width comes
+    from c.stringWidth, so the reference shares no layout or measuring code with
+    the renderers it checks. Don't refactor this to use simple_labels helpers.
+    """
+    selected_fields = config.get("display_selected_fields_on_label") or config.get("selected_fields_for_label")
+
+    fonts_config = config.get("fonts", {})
+    colors_config = config.get("colors", {})
+
+    default_title_font = {"name": "Helvetica-Bold", "size": 10}
+    default_body_font = {"name": "Helvetica", "size": 9}
+    default_publication_font = {"name": "Helvetica-Bold", "size": 14}
+
+    publication_font_config = fonts_config.get("publication", default_publication_font)
+    title_font_config = fonts_config.get("title", default_title_font)
+    body_font_config = fonts_config.get("body", default_body_font)
+
+    # Address font: the CJK font when it is configured and registered
+    address_font_name = body_font_config.get("name", default_body_font["name"])
+    address_font_size = body_font_config.get("size", default_body_font["size"])
+    cjk_font_config = fonts_config.get("cjk")
+    if cjk_font_config and cjk_font_config.get("name"):
+        try:
+            pdfmetrics.getFont(cjk_font_config["name"])
+            address_font_name = cjk_font_config["name"]
+            address_font_size = cjk_font_config.get("size", body_font_config.get("size", default_body_font["size"]))
+        except KeyError:
+            pass
+
+    text_color_hex = colors_config.get("text", "#000000")
+    title_color = _legacy_hex_to_color(colors_config.get("title", text_color_hex))
+    body_color = _legacy_hex_to_color(colors_config.get("body", text_color_hex))
+    border_color = _legacy_hex_to_color(colors_config.get("border", "#000000"))
+
+    divider_x = x + (width * 0.75)
+
+    if config.get("show_border", True):
+        c.setStrokeColor(border_color)
+        c.setLineWidth(config.get("border_width", 0.5))
+        c.rect(x, y, width, height)
+        c.line(divider_x, y, divider_x, y + height)
+
+    padding = 5
+
+    # ---------- LEFT SIDE CONTENT ----------
+    def field_text(key):
+        raw_val = data.get(key)
+        return (str(raw_val) if pd.notna(raw_val) else "").strip()
+
+    post_line = ""
+    if selected_fields:
+        person_name = " ".join(filter(None, (field_text(key) for key in ["TITLE1", "NAME1", "surname"]
+                                             if key in selected_fields))).strip()
+        if "post" in selected_fields:
+            post_line = field_text("post")
+    else:
+        person_name = " ".join(filter(None, (field_text(key) for key in ["TITLE1", "NAME1", "surname"]))).strip()
+
+    person_name_font = title_font_config.get("name", default_title_font["name"])
+    person_name_size = title_font_config.get("size", default_title_font["size"])
+    if cjk_font_config and cjk_font_config.get("name") and address_font_name == cjk_font_config["name"]:
+        person_name_font = address_font_name
+        person_name_size = cjk_font_config.get("size", title_font_config.get("size", default_title_font["size"]))
+
+    try:
+        c.setFont(person_name_font, person_name_size)
+    except Exception:
+        c.setFont(default_title_font["name"], default_title_font["size"])
+    c.setFillColor(title_color)
+
+    name_y = y + height - 15
+    c.drawString(x + padding, name_y, person_name)
+
+    try:
+        c.setFont(address_font_name, address_font_size)
+    except Exception:
+        c.setFont(body_font_config["name"], body_font_config["size"])
+    c.setFillColor(body_color)
+
+    address_lines = [post_line] if post_line else []
+    if selected_fields:
+        address_field_order = ["sub_unit", "sub_unit_chi", "UNIT_NAME", "unit_name_chi", "co_name", "co_name_chi",
+                               "add1", "add2", "state"]
+        address_lines += [field_text(key) for key in address_field_order if key in selected_fields]
+    else:
+        address_lines += [field_text(key) for key in ["add1", "add2", "state"]]
+
+    current_line_y = name_y - 12
+    for line_text in address_lines:
+        if not line_text.strip():
+            continue
+        c.drawString(x + padding, current_line_y, line_text)
+        current_line_y -= address_font_size + 3
+
+    # ---------- RIGHT SIDE CONTENT ----------
+    raw_receive_id = data.get("RECEIVE_ID")
+    receive_id_str = (str(int(raw_receive_id)) if pd.notna(raw_receive_id) else "").strip()
+    receipt_text = f"Rec. # {receive_id_str}" if receive_id_str else ""
+    if receipt_text:
+        try:
+            c.setFont(body_font_config["name"], body_font_config["size"] - 1)
+        except Exception:
+            c.setFont("Helvetica", 8)
+        receipt_width = c.stringWidth(receipt_text, body_font_config["name"], body_font_config["size"] - 1)
+        c.drawString(divider_x + (width * 0.25 - receipt_width) / 2, name_y, receipt_text)
+
+    publication_font_name = publication_font_config.get("name", default_publication_font["name"])
+    publication_font_size = publication_font_config.get("size", default_publication_font["size"])
+    try:
+        c.setFont(publication_font_name, publication_font_size)
+    except Exception:
+        c.setFont(default_publication_font["name"], default_publication_font["size"])
+
+    right_center_x = divider_x + ((width * 0.25) / 2)
+    right_center_y = y + height - (height / 2)
+
+    custom_right_text = str(config.get("custom_right_panel_text", ""))[:3]
+    final_right_text = custom_right_text
+    display_codes_on_label = config.get("display_publication_codes_on_label")
+    if display_codes_on_label:
+        publications_with_copies = []
+        for code_key in display_codes_on_label:
+            if code_key in data and pd.notna(data[code_key]):
+                try:
+                    val = int(data[code_key])
+                    if val >= 1:
+                        publications_with_copies.append(f"{val} {code_key}")
+                except (ValueError, TypeError):
+                    continue
+        if publications_with_copies:
+            prefix = " ".join(publications_with_copies)
+            final_right_text = f"{prefix} {custom_right_text}" if custom_right_text else prefix
+        elif not custom_right_text:
+            final_right_text = ""
+
+    text_width = c.stringWidth(final_right_text, publication_font_name, publication_font_size)
+    c.drawString(right_center_x - (text_width / 2), right_center_y, final_right_text)
+
+    # ---------- BULLETIN SECTION ----------
+    bulletin_font_name = body_font_config.get("name", default_body_font["name"])
+    bulletin_font_size = max(body_font_config.get("size", default_body_font["size"]) - 1, 6)
+    try:
+        c.setFont(bulletin_font_name, bulletin_font_size)
+    except Exception:
+        c.setFont(default_body_font["name"], max(default_body_font["size"] - 1, 6))
+    c.setFillColor(body_color)
+
+    bulletin_text = str(config.get("bulletin_text", "Bulletin"))
+    bulletin_number_text = str(config.get("bulletin_number_text", "No.2-2026"))
+
+    bulletin_width = c.stringWidth(bulletin_text, bulletin_font_name, bulletin_font_size)
+    bulletin_y = right_center_y - 15
+    c.drawString(right_center_x - (bulletin_width / 2), bulletin_y, bulletin_text)
+
+    bulletin_number_width = c.stringWidth(bulletin_number_text, bulletin_font_name, bulletin_font_size)
+    c.drawString(right_center_x - (bulletin_number_width / 2), bulletin_y - 10, bulletin_number_text)
+
+
+def render_legacy(data, output_path, config_file=None, temp_config_overrides=None):
+    """
+    Render labels with the frozen pre-optimization create_label, as a reference.
+
+    Slot positions are worked out from the config directly, so no path under test
+    shares its layout, style or width code with the reference.
+
+    Returns:
+        int: Number of labels generated.
+    """
+    config = resolve_config(config_file, temp_config_overrides)
+    register_cjk_font(config, config_file)
+
+    label_width = config["label_width"] * mm
+    label_height = config["label_height"] * mm
+    page_width, page_height = A4
+    columns, rows = config["columns"], config["rows"]
+    margin_left, margin_right = config["margin_left"] * mm, config["margin_right"] * mm
+    margin_top, margin_bottom = config["margin_top"] * mm, config["margin_bottom"] * mm
+    horizontal_gap = (page_width - margin_left - margin_right - columns * label_width) / (columns - 1) if columns > 1 else 0
+    vertical_gap = (page_height - margin_top - margin_bottom - rows * label_height) / (rows - 1) if rows > 1 else 0
+
+    records = list(data)
+    c = canvas.Canvas(output_path, pagesize=A4)
+    for label_index, record in enumerate(records):
+        slot = label_index % (rows * columns)
+        if slot == 0 and label_index > 0:
+            c.showPage()
+        row, col = divmod(slot, columns)
+        x = margin_left + col * (label_width + horizontal_gap)
+        y = page_height - margin_top - row * (label_height + vertical_gap) - label_height
+
+        _legacy_create_label(c, record, x, y, label_width, label_height, config)
+    c.save()
+    return len(records)
+
+
+def render_path(name, records, work_dir, config_file=None, temp_config_overrides=None):
+    """
+    Render records through one of RENDER_PATHS.
+
+    Returns:
+        The output for extract_elements: a path, bytes or a list of part file paths.
+    """
+    output_path = os.path.join(work_dir, f"{name}.pdf")
+    kwargs = dict(config_file=config_file, temp_config_overrides=temp_config_overrides)
+    if name == "legacy":
+        render_legacy(records, output_path, **kwargs)
+    elif name == "compiled":
+        generate_labels(records, output_path, static_forms=False, **kwargs)
+    elif name == "static_forms":
+        generate_labels(records, output_path, static_forms=True, **kwargs)
+    elif name == "parallel":
+        from parallel_render import generate_labels_parallel
+        # One page per shard, so even small record sets cross shard boundaries
+        return generate_labels_parallel(records, output_path, workers=2, pages_per_shard=1, **kwargs)
+    elif name == "parts":
+        generate_labels(records, output_path, pages_per_file=1, **kwargs)
+        with open(f"{os.path.splitext(output_path)[0]}_manifest.json", encoding="utf-8") as f:
+            return [part["path"] for part in json.load(f)["parts"]]
+    elif name == "stream":
+        stream = io.BytesIO()
+        generate_labels(records, stream, **kwargs)
+        return stream.getvalue()
+    else:
+        raise ValueError(f"Unknown rendering path '{name}'; choose from {', '.join(RENDER_PATHS)}")
+    return output_path
+
+
+def check_equivalence(records, config_file=None, temp_config_overrides=None, paths=RENDER_PATHS,
+                      reference="legacy", tolerance=DEFAULT_TOLERANCE, reference_pdf=None):
+    """
+    Render records through each path and compare every output with the reference path.
+
+    Args:
+        reference_pdf (str, optional): Compare with this PDF instead, e.g. the output of an
+            earlier release for the same records. Every path, reference included, is checked.
+
+    Returns:
+        dict: Path name -> list of differences from the reference (empty when equivalent).
+    """
+    slots, width, height = label_layout(config_file, temp_config_overrides)
+    with tempfile.TemporaryDirectory(prefix="label_equivalence_") as work_dir:
+        if reference_pdf is not None:
+            expected = extract_elements(reference_pdf)
+            reference = None
+        else:
+            expected = extract_elements(render_path(reference, records, work_dir, config_file, temp_config_overrides))
+        results = {}
+        for name in paths:
+            if name == reference:
+                continue
+            actual = extract_elements(render_path(name, records, work_dir, config_file, temp_config_overrides))
+            results[name] = compare_elements(expected, actual, slots, width, height, tolerance)
+    return results
+
+
+def _print_differences(differences, limit=20):
+    for difference in differences[:limit]:
+        print(f"  {difference}")
+    if len(differences) > limit:
+        print(f"  ... and {len(differences) - limit} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that label PDFs from different renderers are equivalent.")
+    parser.add_argument("--config", default=None, help="Label config file (default: the built-in defaults)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed difference in points (default: {DEFAULT_TOLERANCE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compare = commands.add_parser("compare", help="Compare two PDFs label by label")
+    compare.add_argument("expected", help="Reference PDF")
+    compare.add_argument("actual", help="PDF to check")
+
+    check = commands.add_parser("check", help="Render records through every path and compare with the legacy path")
+    source = check.add_mutually_exclusive_group()
+    source.add_argument("--workbook", help="Workbook to take the records from")
+    source.add_argument("--rows", type=int, default=100, help="Synthetic records to render (default: 100)")
+    check.add_argument("--limit", type=int, default=None, help="Render at most this many records")
+    check.add_argument("--paths", default=",".join(RENDER_PATHS),
+                       help=f"Rendering paths to compare (default: {','.join(RENDER_PATHS)})")
+    check.add_argument("--seed", type=int, default=0, help="Random seed for synthetic records")
+    check.add_argument("--reference", default=None,
+                       help="Compare with this PDF, rendered from the same records by an earlier release, "
+                            "instead of the legacy path")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        differences = compare_pdfs(args.expected, args.actual, args.config, tolerance=args.tolerance)
+        if differences:
+            print(f"{len(differences)} difference(s):")
+            _print_differences(differences)
+            sys.exit(1)
+        print("Equivalent.")
+        return
+
+    if args.workbook:
+        from simple_labels import load_data_from_excel
+        df = load_data_from_excel(args.workbook)
+        if df is None:
+            sys.exit(1)
+    else:
+        from synthetic_data import generate_members
+        df = generate_members(args.rows, seed=args.seed)
+    records = df.to_dict(orient="records")[:args.limit]
+
+    results = check_equivalence(records, args.config, paths=args.paths.split(","), tolerance=args.tolerance,
+                                reference_pdf=args.reference)
+    failed = False
+    for name, differences in results.items():
+        print(f"{name}: {'equivalent' if not differences else f'{len(differences)} difference(s)'}")
+        _print_differences(differences)
+        failed = failed or bool(differences)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
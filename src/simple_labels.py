@@ -13,13 +13,52 @@ from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import pandas as pd # Add pandas import
+import numpy as np
+import openpyxl
 import io
+import itertools
 import traceback
 import json
+import math
 import os
+import time
 
+import filter_engine
+import font_cache
+import ingest_cache
+import memory_profile
+import metrics
+from text_metrics import WidthEngine
 
-def load_data_from_excel(excel_file_path, category_filter=None, category_exclude_filter=None, status_filter=None, status_exclude_filter=None, mail_zone_filter=None, publication_columns=None, filter_mode="OR"):
+
+# Columns the filters in load_data_from_excel may read
+FILTER_COLUMNS = ["category_ids", "status_ids", "MAIL_ZONE"]
+
+# Fields create_label falls back to when the config selects none
+DEFAULT_LABEL_FIELDS = ["TITLE1", "NAME1", "surname", "add1", "add2", "state"]
+
+
+def required_columns(config, publication_columns=None):
+    """
+    Work out which sheet columns are needed to filter and render labels.
+    
+    Args:
+        config (dict): Effective label configuration (after any overrides).
+        publication_columns (list, optional): Publication columns used by the filter.
+        
+    Returns:
+        set: Column names read by the filters and by create_label.
+    """
+    selected_fields = config.get("display_selected_fields_on_label") or config.get("selected_fields_for_label")
+    columns = set(selected_fields or DEFAULT_LABEL_FIELDS)
+    columns.add("RECEIVE_ID")
+    columns.update(FILTER_COLUMNS)
+    columns.update(config.get("display_publication_codes_on_label") or [])
+    columns.update(publication_columns or [])
+    return columns
+
+
+def load_data_from_excel(excel_file_path, category_filter=None, category_exclude_filter=None, status_filter=None, status_exclude_filter=None, mail_zone_filter=None, publication_columns=None, filter_mode="OR", cache_dir=None, columns=None, filter_cache=None):
     """
     Load data from an Excel file using pandas.
     
@@ -33,115 +72,50 @@ def load_data_from_excel(excel_file_path, category_filter=None, category_exclude
         publication_columns (list, optional): A list of data column names (e.g. ["BE", "BC"]) to filter by.
             A row is kept if any of these columns have a positive integer value (>=1).
         filter_mode (str, optional): "OR" or "AND". Controls whether filters require any match (OR) or all matches (AND).
+        cache_dir (str, optional): Directory of the ingest cache. When given, the workbook is parsed
+            once and later loads read the cached columnar copy (see ingest_cache).
+        columns (collection, optional): Only read these columns (see required_columns).
+            Names missing from the sheet are ignored. By default every column is read.
+        filter_cache (filter_cache.FilterCache, optional): Reuse the matching row positions of
+            an earlier load of the same workbook contents with equivalent filters. Only
+            used together with cache_dir.
         
     Returns:
         pandas.DataFrame: DataFrame containing the Excel data.
     """
     try:
-        df = pd.read_excel(excel_file_path)
-          # Apply category filter if provided
-        if category_filter:
-            if 'category_ids' in df.columns:
-                # Split the filter into individual categories
-                filter_categories = [cat.strip() for cat in category_filter.split(',')]
-                
-                if filter_mode == "AND":
-                    # AND mode: row must contain ALL specified categories
-                    category_mask = df['category_ids'].astype(str).apply(
-                        lambda x: all(cat in [c.strip() for c in x.split(',')] for cat in filter_categories)
-                    )
-                else:
-                    # OR mode: row must contain ANY of the specified categories
-                    category_mask = df['category_ids'].astype(str).apply(
-                        lambda x: any(cat in [c.strip() for c in x.split(',')] for cat in filter_categories)
-                    )
-                df = df[category_mask]
-            else:
-                print("Warning: 'category_ids' column not found in Excel sheet. Category filter not applied.")
-
-        # Apply category exclusion filter if provided
-        if category_exclude_filter:
-            if 'category_ids' in df.columns:
-                # Split the exclusion filter into individual categories
-                exclude_categories = [cat.strip() for cat in category_exclude_filter.split(',')]
-                
-                # Create a mask to exclude rows with any of the specified categories
-                exclude_mask = df['category_ids'].astype(str).apply(
-                    lambda x: not any(cat in [c.strip() for c in x.split(',')] for cat in exclude_categories)
-                )
-                df = df[exclude_mask]
-            else:
-                print("Warning: 'category_ids' column not found in Excel sheet. Category exclusion filter not applied.")
-              # Apply status filter if provided
-        if status_filter:
-            if 'status_ids' in df.columns:
-                # Split the filter into individual status IDs
-                filter_statuses = [status.strip() for status in status_filter.split(',')]
-                
-                if filter_mode == "AND":
-                    # AND mode: row must contain ALL specified statuses
-                    status_mask = df['status_ids'].astype(str).apply(
-                        lambda x: all(status in [s.strip() for s in x.split(',')] for status in filter_statuses)
-                    )
-                else:
-                    # OR mode: row must contain ANY of the specified statuses
-                    status_mask = df['status_ids'].astype(str).apply(
-                        lambda x: any(status in [s.strip() for s in x.split(',')] for status in filter_statuses)
-                    )
-                df = df[status_mask]
-            else:
-                print("Warning: 'status_ids' column not found in Excel sheet. Status filter not applied.")
-
-        # Apply status exclusion filter if provided
-        if status_exclude_filter:
-            if 'status_ids' in df.columns:
-                # Split the exclusion filter into individual status IDs
-                exclude_statuses = [status.strip() for status in status_exclude_filter.split(',')]
-                
-                # Create a mask to exclude rows with any of the specified status IDs
-                exclude_mask = df['status_ids'].astype(str).apply(
-                    lambda x: not any(status in [s.strip() for s in x.split(',')] for status in exclude_statuses)
-                )
-                df = df[exclude_mask]
+        with metrics.timer("ingest"):
+            if cache_dir:
+                df = ingest_cache.read_excel_cached(excel_file_path, cache_dir, columns=columns)
+            elif columns is not None:
+                df = pd.read_excel(excel_file_path, usecols=lambda name: name in columns)
             else:
-                print("Warning: 'status_ids' column not found in Excel sheet. Status exclusion filter not applied.")
+                df = pd.read_excel(excel_file_path)
 
-        # Apply mail zone filter if provided
-        if mail_zone_filter:
-            if 'MAIL_ZONE' in df.columns:
-                # Assuming MAIL_ZONE is stored as a number in Excel but filter is string
-                df = df[df['MAIL_ZONE'].astype(str) == mail_zone_filter]
-            else:
-                print("Warning: 'MAIL_ZONE' column not found in Excel sheet. Mail zone filter not applied.")
-
-        # Apply publication filter if provided
-        if publication_columns and isinstance(publication_columns, list) and any(publication_columns): # ensure list is not empty
-            valid_publication_columns = [col for col in publication_columns if col in df.columns]
-            if valid_publication_columns:
-                # Filter rows based on CPRO guideline: a positive integer in a publication column means subscription.
-                # An empty cell, '0', or non-numeric text means no subscription.
-                
-                # Define a helper function to check if a cell value indicates subscription (is >= 1).
-                def is_subscribed(val):
-                    num_val = pd.to_numeric(val, errors='coerce') # Converts to numeric, non-convertibles become NaN
-                    # Check if num_val is not NaN and is greater than or equal to 1
-                    return pd.notna(num_val) and num_val >= 1
-
-                # Apply this check element-wise to the relevant publication columns.
-                # Replace applymap with apply and Series.map for future compatibility
-                subscription_status_df = df[valid_publication_columns].apply(lambda col_series: col_series.map(is_subscribed))
-                
-                # Create a final mask: a row is kept if it's subscribed to *any* of the selected publications.
-                final_mask = subscription_status_df.any(axis=1)
-                df = df[final_mask]
-            else:
-                # If no valid publication columns are found (e.g., all specified columns are missing)
-                # then return an empty DataFrame or handle as an error/warning.
-                # For now, returning an empty DataFrame if no valid columns are present.
-                # This could also be a place to log a warning.
-                print(f"Warning: None of the specified publication columns {publication_columns} found in the Excel sheet. Returning no data for this filter.")
-                return pd.DataFrame()
+        filters = dict(
+            category_filter=category_filter,
+            category_exclude_filter=category_exclude_filter,
+            status_filter=status_filter,
+            status_exclude_filter=status_exclude_filter,
+            mail_zone_filter=mail_zone_filter,
+            publication_columns=publication_columns,
+            filter_mode=filter_mode
+        )
 
+        with metrics.timer("filter"):
+            # Cached positions index the full sheet, which is what the ingest cache always holds
+            cache_key = None
+            if filter_cache is not None and cache_dir:
+                cache_key = filter_cache.make_key(ingest_cache.file_sha256(excel_file_path), **filters)
+                positions = filter_cache.get(cache_key)
+                if positions is not None:
+                    return df.iloc[positions]
+
+            # Apply the category/status/mail zone/publication filters as one vectorized mask
+            mask = filter_engine.filter_mask(df, **filters)
+            if cache_key is not None:
+                filter_cache.put(cache_key, np.flatnonzero(mask))
+            df = df[mask]
 
         return df
         
@@ -150,292 +124,466 @@ def load_data_from_excel(excel_file_path, category_filter=None, category_exclude
         return pd.DataFrame() # Return an empty DataFrame on error
 
 
-def create_label(c, data, x, y, width, height, config=None):
+def iter_records_from_excel(excel_file_path, category_filter=None, category_exclude_filter=None, status_filter=None, status_exclude_filter=None, mail_zone_filter=None, publication_columns=None, filter_mode="OR", columns=None):
     """
-    Create a single label on the canvas in the style of Legislative Council Complex.
+    Stream filtered records from an Excel file one row at a time.
+    
+    Unlike load_data_from_excel, no DataFrame is built: the sheet is read with
+    openpyxl in read-only mode and each row is filtered and yielded as a dict,
+    so memory stays flat however large the sheet is. Completely empty rows are
+    skipped. The filters select the same rows as load_data_from_excel: a whole
+    number matches "1" whether openpyxl returns it as 1 or pandas as 1.0.
     
     Args:
-        c: ReportLab canvas
-        data: Dictionary with label data
-        x, y: Bottom-left corner coordinates
-        width, height: Label dimensions
-        config: Label configuration dictionary
+        excel_file_path (str): Path to the Excel file.
+        columns (collection, optional): Only include these columns in each record.
+        Remaining arguments are the filters accepted by load_data_from_excel.
+        
+    Yields:
+        dict: One record per matching row, keyed by column name.
     """
-    # Use default config if not provided
-    if config is None:
-        config = load_config()
+    workbook = openpyxl.load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        
+        # Resolve which column positions to keep once, rather than per row
+        keep = [(i, name) for i, name in enumerate(header)
+                if name is not None and (columns is None or name in columns)]
+        keep_row = filter_engine.row_predicate(
+            [name for _, name in keep],
+            category_filter=category_filter,
+            category_exclude_filter=category_exclude_filter,
+            status_filter=status_filter,
+            status_exclude_filter=status_exclude_filter,
+            mail_zone_filter=mail_zone_filter,
+            publication_columns=publication_columns,
+            filter_mode=filter_mode
+        )
+        
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            record = {name: (row[i] if i < len(row) else None) for i, name in keep}
+            if keep_row(record):
+                yield record
+    finally:
+        workbook.close()
 
-    # Get selected fields - check both possible key names for backwards compatibility
-    selected_fields = config.get("display_selected_fields_on_label") or config.get("selected_fields_for_label")
-    
-    # Get font and color configurations
-    fonts_config = config.get("fonts", {})
-    colors_config = config.get("colors", {})
 
-    # Define default font styles if not found in config
-    default_title_font = {"name": "Helvetica-Bold", "size": 10}
-    default_body_font = {"name": "Helvetica", "size": 9}
-    default_publication_font = {"name": "Helvetica-Bold", "size": 14}
-    
-    # For the prominent right panel text (publication codes like BE/BC/AR), use publication font
-    publication_font_config = fonts_config.get("publication", default_publication_font)
+def _hex_to_color(hex_str):
+    """Convert a hex color string such as "#1a2b3c" to a ReportLab color."""
+    hex_str = str(hex_str).lstrip('#')
+    if len(hex_str) == 6:
+        try:
+            return colors.Color(int(hex_str[0:2], 16)/255, int(hex_str[2:4], 16)/255, int(hex_str[4:6], 16)/255)
+        except ValueError:
+            return colors.black # Fallback for invalid hex
+    return colors.black # Fallback for invalid hex format
 
-    title_font_config = fonts_config.get("title", default_title_font)
-    body_font_config = fonts_config.get("body", default_body_font)
-    # Keep emphasis_font_config for backward compatibility, but use publication_font_config for publication codes
-    emphasis_font_config = publication_font_config
 
-    # Determine address font (prefer CJK font if registered and configured)
-    address_font_name = body_font_config.get("name", default_body_font["name"])
-    address_font_size = body_font_config.get("size", default_body_font["size"])
-    cjk_font_config = fonts_config.get("cjk")
+def _usable_font(name, size, fallback_name, fallback_size):
+    """Return (name, size) if the font can be set on a canvas, otherwise the fallback."""
+    try:
+        pdfmetrics.getFont(name)
+        return name, size
+    except Exception:
+        return fallback_name, fallback_size
 
-    if cjk_font_config and cjk_font_config.get("name"):
-        cjk_font_to_try = cjk_font_config["name"]
-        try:
-            pdfmetrics.getFont(cjk_font_to_try) # Check if registered
-            address_font_name = cjk_font_to_try
-            address_font_size = cjk_font_config.get("size", body_font_config.get("size", default_body_font["size"]))
-        except KeyError:
-            print(f"WARNING: CJK font '{cjk_font_to_try}' specified in config but NOT FOUND or NOT REGISTERED with ReportLab.")
-            print(f"WARNING: Address fields will fallback to default body font '{address_font_name}'. Chinese characters likely WILL NOT RENDER correctly.")
-    
-    # Convert hex colors to reportlab colors
-    def hex_to_color(hex_str):
-        hex_str = str(hex_str).lstrip('#')
-        if len(hex_str) == 6:
+
+class LabelStyle:
+    """
+    Label fonts, colors and geometry resolved once per job.
+
+    create_label only reads from this object, so the config lookups, color
+    parsing and font probing happen once in generate_labels rather than per label.
+    """
+
+    __slots__ = (
+        "config", "width", "height", "selected_fields", "show_border", "border_width",
+        "title_color", "body_color", "border_color",
+        "person_name_font", "address_font", "address_line_height",
+        "receipt_font", "publication_font", "bulletin_font",
+        "padding", "divider_offset", "right_half_width", "half_height",
+        "custom_right_text", "display_codes_on_label",
+        "bulletin_text", "bulletin_number_text", "bulletin_half_width", "bulletin_number_half_width",
+        "slots", "width_engine",
+    )
+
+    def __init__(self, config, label_width=None, label_height=None, page_size=A4):
+        """
+        Args:
+            config (dict): Effective label configuration (after any overrides).
+            label_width, label_height: Label dimensions in points. Default to the
+                config's label_width/label_height (in mm).
+            page_size (tuple): Page width and height in points, used for the slot grid.
+        """
+        self.config = config
+        self.width = label_width if label_width is not None else config["label_width"] * mm
+        self.height = label_height if label_height is not None else config["label_height"] * mm
+
+        # Get selected fields - check both possible key names for backwards compatibility
+        self.selected_fields = config.get("display_selected_fields_on_label") or config.get("selected_fields_for_label")
+
+        # Get font and color configurations
+        fonts_config = config.get("fonts", {})
+        colors_config = config.get("colors", {})
+
+        # Define default font styles if not found in config
+        default_title_font = {"name": "Helvetica-Bold", "size": 10}
+        default_body_font = {"name": "Helvetica", "size": 9}
+        default_publication_font = {"name": "Helvetica-Bold", "size": 14}
+
+        # For the prominent right panel text (publication codes like BE/BC/AR), use publication font
+        publication_font_config = fonts_config.get("publication", default_publication_font)
+        title_font_config = fonts_config.get("title", default_title_font)
+        body_font_config = fonts_config.get("body", default_body_font)
+
+        # Determine address font (prefer CJK font if registered and configured)
+        address_font_name = body_font_config.get("name", default_body_font["name"])
+        address_font_size = body_font_config.get("size", default_body_font["size"])
+        cjk_font_config = fonts_config.get("cjk")
+        cjk_registered = False
+
+        if cjk_font_config and cjk_font_config.get("name"):
+            cjk_font_to_try = cjk_font_config["name"]
             try:
-                return colors.Color(int(hex_str[0:2], 16)/255, int(hex_str[2:4], 16)/255, int(hex_str[4:6], 16)/255)
-            except ValueError:
-                return colors.black # Fallback for invalid hex
-        return colors.black # Fallback for invalid hex format
+                pdfmetrics.getFont(cjk_font_to_try) # Check if registered
+                address_font_name = cjk_font_to_try
+                address_font_size = cjk_font_config.get("size", body_font_config.get("size", default_body_font["size"]))
+                cjk_registered = True
+            except KeyError:
+                print(f"WARNING: CJK font '{cjk_font_to_try}' specified in config but NOT FOUND or NOT REGISTERED with ReportLab.")
+                print(f"WARNING: Address fields will fallback to default body font '{address_font_name}'. Chinese characters likely WILL NOT RENDER correctly.")
+
+        # Set the font for person's name
+        person_name_font = (title_font_config.get("name", default_title_font["name"]),
+                            title_font_config.get("size", default_title_font["size"]))
+
+        # If CJK font was successfully registered and is the address font, use it for person's name too.
+        if cjk_registered:
+            person_name_font = (address_font_name,
+                                cjk_font_config.get("size", title_font_config.get("size", default_title_font["size"])))
+
+        self.person_name_font = _usable_font(*person_name_font, default_title_font["name"], default_title_font["size"])
+        self.address_font = _usable_font(address_font_name, address_font_size, body_font_config["name"], body_font_config["size"])
+        self.address_line_height = address_font_size + 3 # A bit of spacing for readability
+        self.receipt_font = _usable_font(body_font_config["name"], body_font_config["size"] - 1, "Helvetica", 8)
+        self.publication_font = _usable_font(
+            publication_font_config.get("name", default_publication_font["name"]),
+            publication_font_config.get("size", default_publication_font["size"]),
+            default_publication_font["name"], default_publication_font["size"])
+
+        # Use body font for bulletin text, slightly smaller but not below 6pt
+        bulletin_font_size = max(body_font_config.get("size", default_body_font["size"]) - 1, 6)
+        self.bulletin_font = _usable_font(
+            body_font_config.get("name", default_body_font["name"]), bulletin_font_size,
+            default_body_font["name"], max(default_body_font["size"] - 1, 6))
+
+        # Convert hex colors to reportlab colors
+        default_text_color_hex = "#000000"
+        text_color_hex = colors_config.get("text", default_text_color_hex)
+        self.title_color = _hex_to_color(colors_config.get("title", text_color_hex)) # Fallback to general text color
+        self.body_color = _hex_to_color(colors_config.get("body", text_color_hex))   # Fallback to general text color
+        self.border_color = _hex_to_color(colors_config.get("border", default_text_color_hex))
+
+        self.show_border = config.get("show_border", True)
+        self.border_width = config.get("border_width", 0.5)
+
+        # Geometry relative to the label's corner: divider at around 75% of width,
+        # right panel centered in the remaining 25%
+        self.padding = 5
+        self.divider_offset = self.width * 0.75
+        self.right_half_width = (self.width * 0.25) / 2
+        self.half_height = self.height / 2
+
+        # Get custom right panel text from config. It might be an empty string if the user cleared it.
+        self.custom_right_text = str(config.get("custom_right_panel_text", ""))[:3]
+        # display_codes_on_label is expected to be a list of strings, e.g., ["BE"], from the config.
+        self.display_codes_on_label = config.get("display_publication_codes_on_label")
+
+        # Bulletin texts are the same on every label, so measure them once
+        self.width_engine = WidthEngine()
+        self.bulletin_text = str(config.get("bulletin_text", "Bulletin"))
+        self.bulletin_number_text = str(config.get("bulletin_number_text", "No.2-2026"))
+        self.bulletin_half_width = self.width_engine.string_width(self.bulletin_text, *self.bulletin_font) / 2
+        self.bulletin_number_half_width = self.width_engine.string_width(self.bulletin_number_text, *self.bulletin_font) / 2
+
+        self.slots = self._page_slots(page_size)
+
+    def _page_slots(self, page_size):
+        """Bottom-left corners of the label slots on a page, filled row by row."""
+        config = self.config
+        width, height = page_size
+        columns = config["columns"]
+        rows = config["rows"]
+        margin_top = config["margin_top"] * mm
+        margin_bottom = config["margin_bottom"] * mm
+        margin_left = config["margin_left"] * mm
+        margin_right = config["margin_right"] * mm
+
+        horizontal_gap = (width - margin_left - margin_right - columns*self.width) / (columns - 1) if columns > 1 else 0
+        vertical_gap = (height - margin_top - margin_bottom - rows*self.height) / (rows - 1) if rows > 1 else 0
+
+        slots = []
+        for row in range(rows):
+            y = height - margin_top - (row * (self.height + vertical_gap)) - self.height
+            for col in range(columns):
+                x = margin_left + col * (self.width + horizontal_gap)
+                slots.append((x, y))
+        return slots
 
-    default_text_color_hex = "#000000"
-    text_color_hex = colors_config.get("text", default_text_color_hex)
+
+# Name of the form XObject holding the parts of a label that are the same on every label
+LABEL_CHROME_FORM = "LabelChrome"
+
+
+def define_label_chrome_form(c, style, name=LABEL_CHROME_FORM):
+    """
+    Define the invariant parts of a label once as a form XObject.
+    
+    The form holds the border, the divider and the bulletin texts, drawn relative
+    to the label's bottom-left corner. create_label places it per slot with
+    doForm, so only the record-specific text is written for each label.
+    
+    Args:
+        c: ReportLab canvas
+        style (LabelStyle): Compiled label style.
+        name (str): Form name to pass to create_label.
+    """
+    width, height = style.width, style.height
+    c.beginForm(name, 0, 0, width, height)
     
-    title_color_hex = colors_config.get("title", text_color_hex) # Fallback to general text color
-    body_color_hex = colors_config.get("body", text_color_hex)   # Fallback to general text color
-    border_color_hex = colors_config.get("border", default_text_color_hex)
+    divider_x = style.divider_offset
+    if style.show_border:
+        c.setStrokeColor(style.border_color)
+        c.setLineWidth(style.border_width)
+        c.rect(0, 0, width, height)
+        c.line(divider_x, 0, divider_x, height)
+    
+    right_center_x = divider_x + style.right_half_width
+    bulletin_y = height - style.half_height - 15
+    c.setFont(*style.bulletin_font)
+    c.setFillColor(style.body_color)
+    c.drawString(right_center_x - style.bulletin_half_width, bulletin_y, style.bulletin_text)
+    c.drawString(right_center_x - style.bulletin_number_half_width, bulletin_y - 10, style.bulletin_number_text)
+    
+    c.endForm()
+
+
+def _field_text(data, key):
+    # Convert to string, ensuring NaN/None becomes empty, then strip whitespace
+    raw_val = data.get(key)
+    return (str(raw_val) if pd.notna(raw_val) else "").strip()
+
 
-    title_color = hex_to_color(title_color_hex)
-    body_color = hex_to_color(body_color_hex)
-    border_color = hex_to_color(border_color_hex)
+def right_panel_texts(data, style):
+    """
+    Build the receipt text and the publication text of a label's right panel.
     
-    # Calculate divider position (used for layout even if border is not shown)
-    divider_x = x + (width * 0.75)
+    Returns:
+        tuple: (receipt_text, right_text); receipt_text is empty without a RECEIVE_ID.
+    """
+    # Receipt number (in top right corner)
+    raw_receive_id = data.get("RECEIVE_ID")
+    receive_id_str = (str(int(raw_receive_id)) if pd.notna(raw_receive_id) else "").strip()
+    receipt_text = f"Rec. # {receive_id_str}" if receive_id_str else ""
+
+    custom_right_text = style.custom_right_text
+    final_right_text = custom_right_text
+
+    if style.display_codes_on_label: # This should be a list like ["BE"] or ["AE"]
+        # Collect ALL publications that have copies (instead of just the first one)
+        publications_with_copies = []
+
+        # The code itself is the data column name, e.g., "BE", "AE"
+        for code_key in style.display_codes_on_label:
+            if code_key in data and pd.notna(data[code_key]):
+                try:
+                    val = int(data[code_key])
+                    if val >= 1:
+                        publications_with_copies.append(f"{val} {code_key}")
+                except (ValueError, TypeError):
+                    continue
+
+        if publications_with_copies:
+            # Join all publications with " "
+            prefix = " ".join(publications_with_copies)
+            if custom_right_text:
+                final_right_text = f"{prefix} {custom_right_text}"
+            else:
+                final_right_text = prefix
+
+    return receipt_text, final_right_text
+
+
+def measure_right_panels(records, style):
+    """
+    Lay out the right panels of a batch of labels with one width pass per font.
     
-    # Draw border if specified
-    if config.get("show_border", True):
-        border_width = config.get("border_width", 0.5)
-        c.setStrokeColor(border_color)
-        c.setLineWidth(border_width)
-        c.rect(x, y, width, height)
+    Args:
+        records (list): Label data dictionaries.
+        style (LabelStyle): Compiled label style.
         
-        # Draw vertical divider at around 75% of width
-        c.line(divider_x, y, divider_x, y + height)
+    Returns:
+        list: One (receipt_text, receipt_x_offset, right_text, right_text_half_width)
+            tuple per record. receipt_x_offset is relative to the divider; the
+            half width is subtracted from the right panel's center.
+    """
+    texts = [right_panel_texts(data, style) for data in records]
+    receipt_texts = [receipt_text for receipt_text, _ in texts]
+    right_texts = [right_text for _, right_text in texts]
     
-    # Standard padding
-    padding = 5
-      # Left side content
-    left_section_width = divider_x - x - padding
+    receipt_widths = style.width_engine.string_widths(receipt_texts, *style.receipt_font).tolist()
+    right_widths = style.width_engine.string_widths(right_texts, *style.publication_font).tolist()
     
+    panel_width = style.width * 0.25
+    return [
+        (receipt_text, (panel_width - receipt_width) / 2, right_text, right_width / 2)
+        for receipt_text, receipt_width, right_text, right_width
+        in zip(receipt_texts, receipt_widths, right_texts, right_widths)
+    ]
+
+
+def create_label(c, data, x, y, width, height, config=None, style=None, chrome_form=None, right_panel=None):
+    """
+    Create a single label on the canvas in the style of Legislative Council Complex.
+
+    Args:
+        c: ReportLab canvas
+        data: Dictionary with label data
+        x, y: Bottom-left corner coordinates
+        width, height: Label dimensions
+        config: Label configuration dictionary
+        style (LabelStyle, optional): Precompiled style. When generating many labels,
+            build it once and pass it here; otherwise it is built from config.
+        chrome_form (str, optional): Name of a form defined with define_label_chrome_form.
+            When given, the border, divider and bulletin texts come from that form.
+        right_panel (tuple, optional): This label's entry from measure_right_panels, so text
+            widths are measured in batches outside the render loop.
+    """
+    if style is None:
+        # Use default config if not provided
+        if config is None:
+            config = load_config()
+        style = LabelStyle(config, width, height)
+
+    selected_fields = style.selected_fields
+
+    # Calculate divider position (used for layout even if border is not shown)
+    divider_x = x + style.divider_offset
+
+    if chrome_form:
+        # Border, divider and bulletin texts are drawn once in the shared form
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(chrome_form)
+        c.restoreState()
+    elif style.show_border:
+        # Draw border if specified
+        c.setStrokeColor(style.border_color)
+        c.setLineWidth(style.border_width)
+        c.rect(x, y, width, height)
+
+        # Draw vertical divider at around 75% of width
+        c.line(divider_x, y, divider_x, y + height)
+
+    padding = style.padding
+
     # ---------- LEFT SIDE CONTENT ----------
     person_name = ""
     post_line = ""  # Store post separately to add as first address line
-    
+
     if selected_fields:
         recipient_field_order = ["TITLE1", "NAME1", "surname"]
         person_name_parts = []
         for key in recipient_field_order:
             if key in selected_fields:
-                raw_val = data.get(key)
-                # Convert to string, ensuring NaN/None becomes empty, then strip whitespace
-                field_str = (str(raw_val) if pd.notna(raw_val) else "").strip()
-                
+                field_str = _field_text(data, key)
                 if field_str: # Process only if there's actual content
                     person_name_parts.append(field_str)
         person_name = " ".join(person_name_parts).strip()
-        
+
         # Handle post separately - it will be added as the first address line
         if "post" in selected_fields:
-            raw_post = data.get("post")
-            post_line = (str(raw_post) if pd.notna(raw_post) else "").strip()
+            post_line = _field_text(data, "post")
     else: # Fallback to original logic if selected_fields not provided
         person_name_parts_fallback = []
-        
-        raw_title = data.get("TITLE1")
-        title_str = (str(raw_title) if pd.notna(raw_title) else "").strip()
-        if title_str: person_name_parts_fallback.append(title_str)
-        
-        raw_name = data.get("NAME1")
-        name_str = (str(raw_name) if pd.notna(raw_name) else "").strip()
-        if name_str: person_name_parts_fallback.append(name_str)
-        
-        raw_surname = data.get("surname")
-        surname_str = (str(raw_surname) if pd.notna(raw_surname) else "").strip()
-        if surname_str: person_name_parts_fallback.append(surname_str)
-        
+        for key in ["TITLE1", "NAME1", "surname"]:
+            field_str = _field_text(data, key)
+            if field_str: person_name_parts_fallback.append(field_str)
         person_name = " ".join(person_name_parts_fallback).strip()
 
-    # Set the font for person's name
-    person_name_font_to_use = title_font_config.get("name", default_title_font["name"])
-    person_name_size_to_use = title_font_config.get("size", default_title_font["size"])
+    c.setFont(*style.person_name_font)
+    c.setFillColor(style.title_color)
 
-    # If CJK font was successfully registered and is the address font, use it for person's name too.
-    if cjk_font_config and cjk_font_config.get("name") and address_font_name == cjk_font_config["name"]:
-        person_name_font_to_use = address_font_name
-        person_name_size_to_use = cjk_font_config.get("size", title_font_config.get("size", default_title_font["size"]))
-
-    try:
-        c.setFont(person_name_font_to_use, person_name_size_to_use)
-    except:
-        c.setFont(default_title_font["name"], default_title_font["size"])  # Fallback
-    c.setFillColor(title_color)
-    
     # Draw person name at top of left side
     name_y = y + height - 15
     c.drawString(x + padding, name_y, person_name)
-    
+
     # Address block: Room information and address
-    try:
-        c.setFont(address_font_name, address_font_size)
-    except:
-        c.setFont(body_font_config["name"], body_font_config["size"]) # Fallback
-    c.setFillColor(body_color)
-    
+    c.setFont(*style.address_font)
+    c.setFillColor(style.body_color)
+
     address_lines = []
-    
+
     # Add post as the first line if it exists
     if post_line:
         address_lines.append(post_line)
-    
+
     if selected_fields:
         # Define the order in which address fields should appear on the label
         address_field_order = ["sub_unit", "sub_unit_chi", "UNIT_NAME", "unit_name_chi", "co_name", "co_name_chi", "add1", "add2", "state"]
         for key in address_field_order:
             if key in selected_fields:
-                raw_val = data.get(key)
-                field_str = (str(raw_val) if pd.notna(raw_val) else "").strip()
+                field_str = _field_text(data, key)
                 if field_str: # Ensure non-empty string before appending
                     address_lines.append(field_str)
     else: # Fallback to original logic
-        keys_to_check = ["add1", "add2", "state"]
-        for key in keys_to_check:
-            raw_val = data.get(key)
-            field_str = (str(raw_val) if pd.notna(raw_val) else "").strip()
+        for key in ["add1", "add2", "state"]:
+            field_str = _field_text(data, key)
             if field_str:
                 address_lines.append(field_str)
 
     # Draw address lines
     current_line_y = name_y - 12 # Starting Y for the first address line
-    line_height_for_address = address_font_size + 3 # A bit of spacing for readability
-
     for line_text in address_lines:
         if not line_text.strip(): # Skip empty or whitespace-only lines
             continue
         c.drawString(x + padding, current_line_y, line_text)
-        current_line_y -= line_height_for_address # Move to next line position
-    
+        current_line_y -= style.address_line_height # Move to next line position
+
     # ---------- RIGHT SIDE CONTENT ----------
-    # Reset font for other elements if they rely on a default after address drawing
+    if right_panel is None:
+        right_panel = measure_right_panels([data], style)[0]
+    receipt_text, receipt_offset, final_right_text, right_text_half_width = right_panel
+
     # Receipt number (in top right corner)
-    raw_receive_id = data.get("RECEIVE_ID")
-    receive_id_str = (str(int(raw_receive_id)) if pd.notna(raw_receive_id) else "").strip()
-    receipt_text = f"Rec. # {receive_id_str}" if receive_id_str else ""
-    
     if receipt_text:
-        try:
-            c.setFont(body_font_config["name"], body_font_config["size"] - 1)
-        except:
-            c.setFont("Helvetica", 8)  # Fallback
-        
-        receipt_width = c.stringWidth(receipt_text, body_font_config["name"], body_font_config["size"] - 1)
-        receipt_x = divider_x + (width * 0.25 - receipt_width) / 2
-        c.drawString(receipt_x, name_y, receipt_text)
-    
-    # Draw 'E' or custom text in center of right side
-    try:
-        # Use publication_font_config for the right panel's main text (BE/BC/AR codes)
-        c.setFont(publication_font_config.get("name", default_publication_font["name"]), 
-                  publication_font_config.get("size", default_publication_font["size"]))
-    except:
-        c.setFont(default_publication_font["name"], default_publication_font["size"]) # Fallback
-    
-    right_center_x = divider_x + ((width * 0.25) / 2)
-    right_center_y = y + height - (height / 2)
-    
-    # Get custom right panel text from config. It might be an empty string if the user cleared it.
-    custom_right_text = str(config.get("custom_right_panel_text", ""))[:3] # Default to empty string if not in config
-
-    # Check if we need to prepend publication issue count
-    # display_codes_on_label is expected to be a list of strings, e.g., ["BE"], from the config.
-    display_codes_on_label = config.get("display_publication_codes_on_label") 
-    final_right_text = custom_right_text
+        c.setFont(*style.receipt_font)
+        c.drawString(divider_x + receipt_offset, name_y, receipt_text)
 
-    if display_codes_on_label: # This should be a list like ["BE"] or ["AE"]
-        # Collect ALL publications that have copies (instead of just the first one)
-        publications_with_copies = []
-
-        # Iterate through the codes provided for display on the label
-        for code_key in display_codes_on_label:
-            # The 'code_key' itself is the data column name, e.g., "BE", "AE"
-            # This assumes the label_code from config is also the data column name.
-            if code_key in data and pd.notna(data[code_key]):
-                try:
-                    val = int(data[code_key])
-                    if val >= 1:
-                        publications_with_copies.append(f"{val} {code_key}")
-                except (ValueError, TypeError):
-                    continue
+    # Draw 'E' or custom text in center of right side
+    c.setFont(*style.publication_font)
 
-        if publications_with_copies:
-            # Join all publications with " "
-            prefix = " ".join(publications_with_copies)
-            if custom_right_text:
-                final_right_text = f"{prefix} {custom_right_text}"
-            else:
-                final_right_text = prefix
-        # If no specific issue count found, and custom_right_text is empty, final_right_text remains empty.
-        # If custom_right_text has content (e.g. "E"), it will be used.
-        elif not custom_right_text: # if no publications found and custom_right_text is empty
-             final_right_text = "" # Ensure it's an empty string, not None
+    right_center_x = divider_x + style.right_half_width
+    right_center_y = y + height - style.half_height
+    c.drawString(right_center_x - right_text_half_width, right_center_y, final_right_text)
 
-    text_width = c.stringWidth(final_right_text, 
-                               publication_font_config.get("name", default_publication_font["name"]), 
-                               publication_font_config.get("size", default_publication_font["size"]))
-    text_x = right_center_x - (text_width / 2)
-    c.drawString(text_x, right_center_y, final_right_text)
-    
     # ---------- BULLETIN SECTION UNDER THE 'E' ON RIGHT SIDE ----------
-    # Use body font for bulletin text, possibly smaller
-    bulletin_font_name = body_font_config.get("name", default_body_font["name"])
-    bulletin_font_size = body_font_config.get("size", default_body_font["size"]) - 1 # Make it slightly smaller
-    if bulletin_font_size < 6: # Prevent font from being too small
-        bulletin_font_size = 6
+    if chrome_form:
+        return
+    
+    c.setFont(*style.bulletin_font)
+    c.setFillColor(style.body_color)
 
-    try:
-        c.setFont(bulletin_font_name, bulletin_font_size)
-    except:
-        c.setFont(default_body_font["name"], max(default_body_font["size"] - 1, 6)) # Fallback
-    c.setFillColor(body_color)
-    
-    # Bulletin label and number under the 'E'
-    # Get bulletin texts from config, with fallbacks
-    bulletin_text = str(config.get("bulletin_text", "Bulletin")) # Ensure string
-    bulletin_number_text = str(config.get("bulletin_number_text", "No.2-2026")) # Ensure string
-    
-    # The bulletin number should always show the configured value (e.g., "No.2-2026")
-    # We don't need to show copy counts at the bottom since they're already shown in the center panel
-    # when display_publication_codes_on_label is set
-
-    bulletin_width = c.stringWidth(bulletin_text, bulletin_font_name, bulletin_font_size)
-    bulletin_x = right_center_x - (bulletin_width / 2)
+    # The bulletin number always shows the configured value (e.g., "No.2-2026");
+    # copy counts are already shown in the center panel
     bulletin_y = right_center_y - 15  # Position below the E
-    c.drawString(bulletin_x, bulletin_y, bulletin_text)
-    
-    bulletin_number_width = c.stringWidth(bulletin_number_text, bulletin_font_name, bulletin_font_size)
-    bulletin_number_x = right_center_x - (bulletin_number_width / 2)
-    c.drawString(bulletin_number_x, bulletin_y - 10, bulletin_number_text)
+    c.drawString(right_center_x - style.bulletin_half_width, bulletin_y, style.bulletin_text)
+    c.drawString(right_center_x - style.bulletin_number_half_width, bulletin_y - 10, style.bulletin_number_text)
 
 
 def load_config(config_file=None):
@@ -595,19 +743,19 @@ def load_config(config_file=None):
         return default_config
 
 
-def generate_labels(data, output_path, config_file=None, labels_per_page=None, label_width=None, label_height=None, temp_config_overrides=None):
+def resolve_config(config_file=None, temp_config_overrides=None, labels_per_page=None, label_width=None, label_height=None):
     """
-    Generate a PDF with multiple labels.
+    Load the label configuration and apply overrides, as generate_labels does.
     
     Args:
-        data: List of dictionaries containing label data
-        output_path: Path to save the PDF file
         config_file: Path to the JSON configuration file
+        temp_config_overrides (dict, optional): Config values overriding the loaded config.
         labels_per_page: Number of labels per page (overrides config)
         label_width, label_height: Dimensions of each label (overrides config)
-        temp_config_overrides (dict, optional): A dictionary of config values to override the loaded config.
+        
+    Returns:
+        dict: Effective label configuration.
     """
-    # Load configuration
     config = load_config(config_file)
 
     # Apply temporary overrides from GUI if provided
@@ -618,7 +766,31 @@ def generate_labels(data, output_path, config_file=None, labels_per_page=None, l
             else:
                 config[key] = value
     
-    # Register CJK font if specified in config
+    # Override config with provided parameters if any
+    if labels_per_page is not None:
+        config["rows"] = labels_per_page // config["columns"]
+    
+    if label_width is not None:
+        config["label_width"] = label_width
+    
+    if label_height is not None:
+        config["label_height"] = label_height
+    
+    return config
+
+
+def register_cjk_font(config, config_file=None):
+    """
+    Register the CJK font named in the config with ReportLab, if not already registered.
+
+    Fonts found on disk are loaded through font_cache, so only the first process
+    after a font change pays for parsing the TTF.
+
+    Args:
+        config (dict): Label configuration.
+        config_file (str, optional): Path of the config file; relative font files
+            are looked up next to an absolute config file.
+    """
     cjk_font_conf = config.get("fonts", {}).get("cjk")
     if cjk_font_conf and cjk_font_conf.get("name") and cjk_font_conf.get("file"):
         cjk_name_to_register = cjk_font_conf["name"]
@@ -646,7 +818,7 @@ def generate_labels(data, output_path, config_file=None, labels_per_page=None, l
                 # print(f"CJK font {cjk_name_to_register} already registered.")
             except KeyError: # Not registered, so proceed
                 if os.path.exists(font_path):
-                    pdfmetrics.registerFont(TTFont(cjk_name_to_register, font_path))
+                    pdfmetrics.registerFont(font_cache.load_ttfont(cjk_name_to_register, font_path))
                     print(f"Successfully registered CJK font: {cjk_name_to_register} from {font_path}")
                 elif not os.path.isabs(font_path) and font_path == cjk_filename: 
                     # If it's a plain name (e.g. "SimSun") and not found as a file,
@@ -660,64 +832,167 @@ def generate_labels(data, output_path, config_file=None, labels_per_page=None, l
             print(f"Warning: Could not register CJK font {cjk_name_to_register} from {font_path}. Error: {e}")
             traceback.print_exc() # Added traceback for detailed error info
 
-    # Override config with provided parameters if any
-    if labels_per_page is not None:
-        config["rows"] = labels_per_page // config["columns"]
+
+def generate_labels(data, output_path, config_file=None, labels_per_page=None, label_width=None, label_height=None, temp_config_overrides=None, static_forms=None, pages_per_file=None, progress_callback=None):
+    """
+    Generate a PDF with multiple labels.
     
-    if label_width is not None:
-        config["label_width"] = label_width
+    Args:
+        data: List (or any iterable, e.g. iter_records_from_excel) of dictionaries containing label data
+        output_path: Path to save the PDF file, or a writable binary stream (e.g. io.BytesIO)
+            to write it to. A stream cannot be combined with pages_per_file.
+        config_file: Path to the JSON configuration file
+        labels_per_page: Number of labels per page (overrides config)
+        label_width, label_height: Dimensions of each label (overrides config)
+        temp_config_overrides (dict, optional): A dictionary of config values to override the loaded config.
+        static_forms (bool, optional): Draw the border, divider and bulletin texts once as a
+            form XObject reused by every label, for smaller PDFs. Defaults to the config's
+            "static_label_forms" setting (off).
+        pages_per_file (int, optional): Roll over to a new output file every this many pages.
+            Parts are written as <name>_part001.pdf, <name>_part002.pdf, ... with a
+            <name>_manifest.json listing them. Each finished part is saved and released,
+            so memory stays bounded however many labels there are.
+        progress_callback (callable, optional): Called with the number of labels drawn so
+            far each time a page is finished, and once more when the job is done.
+        
+    Returns:
+        int: Number of labels generated.
+    """
+    to_stream = hasattr(output_path, 'write')
+    if to_stream and pages_per_file:
+        raise ValueError("pages_per_file needs an output path to name the part files after, not a stream")
     
-    if label_height is not None:
-        config["label_height"] = label_height
+    # Load configuration with GUI/web overrides and layout overrides applied
+    config = resolve_config(config_file, temp_config_overrides, labels_per_page, label_width, label_height)
     
-    # Convert mm to points for ReportLab
-    label_width = config["label_width"] * mm
-    label_height = config["label_height"] * mm
-    margin_top = config["margin_top"] * mm
-    margin_bottom = config["margin_bottom"] * mm
-    margin_left = config["margin_left"] * mm
-    margin_right = config["margin_right"] * mm
-    
-    # Create a file-like object for PDF
-    c = canvas.Canvas(output_path, pagesize=A4)
-    width, height = A4
-    
-    # Set up layout
-    columns = config["columns"]
-    rows = config["rows"]
-    
-    # Layout parameters
-    horizontal_gap = (width - margin_left - margin_right - columns*label_width) / (columns - 1) if columns > 1 else 0
-    vertical_gap = (height - margin_top - margin_bottom - rows*label_height) / (rows - 1) if rows > 1 else 0
-      # Generate labels
-    label_index = 0
-    total_labels = min(len(data), 9999)  # Limit to 100 labels for now, but you can change this
+    # Register CJK font if specified in config
+    register_cjk_font(config, config_file)
+
+    # Resolve fonts, colors and the page grid once for the whole job
+    style = LabelStyle(config, page_size=A4)
+    label_width = style.width
+    label_height = style.height
+    slots = style.slots
+    labels_per_page = len(slots)
     
-    while label_index < total_labels:
-        # Loop through rows and columns on the current page
-        for row in range(rows):
-            y = height - margin_top - (row * (label_height + vertical_gap)) - label_height
-            
-            for col in range(columns):
-                if label_index >= total_labels:
-                    break
-                    
-                x = margin_left + col * (label_width + horizontal_gap)
-                
-                # Create the label
-                create_label(c, data[label_index], x, y, label_width, label_height, config)
-                label_index += 1
-                
-            if label_index >= total_labels:
-                break
+    if static_forms is None:
+        static_forms = config.get("static_label_forms", False)
+    chrome_form = LABEL_CHROME_FORM if static_forms else None
+    
+    def open_canvas(path):
+        # Create a file-like object for PDF
+        new_canvas = canvas.Canvas(path, pagesize=A4)
+        if chrome_form:
+            define_label_chrome_form(new_canvas, style, chrome_form)
+        return new_canvas
+    
+    # When rolling over, output_path itself is not written; parts go next to it
+    parts = []
+    current_path = part_path(output_path, 1) if pages_per_file else output_path
+    c = open_canvas(current_path)
+    part_first_label = 0
+    pages_in_part = 1
+    
+    # Generate labels, consuming records a batch at a time so iterators are never materialized
+    label_index = 0
+    render_start = time.perf_counter()
+    save_seconds = 0.0
+    with memory_profile.stage("render"):
+        for record, right_panel in _with_right_panels(data, style, labels_per_page * RIGHT_PANEL_BATCH_PAGES):
+            slot = label_index % labels_per_page
+        
+            # Start a new page once the previous one is full
+            if slot == 0 and label_index > 0:
+                if progress_callback:
+                    progress_callback(label_index)
+                if pages_per_file and pages_in_part >= pages_per_file:
+                    # Finish this part file so its pages are released, and continue in the next one
+                    with metrics.timer("pdf_save") as saved:
+                        c.save()
+                    save_seconds += saved.elapsed
+                    parts.append({"path": current_path, "pages": pages_in_part,
+                                  "first_label": part_first_label, "labels": label_index - part_first_label})
+                    current_path = part_path(output_path, len(parts) + 1)
+                    c = open_canvas(current_path)
+                    part_first_label = label_index
+                    pages_in_part = 1
+                else:
+                    c.showPage()
+                    pages_in_part += 1
+        
+            # Slots fill row by row, left to right
+            x, y = slots[slot]
         
-        # If more labels to print, create a new page
-        if label_index < total_labels:
-            c.showPage()
+            # Create the label
+            create_label(c, record, x, y, label_width, label_height, config, style=style,
+                         chrome_form=chrome_form, right_panel=right_panel)
+            label_index += 1
+    
+    # Drawing time excludes the part files saved along the way
+    metrics.observe("render", time.perf_counter() - render_start - save_seconds)
     
     # Save the PDF
-    c.save()
-    print(f"Generated {total_labels} labels in {output_path}")
+    with metrics.timer("pdf_save"):
+        c.save()
+    metrics.labels_total.inc(label_index)
+    metrics.pages_total.inc(max(1, math.ceil(label_index / labels_per_page)))
+    if progress_callback:
+        progress_callback(label_index)
+    
+    if pages_per_file:
+        parts.append({"path": current_path, "pages": pages_in_part,
+                      "first_label": part_first_label, "labels": label_index - part_first_label})
+        manifest_path = write_parts_manifest(output_path, parts)
+        print(f"Generated {label_index} labels in {len(parts)} part file(s), listed in {manifest_path}")
+    elif to_stream:
+        print(f"Generated {label_index} labels")
+    else:
+        print(f"Generated {label_index} labels in {output_path}")
+    return label_index
+
+
+# Pages of labels whose right-panel text widths are measured in one pass
+RIGHT_PANEL_BATCH_PAGES = 16
+
+
+def _with_right_panels(data, style, batch_size):
+    """Yield (record, right_panel) pairs, measuring text widths a batch at a time."""
+    iterator = iter(data)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield from zip(batch, measure_right_panels(batch, style))
+
+
+def part_path(output_path, index):
+    """Path of the index-th (1-based) part file of a split output, e.g. labels_part001.pdf."""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}_part{index:03d}{ext or '.pdf'}"
+
+
+def write_parts_manifest(output_path, parts):
+    """
+    Write the JSON manifest describing the part files of a split output.
+    
+    Args:
+        output_path (str): The requested output path; the manifest is <name>_manifest.json.
+        parts (list): One dict per part with at least "path", in page order.
+        
+    Returns:
+        str: Path of the manifest file.
+    """
+    manifest_path = f"{os.path.splitext(output_path)[0]}_manifest.json"
+    manifest = {
+        "output": output_path,
+        "total_parts": len(parts),
+        "total_pages": sum(part.get("pages", 0) for part in parts),
+        "total_labels": sum(part.get("labels", 0) for part in parts),
+        "parts": parts,
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    return manifest_path
 
 
 def main():
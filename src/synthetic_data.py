@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Seeded generator of synthetic CPRO mailing-database workbooks.
+
+The generated sheets have the columns the label pipeline reads from the real
+export, with value distributions modelled on it: most rows carry a single
+status id and some several, a minority carry one or more category ids, the
+address and organisation fields mix English and Chinese text, MAIL_ZONE
+follows the state, and the publication copy columns (BE, BC, BEC, AR, FFE,
+FFC, ...) are mostly 0/1/blank with the occasional bulk order. The same seed
+always produces the same workbook, so benchmark runs are comparable.
+
+Example:
+    python src/synthetic_data.py --rows 10000 --output output/members_10k.xlsx
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+
+COLUMNS = [
+    "RECEIVE_ID", "TITLE1", "NAME1", "surname", "post", "co_name", "co_name_chi", "UNIT_NAME",
+    "unit_name_chi", "sub_unit", "sub_unit_chi", "add1", "add2", "state", "attn", "MAIL_ZONE",
+    "REMARK", "category_ids", "status_ids", "BE", "BC", "BEC", "CE", "CC", "NL", "AR", "FFE", "FFC",
+]
+PUBLICATION_COLUMNS = ["BE", "BC", "BEC", "CE", "CC", "NL", "AR", "FFE", "FFC"]
+
+# Benchmark sizes by name
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+CATEGORIES = ["C_acd", "C_acd_dept", "C_adm_sev", "C_can", "C_rsh_ctr", "C_rsh_inst", "C_hst", "C_col",
+              "C_mgt_offr", "C_rsh", "C_acd_oths", "C_su", "C_fac", "C_jrsh", "C_mgt", "C_org", "C_rsh_key"]
+CATEGORY_WEIGHTS = [175, 66, 59, 47, 45, 39, 39, 23, 12, 11, 10, 10, 8, 6, 5, 4, 3]
+STATUSES = ["19", "1", "21", "8", "7", "3", "9", "2", "27", "6", "22", "90", "10", "11", "13", "17", "4", "5"]
+STATUS_WEIGHTS = [1054, 453, 327, 241, 183, 156, 146, 105, 95, 94, 90, 80, 60, 50, 40, 30, 20, 15]
+
+# (state, MAIL_ZONE, share of rows)
+STATES = [("CUHK", 1, 864), ("Hong Kong", 2, 752), ("NT", 3, 609), ("Kowloon", 3, 493), ("China", 4, 40),
+          ("Taiwan", 4, 8), ("Macau", 4, 6), ("India", 5, 95), ("United States of America", 5, 77),
+          ("United Kingdom", 5, 63), ("Canada", 5, 59), ("Australia", 5, 40), ("Japan", 5, 30)]
+
+TITLES = ["Prof", "Dr", "Mr", "Ms", "Mrs", "Dr  the Hon", "The Hon", "Ir"]
+GIVEN_NAMES = ["Ka-shing", "Wai-man", "Siu-ming", "Mei-ling", "Chi-keung", "Kit-yee", "Tak-wah", "Hoi-yan",
+               "Wing-sze", "Kwok-leung", "Man-kit", "Yuk-lan", "David", "Michael", "Mary", "Grace"]
+SURNAMES = ["CHAN", "LEE", "WONG", "CHEUNG", "LAU", "NG", "LEUNG", "HO", "LAM", "YEUNG", "TSANG", "CHOW",
+            "FUNG", "KWOK", "TANG", "LI"]
+POSTS = ["Director", "Chairman", "Professor", "Principal", "Head of Department", "Librarian", "Secretary",
+         "Managing Director", "Dean", "Registrar", "Chief Executive", "Honorary Secretary"]
+# (English, Chinese) organisation names
+ORGANISATIONS = [
+    ("Information Services Office", "資訊處"), ("University Library", "香港中文大學圖書館"),
+    ("Cheung Kong (Holdings) Ltd", "長江實業(集團)有限公司"), ("Chung Chi College", "崇基學院"),
+    ("New Asia College", "新亞書院"), ("United College", "聯合書院"), ("Shaw College", "逸夫書院"),
+    ("Hong Kong Institute of Asia-Pacific Studies", "香港亞太研究所"), ("Department of Physics", "物理系"),
+    ("Faculty of Medicine", "醫學院"), ("Education Bureau", "教育局"), ("Hong Kong Museum of Art", "香港藝術館"),
+]
+UNITS = [("Architecture Library", "建築學圖書館"), ("Water Sports Centre", "水上活動中心"),
+         ("Environmental Science Programme", "環境科學課程"), ("Food and Nutritional Sciences Programme", "食品及營養科學課程"),
+         ("Wu Chung Multimedia Library", "胡忠多媒體圖書館")]
+STREETS = ["Queen's Road Central", "Nathan Road", "Tai Po Road", "Arbuthnot Road", "Hennessy Road",
+           "Chatham Road South", "Fo Tan Road", "Castle Peak Road", "Prince Edward Road West", "Des Voeux Road"]
+BUILDINGS = ["University Administration Bldg", "Cheung Kong Centre", "Science Centre", "Pi Ch'iu Building",
+             "Li Dak Sum Building", "Sino Building", "Lee Woo Sing College", "Royal Ascot"]
+CHINESE_DISTRICTS = ["香港新界沙田", "香港九龍旺角", "香港中環", "香港九龍尖沙咀", "台北市大安區", "澳門氹仔", "廣東省深圳市福田區"]
+CHINESE_STREETS = ["大學道", "彌敦道", "皇后大道中", "大埔道", "羅斯福路", "深南大道", "告士打道"]
+
+# Distribution of copy counts in the publication columns: mostly 1, 0 or blank
+COPY_VALUES = np.array([1.0, 0.0, np.nan, 2.0, 3.0, 5.0, 10.0, 20.0, 50.0])
+
+
+def _pick(rng, values, rows, weights=None, missing=0.0):
+    values = np.asarray(values, dtype=object)
+    p = None
+    if weights is not None:
+        p = np.asarray(weights, dtype=float) / np.sum(weights)
+    picked = values[rng.choice(len(values), size=rows, p=p)]
+    if missing:
+        picked[rng.random(rows) < missing] = None
+    return picked
+
+
+def _id_lists(rng, values, weights, rows, count_weights, missing):
+    # Comma-separated id lists, e.g. "19,8", with the given distribution of list lengths
+    counts = rng.choice(len(count_weights), size=rows, p=np.asarray(count_weights, float) / sum(count_weights)) + 1
+    p = np.asarray(weights, dtype=float) / np.sum(weights)
+    ids = np.asarray(values, dtype=object)[rng.choice(len(values), size=int(counts.sum()), p=p)]
+    lists = np.empty(rows, dtype=object)
+    start = 0
+    for i, count in enumerate(counts):
+        lists[i] = ",".join(dict.fromkeys(ids[start:start + count]))  # No repeated ids
+        start += count
+    lists[rng.random(rows) < missing] = None
+    return lists
+
+
+def generate_members(rows, seed=0):
+    """
+    Generate a synthetic mailing list.
+
+    Args:
+        rows (int): Number of members.
+        seed (int): Random seed; the same seed gives the same data.
+
+    Returns:
+        pandas.DataFrame: One row per member, with the columns in COLUMNS.
+    """
+    rng = np.random.default_rng(seed)
+    index = np.arange(rows)
+
+    state_names = [state for state, _, _ in STATES]
+    state_idx = rng.choice(len(STATES), size=rows, p=np.array([s[2] for s in STATES], float) / sum(s[2] for s in STATES))
+    states = np.asarray(state_names, dtype=object)[state_idx]
+    zones = np.array([zone for _, zone, _ in STATES], dtype=float)[state_idx]
+    zones[rng.random(rows) < 0.007] = np.nan  # A few members have no zone
+
+    org_idx = rng.integers(len(ORGANISATIONS), size=rows)
+    has_org = rng.random(rows) < 0.6
+    unit_idx = rng.integers(len(UNITS), size=rows)
+    has_unit = rng.random(rows) < 0.15
+
+    # Members in Greater China often have Chinese addresses
+    chinese_address = (np.isin(states, ["China", "Taiwan", "Macau"]) & (rng.random(rows) < 0.7)) | (rng.random(rows) < 0.08)
+    numbers = rng.integers(1, 300, size=rows)
+    floors = rng.integers(1, 40, size=rows)
+    streets = _pick(rng, STREETS, rows)
+    buildings = _pick(rng, BUILDINGS, rows)
+    districts = _pick(rng, CHINESE_DISTRICTS, rows)
+    chinese_streets = _pick(rng, CHINESE_STREETS, rows)
+    add1 = np.array([
+        f"{districts[i]}{chinese_streets[i]}{numbers[i]}號" if chinese_address[i] else f"{floors[i]}/F {buildings[i]}"
+        for i in index
+    ], dtype=object)
+    add2 = np.array([
+        f"{floors[i]}樓" if chinese_address[i] else f"{numbers[i]} {streets[i]}"
+        for i in index
+    ], dtype=object)
+    add2[rng.random(rows) < 0.27] = None
+
+    data = {
+        "RECEIVE_ID": index + 1,
+        "TITLE1": _pick(rng, TITLES, rows, missing=0.58),
+        "NAME1": _pick(rng, GIVEN_NAMES, rows, missing=0.3),
+        "surname": _pick(rng, SURNAMES, rows, missing=0.3),
+        "post": _pick(rng, POSTS, rows, missing=0.43),
+        "co_name": np.where(has_org, np.array([o[0] for o in ORGANISATIONS], dtype=object)[org_idx], None),
+        "co_name_chi": np.where(has_org & (rng.random(rows) < 0.35), np.array([o[1] for o in ORGANISATIONS], dtype=object)[org_idx], None),
+        "UNIT_NAME": np.where(has_unit, np.array([u[0] for u in UNITS], dtype=object)[unit_idx], None),
+        "unit_name_chi": np.where(has_unit & (rng.random(rows) < 0.9), np.array([u[1] for u in UNITS], dtype=object)[unit_idx], None),
+        "sub_unit": np.where(has_unit & (rng.random(rows) < 0.3), np.array([u[0] for u in UNITS], dtype=object)[unit_idx], None),
+        "sub_unit_chi": np.where(has_unit & (rng.random(rows) < 0.3), np.array([u[1] for u in UNITS], dtype=object)[unit_idx], None),
+        "add1": add1,
+        "add2": add2,
+        "state": states,
+        "attn": _pick(rng, ["Attn: Secretary", "Attn: Librarian", "Attn: General Office"], rows, missing=0.95),
+        "MAIL_ZONE": zones,
+        "REMARK": _pick(rng, ["for record only", "G-Laws-1997", "returned mail 2023", "updated by phone"], rows, missing=0.85),
+        "category_ids": _id_lists(rng, CATEGORIES, CATEGORY_WEIGHTS, rows, count_weights=[85, 12, 3], missing=0.83),
+        "status_ids": _id_lists(rng, STATUSES, STATUS_WEIGHTS, rows, count_weights=[3021, 137, 26, 5, 1], missing=0.04),
+    }
+
+    # Per column chances of the COPY_VALUES, from blank-heavy (FFE/FFC) to mostly subscribed (BE)
+    copy_weights = {
+        "BE": [2308, 572, 359, 69, 8, 5, 3, 2, 1], "BC": [1933, 881, 427, 66, 7, 4, 3, 2, 1],
+        "BEC": [2110, 401, 743, 57, 8, 3, 2, 1, 1], "CE": [400, 900, 2000, 10, 2, 1, 1, 0, 0],
+        "CC": [380, 920, 2000, 10, 2, 1, 1, 0, 0], "NL": [900, 600, 1800, 20, 3, 1, 1, 0, 0],
+        "AR": [1495, 604, 1132, 61, 11, 2, 4, 3, 2], "FFE": [22, 407, 2860, 6, 2, 3, 8, 3, 3],
+        "FFC": [24, 412, 2857, 4, 2, 3, 7, 2, 1],
+    }
+    for column in PUBLICATION_COLUMNS:
+        weights = np.asarray(copy_weights[column], dtype=float)
+        data[column] = COPY_VALUES[rng.choice(len(COPY_VALUES), size=rows, p=weights / weights.sum())]
+
+    return pd.DataFrame(data, columns=COLUMNS)
+
+
+def write_workbook(df, path):
+    """
+    Write a DataFrame to .xlsx with openpyxl's write-only mode.
+
+    Much faster and lighter than DataFrame.to_excel for large sheets; blanks and
+    NaN are written as empty cells.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([None if value is None or (isinstance(value, float) and value != value) else value
+                      for value in row])
+    workbook.save(path)
+
+
+def ensure_workbook(rows, data_dir, seed=0):
+    """
+    Return the path of the synthetic workbook for (rows, seed), generating it if needed.
+
+    Workbooks are kept in data_dir, so large sizes are only generated once.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"synthetic_{rows}_seed{seed}.xlsx")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp.xlsx"
+        write_workbook(generate_members(rows, seed=seed), tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic CPRO mailing-database workbook.")
+    parser.add_argument("--rows", help="Number of members, or one of " + ", ".join(SIZES), default="10k")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("-o", "--output", help="Path of the .xlsx file to write", required=True)
+    args = parser.parse_args()
+
+    rows = SIZES.get(args.rows.lower()) or int(args.rows)
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    write_workbook(generate_members(rows, seed=args.seed), args.output)
+    print(f"Wrote {rows} synthetic members to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for column projection: loading only required_columns must render exactly the
+labels a full load renders.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from render_equivalence import compare_pdfs
+from simple_labels import generate_labels, load_data_from_excel, required_columns, resolve_config
+from synthetic_data import generate_members
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_DIR, "config", "label_config.json")
+
+ALL_FIELDS = ["TITLE1", "NAME1", "surname", "post", "sub_unit", "sub_unit_chi", "UNIT_NAME", "unit_name_chi",
+              "co_name", "co_name_chi", "add1", "add2", "state"]
+
+CASES = [
+    # Every optional field, publication codes on the label and a publication filter
+    ({"display_selected_fields_on_label": ALL_FIELDS, "display_publication_codes_on_label": ["BE", "BC", "AR"],
+      "show_border": True}, {"publication_columns": ["BE", "FFE"]}),
+    # The older config key
+    ({"display_selected_fields_on_label": [], "selected_fields_for_label": ALL_FIELDS[:6],
+      "display_publication_codes_on_label": ["CE"]}, {"status_filter": "19", "mail_zone_filter": "2"}),
+    # No fields selected: create_label falls back to its default fields
+    ({"display_selected_fields_on_label": [], "display_publication_codes_on_label": []},
+     {"category_filter": "C_acd", "publication_columns": ["NL"]}),
+]
+
+
+@pytest.fixture(scope="module")
+def workbook(tmp_path_factory):
+    path = tmp_path_factory.mktemp("projection") / "members.xlsx"
+    generate_members(300, seed=9).to_excel(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("overrides, filters", CASES)
+@pytest.mark.parametrize("cached", [False, True])
+def test_projected_load_renders_the_same_labels(workbook, tmp_path, overrides, filters, cached):
+    cache_dir = str(tmp_path / "cache") if cached else None
+    columns = required_columns(resolve_config(CONFIG_PATH, overrides), filters.get("publication_columns"))
+
+    full = load_data_from_excel(workbook, cache_dir=cache_dir, **filters)
+    projected = load_data_from_excel(workbook, cache_dir=cache_dir, columns=columns, **filters)
+    assert len(projected) > 0
+    assert set(projected.columns) < set(full.columns)
+    pd.testing.assert_frame_equal(projected, full[list(projected.columns)])
+
+    expected, actual = str(tmp_path / "full.pdf"), str(tmp_path / "projected.pdf")
+    generate_labels(full.to_dict(orient="records"), expected, config_file=CONFIG_PATH,
+                    temp_config_overrides=overrides)
+    generate_labels(projected.to_dict(orient="records"), actual, config_file=CONFIG_PATH,
+                    temp_config_overrides=overrides)
+    assert compare_pdfs(expected, actual, CONFIG_PATH, overrides) == []
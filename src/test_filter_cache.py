@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the filter-result LRU cache.
+"""
+
+import numpy as np
+import pandas as pd
+
+from filter_cache import FilterCache, normalize_filters
+from simple_labels import load_data_from_excel
+
+
+def test_equivalent_filters_share_a_key():
+    assert normalize_filters(category_filter="C_col, C_acd") == normalize_filters(category_filter="C_acd,C_col,C_acd")
+    assert normalize_filters(status_filter="", publication_columns=[]) == normalize_filters()
+    assert normalize_filters(filter_mode="or") == normalize_filters(filter_mode="OR")
+    assert normalize_filters(category_filter="C_col", filter_mode="AND") != normalize_filters(category_filter="C_col")
+    assert normalize_filters(publication_columns=["BE", "AR"]) == normalize_filters(publication_columns=["AR", "BE"])
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = FilterCache(max_entries=2, max_bytes=1000)
+    cache.put("a", np.arange(10))
+    cache.put("b", np.arange(10))
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.put("c", np.arange(10))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    cache.put("d", np.arange(245))  # 980 bytes as int32: pushes out everything else
+    assert cache.get("a") is None and cache.get("c") is None
+    cache.put("huge", np.arange(1000))  # Larger than the whole cache: not stored
+    assert cache.get("huge") is None
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"]) == (1, 980)
+    assert (stats["hits"], stats["misses"]) == (3, 4)
+
+
+def test_cached_load_matches_uncached(tmp_path):
+    workbook = tmp_path / "members.xlsx"
+    pd.DataFrame({
+        "RECEIVE_ID": range(12),
+        "category_ids": ["C_col", "C_acd,C_col", "C_adm_sev"] * 4,
+        "status_ids": ["1", "8", "1,90", "6"] * 3,
+        "MAIL_ZONE": [1.0, 2.0] * 6,
+    }).to_excel(workbook, index=False)
+    cache_dir = str(tmp_path / "cache")
+    cache = FilterCache()
+    filters = dict(category_filter="C_col", status_exclude_filter="6")
+
+    expected = load_data_from_excel(str(workbook), cache_dir=cache_dir, **filters)
+    first = load_data_from_excel(str(workbook), cache_dir=cache_dir, filter_cache=cache, **filters)
+    second = load_data_from_excel(str(workbook), cache_dir=cache_dir, filter_cache=cache,
+                                  category_filter="C_col ", status_exclude_filter="6", columns={"RECEIVE_ID"})
+
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected[["RECEIVE_ID"]])
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
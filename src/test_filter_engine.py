@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the vectorized filter engine against the original per-row filters, and
+for the streaming filters selecting the same rows.
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+
+from filter_cache import normalize_filters
+from filter_engine import filter_mask, normalize_token, row_predicate
+from simple_labels import iter_records_from_excel, load_data_from_excel
+from synthetic_data import generate_members
+
+
+def legacy_filter(df, category_filter=None, category_exclude_filter=None, status_filter=None, status_exclude_filter=None, filter_mode="OR"):
+    """The per-row lambda filters that load_data_from_excel used before the engine."""
+    def tokens(x):
+        return [t.strip() for t in str(x).split(',')]
+
+    if category_filter:
+        wanted = [c.strip() for c in category_filter.split(',')]
+        combine = all if filter_mode == "AND" else any
+        df = df[df['category_ids'].map(lambda x: combine(c in tokens(x) for c in wanted))]
+    if category_exclude_filter:
+        unwanted = [c.strip() for c in category_exclude_filter.split(',')]
+        df = df[df['category_ids'].map(lambda x: not any(c in tokens(x) for c in unwanted))]
+    if status_filter:
+        wanted = [s.strip() for s in status_filter.split(',')]
+        combine = all if filter_mode == "AND" else any
+        df = df[df['status_ids'].map(lambda x: combine(s in tokens(x) for s in wanted))]
+    if status_exclude_filter:
+        unwanted = [s.strip() for s in status_exclude_filter.split(',')]
+        df = df[df['status_ids'].map(lambda x: not any(s in tokens(x) for s in unwanted))]
+    return df
+
+
+def make_frame(rows=500, seed=7):
+    rng = random.Random(seed)
+    categories = ['C_adm_sev', 'C_mgt_offr', 'C_col', 'C_acd', 'C_acd_dept']
+    statuses = ['1', '8', '90', '6', '10']
+
+    def multi(values):
+        if rng.random() < 0.1:
+            return np.nan
+        picked = rng.sample(values, rng.randint(1, 3))
+        if len(picked) == 1 and picked[0].isdigit() and rng.random() < 0.5:
+            return int(picked[0])  # Excel stores single status ids as numbers
+        return ', '.join(picked) if rng.random() < 0.3 else ','.join(picked)
+
+    return pd.DataFrame({
+        'category_ids': [multi(categories) for _ in range(rows)],
+        'status_ids': pd.Series([multi(statuses) for _ in range(rows)], dtype=object),
+        'MAIL_ZONE': [rng.choice([1.0, 2.0, 3.0, np.nan]) for _ in range(rows)],
+        'BE': [rng.choice([np.nan, 0, 1, 2, 'x']) for _ in range(rows)],
+        'AR': [rng.choice([np.nan, 0.0, 1.0]) for _ in range(rows)],
+    })
+
+
+def test_multi_value_filters_match_legacy():
+    df = make_frame()
+    cases = [
+        {'category_filter': 'C_col'},
+        {'category_filter': 'C_adm_sev,C_col'},
+        {'category_filter': 'C_adm_sev, C_mgt_offr', 'filter_mode': 'AND'},
+        {'category_exclude_filter': 'C_acd'},
+        {'status_filter': '8'},
+        {'status_filter': '8,90', 'filter_mode': 'AND'},
+        {'status_exclude_filter': '1,6'},
+        {'category_filter': 'C_acd_dept', 'status_filter': '90', 'status_exclude_filter': '10'},
+    ]
+    for case in cases:
+        expected = legacy_filter(df, **case).index.to_numpy()
+        actual = df.index.to_numpy()[filter_mask(df, **case)]
+        assert np.array_equal(actual, expected), case
+
+
+def test_publication_and_mail_zone_filters():
+    df = make_frame()
+    mask = filter_mask(df, publication_columns=['BE', 'AR'], mail_zone_filter='2.0')
+    be = pd.to_numeric(df['BE'], errors='coerce')
+    expected = ((be >= 1) | (df['AR'] >= 1)) & (df['MAIL_ZONE'] == 2.0)
+    assert np.array_equal(mask, expected.to_numpy())
+
+
+def test_missing_publication_columns_match_nothing():
+    df = make_frame(rows=20)
+    assert not filter_mask(df, publication_columns=['FFE']).any()
+
+
+def test_normalized_tokens():
+    assert [normalize_token(t) for t in (" 1.0", "-2.00", "1.5", "10", "C_col ", "1.0a")] == \
+        ["1", "-2", "1.5", "10", "C_col", "1.0a"]
+    assert normalize_filters(mail_zone_filter="2.0") == normalize_filters(mail_zone_filter="2")
+    assert normalize_filters(status_filter="1.0, 8") == normalize_filters(status_filter="8,1")
+
+
+def test_row_predicate_matches_filter_mask():
+    df = make_frame()
+    records = df.to_dict(orient='records')
+    cases = [
+        {'category_filter': 'C_adm_sev, C_mgt_offr', 'filter_mode': 'AND'},
+        {'status_filter': '8,90', 'status_exclude_filter': '10'},
+        {'category_exclude_filter': 'C_acd', 'mail_zone_filter': '2'},
+        {'publication_columns': ['BE', 'AR']},
+        {'publication_columns': ['FFE']},
+    ]
+    for case in cases:
+        keep = row_predicate(list(df.columns), **case)
+        assert [keep(record) for record in records] == filter_mask(df, **case).tolist(), case
+
+
+def test_streaming_selects_the_same_rows_as_loading(tmp_path):
+    df = generate_members(600, seed=4)
+    # Excel keeps single status ids typed as numbers next to "19,3" text cells
+    df['status_ids'] = [int(v) if isinstance(v, str) and v.isdigit() and i % 2 else v
+                        for i, v in enumerate(df['status_ids'])]
+    df.loc[df.index % 7 == 0, 'MAIL_ZONE'] = np.nan  # Gaps make pandas read the zones as floats
+    workbook = tmp_path / "members.xlsx"
+    df.to_excel(workbook, index=False)
+
+    cases = [
+        {'category_filter': 'C_acd'},
+        {'category_filter': 'C_acd,C_col'},
+        {'category_exclude_filter': 'C_acd'},
+        {'status_filter': '19'},
+        {'status_filter': '19, 3', 'filter_mode': 'AND'},
+        {'status_exclude_filter': '1,8'},
+        {'mail_zone_filter': '1'},
+        {'mail_zone_filter': '2.0'},
+        {'publication_columns': ['BE', 'AR']},
+        {'category_filter': 'C_acd', 'status_filter': '19', 'mail_zone_filter': '3', 'publication_columns': ['BE']},
+    ]
+    for case in cases:
+        loaded = list(load_data_from_excel(str(workbook), **case)['RECEIVE_ID'])
+        streamed = [record['RECEIVE_ID'] for record in iter_records_from_excel(str(workbook), **case)]
+        assert loaded, case
+        assert streamed == loaded, case
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the persistent parsed-font cache.
+"""
+
+import os
+import shutil
+
+import reportlab
+from reportlab.pdfbase.ttfonts import TTFont
+
+import font_cache
+
+
+VERA_TTF = os.path.join(os.path.dirname(reportlab.__file__), 'fonts', 'Vera.ttf')
+
+
+def test_cached_font_matches_parsed_font(tmp_path):
+    font_path = str(tmp_path / 'Vera.ttf')
+    shutil.copy(VERA_TTF, font_path)
+
+    first = font_cache.load_ttfont('VeraCached', font_path)
+    assert os.path.exists(font_cache.cache_path_for(font_path))
+
+    cached = font_cache.load_ttfont('VeraCached', font_path)
+    parsed = TTFont('VeraParsed', font_path)
+    assert cached.face is not first.face
+    assert cached.face.charWidths == parsed.face.charWidths
+    assert cached.face.charToGlyph == parsed.face.charToGlyph
+    assert cached.face.makeSubset([ord(c) for c in 'Label']) == parsed.face.makeSubset([ord(c) for c in 'Label'])
+    assert cached.stringWidth('Hello, world', 9) == parsed.stringWidth('Hello, world', 9)
+
+
+def test_changed_font_replaces_stale_cache(tmp_path):
+    font_path = str(tmp_path / 'Vera.ttf')
+    shutil.copy(VERA_TTF, font_path)
+    font_cache.load_ttfont('Vera', font_path)
+    old_cache = font_cache.cache_path_for(font_path)
+
+    shutil.copy(os.path.join(os.path.dirname(VERA_TTF), 'VeraBd.ttf'), font_path)
+    font = font_cache.load_ttfont('Vera', font_path)
+
+    assert font.face.name == TTFont('VeraBd', font_path).face.name
+    assert not os.path.exists(old_cache)
+    assert os.path.exists(font_cache.cache_path_for(font_path))
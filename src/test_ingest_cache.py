@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the Parquet ingest cache: a cache hit must return what reading the workbook returns.
+"""
+
+import datetime
+import io
+import os
+
+import pandas as pd
+
+import ingest_cache
+from label_jobs import export_filtered_bytes
+
+
+def make_workbook(path):
+    pd.DataFrame({
+        "RECEIVE_ID": [1, 2, "3A", 4],
+        "NAME1": ["Chan", None, "Lee", "Wong"],
+        "status_ids": [1, "1,8", 19, None],
+        "category_ids": ["C_col", "C_acd,C_col", None, "C_col"],
+        "MAIL_ZONE": [1.0, None, 2.0, 3.0],
+        "joined": [datetime.datetime(2024, 7, 1, 9, 30), "unknown", None, 2.5],
+        "active": [True, "n/a", False, None],
+    }).to_excel(path, index=False)
+
+
+def test_cache_hit_round_trips_mixed_types(tmp_path):
+    workbook = tmp_path / "members.xlsx"
+    make_workbook(workbook)
+    cache_dir = str(tmp_path / "cache")
+    uncached = pd.read_excel(workbook)
+
+    miss = ingest_cache.read_excel_cached(str(workbook), cache_dir)
+    hit = ingest_cache.read_excel_cached(str(workbook), cache_dir)
+    for df in (miss, hit):
+        pd.testing.assert_frame_equal(df, uncached)
+        assert [type(value) for value in df["status_ids"].dropna()] == [int, str, int]
+        assert list(df["RECEIVE_ID"]) == [1, 2, "3A", 4]
+
+    projected = ingest_cache.read_excel_cached(str(workbook), cache_dir, columns={"status_ids", "NAME1"})
+    pd.testing.assert_frame_equal(projected, uncached[["NAME1", "status_ids"]])
+
+
+def test_non_string_headers_round_trip(tmp_path):
+    workbook = tmp_path / "years.xlsx"
+    pd.DataFrame({"NAME1": ["Chan", "Lee"], 2024: [1, None], 2025.5: ["a", 3],
+                  datetime.datetime(2024, 7, 1): [True, False]}).to_excel(workbook, index=False)
+    cache_dir = str(tmp_path / "cache")
+    uncached = pd.read_excel(workbook)
+    assert 2024 in list(uncached.columns)
+
+    for _ in range(2):  # Miss, then hit
+        cached = ingest_cache.read_excel_cached(str(workbook), cache_dir)
+        assert list(cached.columns) == list(uncached.columns)
+        assert [type(c) for c in cached.columns] == [type(c) for c in uncached.columns]
+        pd.testing.assert_frame_equal(cached, uncached)
+
+    projected = ingest_cache.read_excel_cached(str(workbook), cache_dir, columns={2024, 2025.5})
+    pd.testing.assert_frame_equal(projected, uncached[[2024, 2025.5]])
+
+
+def test_invalidate_keeps_entries_shared_with_other_uploads(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first, second = tmp_path / "first.xlsx", tmp_path / "second.xlsx"
+    make_workbook(first)
+    second.write_bytes(first.read_bytes())  # Same contents uploaded under another name
+    digest = ingest_cache.warm(str(first), cache_dir)
+    assert ingest_cache.warm(str(second), cache_dir) == digest
+    entry = ingest_cache._cache_file(cache_dir, digest)
+
+    ingest_cache.invalidate(str(first), cache_dir)
+    assert os.path.exists(entry)
+    assert not os.path.exists(ingest_cache._ref_file(cache_dir, str(first)))
+
+    ingest_cache.invalidate(str(second), cache_dir)
+    assert not os.path.exists(entry)
+
+
+def test_cached_export_matches_uncached(tmp_path):
+    workbook = tmp_path / "members.xlsx"
+    make_workbook(workbook)
+    cache_dir = str(tmp_path / "cache")
+    config = {"category_filter": "C_col"}
+
+    uncached = export_filtered_bytes(str(workbook), config)
+    ingest_cache.warm(str(workbook), cache_dir)
+    cached = export_filtered_bytes(str(workbook), config, cache_dir=cache_dir)
+    exported = pd.read_excel(io.BytesIO(cached))
+    pd.testing.assert_frame_equal(exported, pd.read_excel(io.BytesIO(uncached)))
+    assert list(exported["status_ids"].dropna()) == [1, "1,8"]
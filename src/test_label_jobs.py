@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the SQLite job store and the worker pool behind the /jobs API.
+"""
+
+import os
+import signal
+import time
+
+from label_jobs import JobStore, JobQueue, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from synthetic_data import generate_members
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_DIR, "config", "label_config.json")
+
+
+def wait_for_state(store, job_id, states, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["state"] in states:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {store.get(job_id)['state']}")
+
+
+def test_job_lifecycle(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    job_id = store.create("sample.xlsx", {"status_filter": "1"})
+
+    job = store.get(job_id)
+    assert job["state"] == JOB_QUEUED
+    assert job["params"] == {"status_filter": "1"}
+
+    store.mark_running(job_id)
+    store.update_progress(job_id, 24, 100)
+    job = JobStore(tmp_path / "jobs.sqlite3").get(job_id)  # As seen from another worker
+    assert (job["state"], job["labels_done"], job["labels_total"]) == (JOB_RUNNING, 24, 100)
+
+    store.mark_done(job_id, str(tmp_path / "result.pdf"), 100)
+    store.mark_failed(job_id, "late error")  # Must not overwrite a finished job
+    job = store.get(job_id)
+    assert (job["state"], job["label_count"], job["error"]) == (JOB_DONE, 100, None)
+
+    assert store.get("missing") is None
+
+
+def test_expire_removes_finished_jobs_and_results(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    result_path = tmp_path / "result.pdf"
+    result_path.write_bytes(b"%PDF")
+
+    done_id = store.create("a.xlsx", {})
+    store.mark_done(done_id, str(result_path), 1)
+    failed_id = store.create("b.xlsx", {})
+    store.mark_failed(failed_id, "No data")
+    assert store.get(failed_id)["state"] == JOB_FAILED
+    queued_id = store.create("c.xlsx", {})
+
+    assert store.expire(max_age=60) == 0
+    assert store.expire(max_age=-1) == 2
+    assert store.get(done_id) is None and store.get(failed_id) is None
+    assert store.get(queued_id)["state"] == JOB_QUEUED
+    assert not os.path.exists(result_path)
+
+
+def test_render_claims(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    other_worker = JobStore(tmp_path / "jobs.sqlite3")
+
+    assert store.claim_render("key", "a", lease=60)
+    assert not other_worker.claim_render("key", "b", lease=60)
+    assert other_worker.render_claimed("key", lease=60)
+
+    other_worker.release_render("key", "b")  # Only the owner can release
+    assert store.render_claimed("key", lease=60)
+    store.release_render("key", "a")
+    assert not store.render_claimed("key", lease=60)
+
+    # A claim past its lease belongs to a dead worker and can be taken over
+    assert store.claim_render("key", "a", lease=60)
+    assert not other_worker.render_claimed("key", lease=-1)  # Waiters stop waiting on it too
+    assert other_worker.claim_render("key", "b", lease=-1)
+
+
+def test_memory_report_is_stored(tmp_path):
+    db_path = tmp_path / "jobs.sqlite3"
+    # A database from before memory reports were recorded
+    import sqlite3
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("""
+            CREATE TABLE jobs (
+                id TEXT PRIMARY KEY, filename TEXT NOT NULL, params TEXT NOT NULL, state TEXT NOT NULL,
+                labels_done INTEGER NOT NULL DEFAULT 0, labels_total INTEGER, label_count INTEGER,
+                result_path TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL
+            )
+        """)
+
+    store = JobStore(db_path)
+    job_id = store.create("sample.xlsx", {})
+    assert store.get(job_id)["memory_report"] is None
+
+    report = {"stages": [{"stage": "render", "depth": 0, "rss_peak": 1024}]}
+    store.set_memory_report(job_id, report)
+    assert store.get(job_id)["memory_report"] == report
+
+
+def test_queue_recovers_from_a_dead_worker(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(store, max_workers=1)
+    try:
+        # Reading from a FIFO nobody writes to blocks, so the job is still running when its worker is killed
+        stuck = tmp_path / "stuck.xlsx"
+        os.mkfifo(stuck)
+        doomed_id = store.create("stuck.xlsx", {})
+        queue.submit(doomed_id, str(stuck), {}, str(tmp_path / "doomed.pdf"), CONFIG_PATH)
+        wait_for_state(store, doomed_id, {JOB_RUNNING})
+        for pid in list(queue._executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        job = wait_for_state(store, doomed_id, {JOB_FAILED})
+        assert job["error"].startswith("Job worker failed")
+
+        workbook = tmp_path / "members.xlsx"
+        generate_members(10, seed=1).to_excel(workbook, index=False)
+        job_id = store.create("members.xlsx", {})
+        queue.submit(job_id, str(workbook), {}, str(tmp_path / "labels.pdf"), CONFIG_PATH)
+        job = wait_for_state(store, job_id, {JOB_DONE, JOB_FAILED})
+        assert (job["state"], job["label_count"]) == (JOB_DONE, 10)
+    finally:
+        queue.shutdown()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the load-testing harness, including a short run against a real server.
+"""
+
+import pytest
+
+import load_test
+
+
+def test_parse_mix_and_ramp():
+    assert load_test.parse_mix("generate=3, health") == {"generate": 3.0, "health": 1.0}
+    assert load_test.parse_ramp("1,4, 8") == [1, 4, 8]
+    with pytest.raises(ValueError):
+        load_test.parse_mix("render=1")
+    with pytest.raises(ValueError):
+        load_test.parse_mix("health=0")
+
+
+def test_summarize_percentiles_and_errors():
+    samples = [("health", i / 100, 200) for i in range(1, 101)]
+    samples += [("generate", 1.0, 500), ("generate", 2.0, "ReadTimeout"), ("generate", 0.5, 200)]
+    summary = load_test.summarize(samples, elapsed=10.0)
+
+    health = summary["health"]
+    assert (health["p50"], health["p95"], health["p99"], health["max"]) == (0.5, 0.95, 0.99, 1.0)
+    assert (health["errors"], health["throughput"]) == (0, 10.0)
+    assert summary["generate"]["errors"] == 2
+    assert summary["generate"]["error_rate"] == pytest.approx(2 / 3)
+    assert summary["all"]["requests"] == 103
+    assert load_test.percentile([], 0.5) is None
+
+
+def test_short_run_against_uvicorn(tmp_path):
+    report = load_test.run(server="uvicorn", workers=1, rows=50, data_dir=str(tmp_path),
+                           mix=load_test.parse_mix("generate=1,export=1,config=1,config_update=1,health=1,upload=1"),
+                           ramp=[2], duration=1.0, render_rows=10)
+
+    endpoints = report["stages"][0]["endpoints"]
+    assert endpoints["all"]["requests"] > 0
+    assert endpoints["all"]["errors"] == 0
+    assert "concurrency 2" in load_test.format_stage(report["stages"][0])
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for per-stage memory accounting.
+"""
+
+import os
+import tracemalloc
+
+import pandas as pd
+
+import memory_profile
+from simple_labels import load_data_from_excel, generate_labels
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_stages_nest_and_report_peaks():
+    with memory_profile.recording(top=5) as report:
+        with memory_profile.stage("outer"):
+            with memory_profile.stage("inner"):
+                held = [bytearray(1024) for _ in range(2000)]  # ~2 MB kept
+            del held
+            memory_profile.stage("after")  # Not entered: records nothing
+    assert not tracemalloc.is_tracing()
+
+    stages = {record["stage"]: record for record in report.to_dict()["stages"]}
+    assert list(stages) == ["outer", "inner"]
+    assert (stages["outer"]["depth"], stages["inner"]["depth"]) == (0, 1)
+    assert stages["inner"]["traced_peak"] >= 2 * 1000 * 1024
+    assert stages["outer"]["traced_peak"] >= stages["inner"]["traced_peak"]
+    assert stages["inner"]["traced_end"] - stages["inner"]["traced_start"] >= 2 * 1000 * 1024
+    assert stages["inner"]["top_sites"][0]["site"].endswith("test_memory_profile.py:24")
+
+    text = memory_profile.format_report(report)
+    assert "outer" in text and "  inner" in text
+
+
+def test_stage_is_a_noop_without_recording():
+    with memory_profile.stage("ingest"):
+        pass
+    assert memory_profile._report is None
+
+
+def test_rss_only_recording():
+    with memory_profile.recording(trace=False) as report:
+        with memory_profile.stage("render"):
+            pass
+    record = report.stages[0]
+    assert record["traced_peak"] is None and record["top_sites"] == []
+    assert "render" in memory_profile.format_report(report.to_dict())
+
+
+def test_pipeline_stages_are_recorded(tmp_path):
+    workbook = tmp_path / "members.xlsx"
+    pd.DataFrame({
+        "NAME1": [f"Name {i}" for i in range(20)],
+        "category_ids": ["C_col"] * 10 + ["C_acd"] * 10,
+        "status_ids": ["19"] * 20,
+    }).to_excel(workbook, index=False)
+
+    with memory_profile.recording() as report:
+        df = load_data_from_excel(str(workbook), category_filter="C_col", status_filter="19", filter_mode="AND")
+        generate_labels(df.to_dict(orient="records"), str(tmp_path / "labels.pdf"),
+                        config_file=os.path.join(PROJECT_DIR, "config", "label_config.json"))
+
+    names = [(record["depth"], record["stage"]) for record in report.stages]
+    assert names == [(0, "ingest"), (0, "filter"), (1, "filter_category"), (1, "filter_status"),
+                     (0, "render"), (0, "pdf_save")]
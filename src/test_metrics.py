@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the pipeline stage timers and their Prometheus rendering.
+"""
+
+import os
+
+import pandas as pd
+
+import metrics
+from simple_labels import load_data_from_excel, generate_labels
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    cumulative, total, count = histogram.snapshot()
+    assert cumulative == [2, 3, 4]
+    assert (round(total, 6), count) == (3.65, 4)
+
+
+def test_pipeline_records_stage_timings(tmp_path):
+    metrics.reset()
+    workbook = tmp_path / "members.xlsx"
+    pd.DataFrame({
+        "NAME1": [f"Name {i}" for i in range(20)],
+        "category_ids": ["C_col"] * 10 + ["C_acd"] * 10,
+    }).to_excel(workbook, index=False)
+
+    df = load_data_from_excel(str(workbook), category_filter="C_col")
+    generate_labels(df.to_dict(orient="records"), str(tmp_path / "labels.pdf"),
+                    config_file=os.path.join(PROJECT_DIR, "config", "label_config.json"))
+
+    for stage in ("ingest", "filter", "render", "pdf_save"):
+        assert metrics.stage_seconds[stage].snapshot()[2] == 1
+    assert metrics.stage_seconds["to_dict"].snapshot()[2] == 0
+    assert (metrics.labels_total.value, metrics.pages_total.value) == (10, 1)
+
+    text = metrics.render_prometheus([
+        ("label_cache_hit_ratio", "Hit ratio.", {"cache": "render"}, 0.5),
+        ("process_resident_memory_bytes", "RSS.", None, None),  # Unavailable: skipped
+    ])
+    assert 'label_stage_duration_seconds_count{stage="ingest"} 1' in text
+    assert 'label_stage_duration_seconds_bucket{stage="render",le="+Inf"} 1' in text
+    assert "label_labels_total 10" in text
+    assert 'label_cache_hit_ratio{cache="render"} 0.5' in text
+    assert "process_resident_memory_bytes" not in text
+    assert "Labels: 10  Pages: 1" in metrics.format_timings()
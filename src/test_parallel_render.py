@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for multi-process rendering: shards are page-aligned and the merged or split
+output draws every label in the slot a serial run would.
+"""
+
+import json
+import os
+
+import pytest
+from pypdf import PdfReader
+
+import cli
+import parallel_render
+from render_equivalence import compare_pdfs
+from simple_labels import generate_labels, resolve_config
+from synthetic_data import generate_members
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_DIR, "config", "label_config.json")
+
+
+def _records(count):
+    return generate_members(count, seed=5).to_dict(orient="records")
+
+
+def _labels_per_page():
+    config = resolve_config(CONFIG_PATH)
+    return config["rows"] * config["columns"]
+
+
+def test_shard_records_are_page_aligned():
+    records = list(range(25))
+    shards = parallel_render.shard_records(records, labels_per_page=4, pages_per_shard=2)
+    assert [len(shard) for shard in shards] == [8, 8, 8, 1]
+    assert [record for shard in shards for record in shard] == records
+    assert parallel_render.shard_records([], 4, 2) == []
+
+
+def test_merged_output_matches_serial(tmp_path):
+    records = _records(_labels_per_page() * 3 + 5)
+    serial = str(tmp_path / "serial.pdf")
+    generate_labels(records, serial, config_file=CONFIG_PATH)
+
+    merged = str(tmp_path / "merged.pdf")
+    paths = parallel_render.generate_labels_parallel(records, merged, config_file=CONFIG_PATH,
+                                                     workers=2, pages_per_shard=1)
+    assert paths == [merged]
+    assert len(PdfReader(merged).pages) == 4
+    assert compare_pdfs(serial, merged, CONFIG_PATH) == []
+
+
+def test_unmerged_output_writes_parts_and_manifest(tmp_path):
+    per_page = _labels_per_page()
+    records = _records(per_page * 5 + 3)
+    serial = str(tmp_path / "serial.pdf")
+    generate_labels(records, serial, config_file=CONFIG_PATH)
+
+    output = str(tmp_path / "labels.pdf")
+    paths = parallel_render.generate_labels_parallel(records, output, config_file=CONFIG_PATH,
+                                                     workers=2, pages_per_shard=2, merge=False)
+    assert [os.path.basename(path) for path in paths] == ["labels_part001.pdf", "labels_part002.pdf",
+                                                          "labels_part003.pdf"]
+    assert not os.path.exists(output)
+
+    with open(tmp_path / "labels_manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert (manifest["total_parts"], manifest["total_pages"], manifest["total_labels"]) == (3, 6, len(records))
+    assert [part["path"] for part in manifest["parts"]] == paths
+    assert [(part["pages"], part["first_label"], part["labels"]) for part in manifest["parts"]] == [
+        (2, 0, per_page * 2), (2, per_page * 2, per_page * 2), (2, per_page * 4, per_page + 3)]
+    assert [len(PdfReader(path).pages) for path in paths] == [2, 2, 2]
+    assert compare_pdfs(serial, paths, CONFIG_PATH) == []
+
+
+def test_unmerged_output_smaller_than_one_shard(tmp_path):
+    records = _records(_labels_per_page() + 2)
+    output = str(tmp_path / "labels.pdf")
+    paths = parallel_render.generate_labels_parallel(records, output, config_file=CONFIG_PATH,
+                                                     workers=2, pages_per_shard=5, merge=False)
+    assert paths == [str(tmp_path / "labels_part001.pdf")]
+    assert not os.path.exists(output)
+
+    with open(tmp_path / "labels_manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert [(part["path"], part["pages"], part["labels"]) for part in manifest["parts"]] == [
+        (paths[0], 2, len(records))]
+
+
+def test_cli_splits_parallel_output_into_part_files(tmp_path):
+    workbook = tmp_path / "members.xlsx"
+    generate_members(40, seed=2).to_excel(workbook, index=False)
+    output = tmp_path / "out" / "labels.pdf"
+    args = cli.parse_args(["-i", str(workbook), "-o", str(output), "-c", CONFIG_PATH,
+                           "-w", "2", "--pages-per-file", "5"])
+    cli.run(args)
+    assert os.path.exists(tmp_path / "out" / "labels_part001.pdf")
+    assert os.path.exists(tmp_path / "out" / "labels_manifest.json")
+    assert not os.path.exists(output)
+
+
+def test_cli_rejects_stream_with_workers(capsys):
+    with pytest.raises(SystemExit):
+        cli.parse_args(["--stream", "--workers", "2"])
+    assert "--stream cannot be combined with --workers" in capsys.readouterr().err
+    assert cli.parse_args(["--stream", "--workers", "1"]).stream
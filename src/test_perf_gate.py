@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the benchmark regression gate.
+"""
+
+import perf_gate
+
+
+MB = 1024 * 1024
+MACHINE = {"platform": "Linux-6.1-x86_64", "machine": "x86_64", "python": "3.11.7", "cpu_count": 4}
+
+
+def report(**stages):
+    return {"machine": MACHINE, "sizes": {"10k": {"rows": 10000, "stages": {
+        name: {"seconds": seconds, "rows": 10000, "peak_rss_bytes": rss} for name, (seconds, rss) in stages.items()
+    }}}}
+
+
+def test_compare_flags_time_and_memory_regressions():
+    baseline = report(ingest=(2.0, 200 * MB), filter_status=(0.010, 200 * MB), render=(4.0, 300 * MB))
+    current = report(ingest=(2.6, 205 * MB),         # 30% slower
+                     filter_status=(0.015, 200 * MB),  # 50% slower, but only by 5 ms: noise
+                     render=(4.1, 400 * MB),          # Same speed, a third more memory
+                     to_dict=(0.5, 250 * MB))         # Not in the baseline
+
+    rows = {row["stage"]: row for row in perf_gate.compare(baseline, current, threshold=0.2)}
+    assert (rows["ingest"]["time"], rows["ingest"]["memory"]) == ("REGRESSED", "ok")
+    assert rows["filter_status"]["time"] == "ok"
+    assert (rows["render"]["time"], rows["render"]["memory"]) == ("ok", "REGRESSED")
+    assert rows["to_dict"]["time"] == "new"
+    assert [row["stage"] for row in perf_gate.regressions(rows.values())] == ["ingest", "render"]
+
+    # Per-stage thresholds and stage selection
+    rows = perf_gate.compare(baseline, current, stage_thresholds={"ingest": 0.5}, stages=["ingest", "filter"])
+    assert [(row["stage"], row["time"]) for row in rows] == [("ingest", "ok"), ("filter_status", "ok")]
+
+    table = perf_gate.format_table(perf_gate.compare(baseline, current))
+    assert "ingest" in table and "+30.0%" in table and "REGRESSED" in table
+
+
+def test_baselines_are_stored_per_machine(tmp_path):
+    baseline = report(ingest=(2.0, 200 * MB))
+    path = perf_gate.record_baseline(baseline, str(tmp_path))
+    assert path.endswith("Linux-x86_64-4cpu-py3.11.json")
+    assert perf_gate.load_baseline(MACHINE, str(tmp_path)) == baseline
+    assert perf_gate.load_baseline(dict(MACHINE, cpu_count=8), str(tmp_path)) is None
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the opt-in profiler's artifacts.
+"""
+
+import pstats
+import time
+
+from profiling import Profiler, run_profiled
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+def test_profiler_writes_pstats_and_collapsed_stacks(tmp_path):
+    assert run_profiled(str(tmp_path / "run"), busy_loop, 0.2) > 0
+
+    stats = pstats.Stats(str(tmp_path / "run.pstats"))
+    assert any(func[2] == "busy_loop" for func in stats.stats)
+
+    lines = (tmp_path / "run.collapsed").read_text(encoding="utf-8").splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "busy_loop (test_profiling.py:" in stack and int(count) > 0
+
+
+def test_profiler_writes_artifacts_when_the_run_fails(tmp_path):
+    try:
+        with Profiler(tmp_path / "failed"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert (tmp_path / "failed.pstats").exists() and (tmp_path / "failed.collapsed").exists()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the rendered-PDF disk cache.
+"""
+
+import os
+import time
+
+from render_cache import RenderCache, make_key
+
+
+def write_pdf(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'%' * size)
+    return str(path)
+
+
+def test_key_depends_on_every_input():
+    base = dict(content_hash="ab", filters=[None, "1"], window=None, config={"rows": 8})
+    assert make_key(**base) == make_key(**dict(reversed(list(base.items()))))
+    assert make_key(**base) != make_key(**dict(base, window=["limit", 10]))
+    assert make_key(**base) != make_key(**dict(base, config={"rows": 7}))
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = RenderCache(tmp_path / "cache", max_bytes=250)
+    for key in ("a", "b"):
+        cache.put(key, write_pdf(tmp_path / f"{key}.pdf", 100))
+        time.sleep(0.01)
+
+    assert cache.get("a") is not None  # "b" becomes least recently used
+    time.sleep(0.01)
+    cache.put("c", write_pdf(tmp_path / "c.pdf", 100))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert not os.path.exists(tmp_path / "c.pdf")  # Moved into the cache
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["hits"], stats["misses"]) == (2, 200, 3, 1)
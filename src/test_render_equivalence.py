@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the render-equivalence checker: every rendering path must draw the
+same labels as the per-label legacy loop.
+"""
+
+import os
+
+import render_equivalence
+import text_metrics
+from render_equivalence import DrawOp, TextRun
+from synthetic_data import generate_members
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_DIR, "config", "label_config.json")
+
+# Borders, publication codes and Chinese address fields on, so the chrome, the right
+# panel and the subset CJK font are all drawn
+OVERRIDES = {
+    "show_border": True,
+    "display_publication_codes_on_label": ["BE", "AR"],
+    "display_selected_fields_on_label": ["TITLE1", "NAME1", "surname", "post", "sub_unit", "sub_unit_chi",
+                                         "UNIT_NAME", "unit_name_chi", "co_name", "co_name_chi",
+                                         "add1", "add2", "state"],
+}
+
+
+def _records(count=40):
+    return generate_members(count, seed=3).to_dict(orient="records")
+
+
+def test_rendering_paths_match_legacy():
+    results = render_equivalence.check_equivalence(_records(), CONFIG_PATH, OVERRIDES)
+    assert set(results) == set(render_equivalence.RENDER_PATHS) - {"legacy"}
+    assert results == {name: [] for name in results}
+
+
+def test_legacy_reference_catches_layout_regressions(monkeypatch):
+    records = _records(20)
+    # The legacy reference measures with ReportLab itself, so a width table that is off
+    # by a point shows up as a difference
+    string_widths = text_metrics.WidthEngine.string_widths
+    monkeypatch.setattr(text_metrics.WidthEngine, "string_widths",
+                        lambda self, texts, font_name, size: string_widths(self, texts, font_name, size) + 1)
+    results = render_equivalence.check_equivalence(records, CONFIG_PATH, OVERRIDES, paths=("compiled",))
+    assert results["compiled"]
+    assert all("unexpected text" in d or "missing text" in d for d in results["compiled"])
+
+
+def test_rendering_paths_match_reference_pdf(tmp_path):
+    records = _records(20)
+    reference = render_equivalence.render_path("legacy", records, str(tmp_path), CONFIG_PATH, OVERRIDES)
+    results = render_equivalence.check_equivalence(records, CONFIG_PATH, OVERRIDES, paths=("legacy", "compiled"),
+                                                   reference_pdf=reference)
+    assert results == {"legacy": [], "compiled": []}
+
+    changed = [dict(record, NAME1="Someone Else") for record in records]
+    results = render_equivalence.check_equivalence(changed, CONFIG_PATH, OVERRIDES, paths=("legacy",),
+                                                   reference_pdf=reference)
+    assert any("unexpected text 'Someone Else'" in difference for difference in results["legacy"])
+
+
+def test_extraction_expands_static_forms(tmp_path):
+    records = _records(20)
+    slots, width, height = render_equivalence.label_layout(CONFIG_PATH, OVERRIDES)
+    source = render_equivalence.render_path("static_forms", records, str(tmp_path), CONFIG_PATH, OVERRIDES)
+    labels = render_equivalence.group_by_label(render_equivalence.extract_elements(source), slots, width, height)
+
+    for label in range(20):
+        elements = labels[label]
+        # Border and divider from the form, placed in this label's slot
+        assert [element.kind for element in elements if isinstance(element, DrawOp)] == ["stroke", "stroke"]
+        assert sum(isinstance(element, TextRun) and element.text == "CU Bulletin" for element in elements) == 1
+
+
+def test_to_unicode_cmaps_are_decoded():
+    cmap = """
+    1 begincodespacerange <0000> <FFFF> endcodespacerange
+    2 beginbfchar <0001> <0041> <0002> <9999> endbfchar
+    1 beginbfrange <0010> <0012> <4E00> endbfrange
+    1 beginbfrange <0020> <0021> [<0078> <0079>] endbfrange
+    """
+    code_length, mapping = render_equivalence._parse_to_unicode(cmap)
+    assert code_length == 2
+    assert mapping[b"\x00\x01"] == "A" and mapping[b"\x00\x02"] == "香"
+    assert [mapping[bytes([0, code])] for code in (0x10, 0x11, 0x12, 0x20, 0x21)] == ["一", "丁", "丂", "x", "y"]
+
+
+def test_differences_are_reported_per_label(tmp_path):
+    records = _records(20)
+    expected = render_equivalence.render_path("legacy", records, str(tmp_path), CONFIG_PATH, OVERRIDES)
+
+    changed = [dict(record) for record in records]
+    changed[17]["NAME1"] = "Someone Else"
+    changed_dir = tmp_path / "changed"
+    changed_dir.mkdir()
+    actual = render_equivalence.render_path("compiled", changed, str(changed_dir), CONFIG_PATH, OVERRIDES)
+    differences = render_equivalence.compare_pdfs(expected, actual, CONFIG_PATH, OVERRIDES)
+    assert len(differences) == 2  # The old name is missing and the new one unexpected
+    assert all(difference.startswith("label 17 (page 2, slot 2)") for difference in differences)
+
+    # Everything shifted by a third of a point: beyond the default tolerance, within a looser one
+    shifted = dict(OVERRIDES, margin_left=render_equivalence.resolve_config(CONFIG_PATH)["margin_left"] + 0.12)
+    shifted_dir = tmp_path / "shifted"
+    shifted_dir.mkdir()
+    actual = render_equivalence.render_path("compiled", records, str(shifted_dir), CONFIG_PATH, shifted)
+    assert render_equivalence.compare_pdfs(expected, actual, CONFIG_PATH, OVERRIDES)
+    assert render_equivalence.compare_pdfs(expected, actual, CONFIG_PATH, OVERRIDES, tolerance=0.5) == []
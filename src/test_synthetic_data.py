@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the synthetic mailing-database generator and a smoke run of the benchmark suite.
+"""
+
+import pandas as pd
+
+import benchmark
+import filter_engine
+from synthetic_data import COLUMNS, generate_members, ensure_workbook
+
+
+def test_generated_members_are_seeded_and_cpro_shaped():
+    df = generate_members(2000, seed=7)
+    assert list(df.columns) == COLUMNS
+    pd.testing.assert_frame_equal(df, generate_members(2000, seed=7))
+    assert not df.equals(generate_members(2000, seed=8))
+
+    # Several ids per member for some rows, CJK addresses, zones that follow the state
+    assert (df["status_ids"].dropna().str.count(",") > 0).any()
+    assert (df["category_ids"].dropna().str.count(",") > 0).any()
+    assert df["add1"].str.contains("[一-鿿]").any()
+    assert set(df.loc[df["state"] == "CUHK", "MAIL_ZONE"].dropna()) == {1.0}
+
+    # Every filter type selects a proper, non-empty subset
+    for filters in benchmark.FILTERS.values():
+        selected = filter_engine.filter_mask(df, **filters).sum()
+        assert 0 < selected < len(df)
+
+
+def test_benchmark_smoke(tmp_path):
+    workbook = ensure_workbook(200, str(tmp_path), seed=1)
+    assert ensure_workbook(200, str(tmp_path), seed=1) == workbook  # Generated once
+
+    stages = benchmark.bench_pipeline(workbook, 200, render_rows=50)
+    assert {"ingest", "ingest_cached", "filter_status", "to_dict", "render"} <= set(stages)
+    assert stages["render"]["labels"] == 50
+    assert stages["ingest"]["rows_per_second"] > 0
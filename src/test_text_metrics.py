@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the batch text-width engine: every width must match pdfmetrics.stringWidth.
+"""
+
+import os
+
+import pytest
+import reportlab
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+from text_metrics import WidthEngine
+
+
+VERA_PATH = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+
+TEXTS = [
+    "",
+    "Rec. # 12345",
+    "Café, Zürich ½",
+    "香港中文大學",
+    "Flat 3, 香港 Building",
+    "\U0001F600 smile",
+    "𝐀𝐁𝐂",
+    "� unmapped",
+    "\U0010FFFD",
+]
+
+
+def _register_astral_ttf():
+    # ReportLab's bundled TrueType fonts stop at the BMP, so give this copy a couple of
+    # glyphs beyond it, as fonts with emoji or math alphanumerics have
+    pdfmetrics.registerFont(TTFont("VeraAstralTest", VERA_PATH))
+    face = pdfmetrics.getFont("VeraAstralTest").face
+    face.charWidths[0x1F600] = 1234
+    face.charWidths[0x1D400] = 777
+
+
+@pytest.mark.parametrize("font_name", ["Vera", "VeraAstralTest", "Helvetica", "Helvetica-Bold"])
+def test_widths_match_reportlab(font_name):
+    if font_name == "Vera":
+        pdfmetrics.registerFont(TTFont("Vera", VERA_PATH))
+    elif font_name == "VeraAstralTest":
+        _register_astral_ttf()
+
+    engine = WidthEngine()
+    for size in (8, 9.5, 14):
+        widths = engine.string_widths(TEXTS, font_name, size)
+        expected = [pdfmetrics.stringWidth(text, font_name, size) for text in TEXTS]
+        assert widths.tolist() == expected, (font_name, size)
+        # Memoized widths come back the same, one string at a time too
+        assert [engine.string_width(text, font_name, size) for text in TEXTS] == expected
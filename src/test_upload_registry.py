@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the shared upload registry.
+"""
+
+from upload_registry import UploadRegistry
+
+
+def test_registration_is_visible_to_other_workers(tmp_path):
+    db_path = tmp_path / "uploads.sqlite3"
+    worker_a = UploadRegistry(db_path)
+    worker_b = UploadRegistry(db_path)
+
+    worker_a.register("members.xlsx", "ab" * 32, 2048, 120, max_age=3600)
+
+    upload = worker_b.get("members.xlsx")
+    assert (upload["content_hash"], upload["size"], upload["row_count"]) == ("ab" * 32, 2048, 120)
+    assert [u["filename"] for u in worker_b.list()] == ["members.xlsx"]
+    assert worker_b.get("other.xlsx") is None
+
+    # Re-uploading a name replaces its record
+    worker_b.register("members.xlsx", "cd" * 32, 4096, 240, max_age=3600)
+    assert worker_a.get("members.xlsx")["row_count"] == 240
+
+    assert worker_a.remove("members.xlsx")
+    assert worker_b.get("members.xlsx") is None
+    assert not worker_b.remove("members.xlsx")
+
+
+def test_expired_uploads_are_hidden_until_removed(tmp_path):
+    registry = UploadRegistry(tmp_path / "uploads.sqlite3")
+    registry.register("old.xlsx", "00" * 32, 10, 1, max_age=-1)
+    registry.register("new.xlsx", "11" * 32, 10, 1, max_age=3600)
+
+    assert registry.get("old.xlsx") is None
+    assert [u["filename"] for u in registry.list()] == ["new.xlsx"]
+    assert [u["filename"] for u in registry.list(include_expired=True)] == ["old.xlsx", "new.xlsx"]
+    assert [u["filename"] for u in registry.expired()] == ["old.xlsx"]
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the web API. The app runs in a temporary working directory so uploads
+and job state don't touch the repository.
+"""
+
+import asyncio
+import hashlib
+import importlib
+import io
+import os
+import pstats
+import sys
+import time
+
+import httpx
+import pandas as pd
+import pytest
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def web_app(tmp_path_factory):
+    work_dir = tmp_path_factory.mktemp("web")
+    for name in ("static", "templates", "config", "icon"):
+        os.symlink(os.path.join(PROJECT_DIR, name), work_dir / name)
+
+    old_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        sys.modules.pop("web_app", None)
+        module = importlib.import_module("web_app")
+        yield module
+        module.shutdown_executor()
+    finally:
+        os.chdir(old_cwd)
+
+
+def make_workbook(path, rows):
+    pd.DataFrame({
+        "RECEIVE_ID": range(1, rows + 1),
+        "TITLE1": ["Dr."] * rows,
+        "NAME1": [f"Name {i}" for i in range(rows)],
+        "surname": ["Chan"] * rows,
+        "add1": [f"Flat {i}, Block A" for i in range(rows)],
+        "add2": ["Shatin"] * rows,
+        "state": ["Hong Kong"] * rows,
+        "category_ids": ["C_col,C_acd"] * rows,
+        "status_ids": ["1"] * rows,
+        "MAIL_ZONE": [1.0] * rows,
+    }).to_excel(path, index=False)
+
+
+async def timed_get(client, url):
+    start = time.perf_counter()
+    response = await client.get(url)
+    return response, time.perf_counter() - start
+
+
+def test_health_stays_responsive_during_generation(web_app, tmp_path):
+    workbook = tmp_path / "large.xlsx"
+    make_workbook(workbook, rows=6000)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=300) as client:
+            with open(workbook, "rb") as f:
+                response = await client.post("/upload", files={"file": ("large.xlsx", f.read())})
+            assert response.status_code == 200
+
+            idle = [(await timed_get(client, "/health"))[1] for _ in range(5)]
+
+            generate = asyncio.create_task(client.post("/generate", json={"filename": "large.xlsx"}))
+            start = time.perf_counter()
+            busy = []
+            while not generate.done():
+                response, latency = await timed_get(client, "/health")
+                assert response.status_code == 200
+                busy.append(latency)
+                await asyncio.sleep(0.05)
+            generation_time = time.perf_counter() - start
+
+            response = await generate
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/pdf"
+            return idle, busy, generation_time
+
+    idle, busy, generation_time = asyncio.run(scenario())
+
+    # The loop kept answering throughout, and no health check waited anywhere
+    # near as long as the render itself
+    assert len(busy) >= 3
+    assert max(busy) < max(0.25, 20 * max(idle))
+    assert max(busy) < generation_time / 2
+
+
+def test_upload_preview_and_size_limit(web_app, tmp_path, monkeypatch):
+    workbook = tmp_path / "members.xlsx"
+    make_workbook(workbook, rows=250)
+
+    async def upload():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with open(workbook, "rb") as f:
+                return await client.post("/upload", files={"file": ("members.xlsx", f.read())})
+
+    response = asyncio.run(upload())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["rows"] == 250
+    assert body["columns"][:3] == ["RECEIVE_ID", "TITLE1", "NAME1"]
+    assert [row["NAME1"] for row in body["sample_data"]] == ["Name 0", "Name 1", "Name 2"]
+    assert web_app.upload_registry.get("members.xlsx")["size"] == workbook.stat().st_size
+
+    monkeypatch.setattr(web_app, "MAX_UPLOAD_SIZE", 1024)
+    monkeypatch.setattr(web_app, "UPLOAD_CHUNK_SIZE", 256)
+    response = asyncio.run(upload())
+    assert response.status_code == 413
+    assert not any(name.startswith(".part-") for name in os.listdir(web_app.UPLOAD_DIR))
+
+
+def test_failed_upload_keeps_the_previous_file(web_app, tmp_path):
+    first, second = tmp_path / "first.xlsx", tmp_path / "second.xlsx"
+    make_workbook(first, rows=30)
+    make_workbook(second, rows=45)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=300) as client:
+            ok = await client.post("/upload", files={"file": ("replaced.xlsx", first.read_bytes())})
+            broken = await client.post("/upload", files={"file": ("replaced.xlsx", b"not a workbook")})
+            # Two uploads of one name at once each write their own temp file
+            racing = await asyncio.gather(*(
+                client.post("/upload", files={"file": ("raced.xlsx", path.read_bytes())}) for path in (first, second)
+            ))
+            return ok, broken, racing
+
+    ok, broken, racing = asyncio.run(scenario())
+    assert ok.status_code == 200 and broken.status_code == 400
+    stored = web_app.UPLOAD_DIR / "replaced.xlsx"
+    assert stored.read_bytes() == first.read_bytes()
+    assert web_app.upload_registry.get("replaced.xlsx")["content_hash"] == hashlib.sha256(first.read_bytes()).hexdigest()
+
+    assert [response.status_code for response in racing] == [200, 200]
+    raced = (web_app.UPLOAD_DIR / "raced.xlsx").read_bytes()
+    assert raced in (first.read_bytes(), second.read_bytes())
+    assert web_app.upload_registry.get("raced.xlsx")["content_hash"] == hashlib.sha256(raced).hexdigest()
+    assert not any(name.startswith(".part-") for name in os.listdir(web_app.UPLOAD_DIR))
+
+
+def test_identical_generates_share_one_render(web_app, tmp_path, monkeypatch):
+    workbook = tmp_path / "shared.xlsx"
+    make_workbook(workbook, rows=400)
+
+    renders = []
+    render = web_app.render_labels_bytes
+
+    def counting_render(*args, **kwargs):
+        renders.append(args[0])
+        return render(*args, **kwargs)
+
+    monkeypatch.setattr(web_app, "render_labels_bytes", counting_render)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=300) as client:
+            with open(workbook, "rb") as f:
+                await client.post("/upload", files={"file": ("shared.xlsx", f.read())})
+            request = {"filename": "shared.xlsx", "config": {"limit": 300}}
+            return await asyncio.gather(*[client.post("/generate", json=request) for _ in range(4)])
+
+    responses = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len({response.content for response in responses}) == 1
+    assert len({response.headers["etag"] for response in responses}) == 1
+    assert len(renders) == 1
+    assert not web_app._inflight_renders
+
+
+def test_generate_waits_for_render_claimed_by_another_worker(web_app, tmp_path, monkeypatch):
+    workbook = tmp_path / "claimed.xlsx"
+    make_workbook(workbook, rows=50)
+    monkeypatch.setattr(web_app, "RENDER_POLL_INTERVAL", 0.01)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=300) as client:
+            with open(workbook, "rb") as f:
+                await client.post("/upload", files={"file": ("claimed.xlsx", f.read())})
+            content_hash = web_app.upload_registry.get("claimed.xlsx")["content_hash"]
+            cache_key = web_app.render_cache_key(content_hash, {}, "config/label_config.json")
+
+            # Another worker holds the claim; its result appears in the shared cache
+            assert web_app.job_store.claim_render(cache_key, "other-worker", lease=60)
+            generate = asyncio.create_task(client.post("/generate", json={"filename": "claimed.xlsx"}))
+            await asyncio.sleep(0.2)
+            assert not generate.done()
+
+            rendered = tmp_path / "rendered.pdf"
+            rendered.write_bytes(b"%PDF-1.4 rendered elsewhere")
+            web_app.render_cache.put(cache_key, str(rendered))
+            web_app.job_store.release_render(cache_key, "other-worker")
+            return await generate
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.4 rendered elsewhere"
+
+
+def test_generate_takes_over_an_abandoned_render_claim(web_app, tmp_path, monkeypatch):
+    workbook = tmp_path / "abandoned.xlsx"
+    make_workbook(workbook, rows=20)
+    monkeypatch.setattr(web_app, "RENDER_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(web_app, "RENDER_LEASE", 0.5)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=300) as client:
+            with open(workbook, "rb") as f:
+                await client.post("/upload", files={"file": ("abandoned.xlsx", f.read())})
+            content_hash = web_app.upload_registry.get("abandoned.xlsx")["content_hash"]
+            cache_key = web_app.render_cache_key(content_hash, {}, "config/label_config.json")
+
+            # A worker claimed the render and died without releasing it
+            assert web_app.job_store.claim_render(cache_key, "dead-worker", lease=60)
+            response = await asyncio.wait_for(client.post("/generate", json={"filename": "abandoned.xlsx"}), 30)
+            return response, cache_key
+
+    response, cache_key = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert not web_app.job_store.render_claimed(cache_key, lease=60)
+    assert not web_app._inflight_renders
+
+
+def test_export_and_generate_stream_from_memory(web_app, tmp_path):
+    workbook = tmp_path / "会员.xlsx"
+    make_workbook(workbook, rows=30)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=300) as client:
+            with open(workbook, "rb") as f:
+                await client.post("/upload", files={"file": ("会员.xlsx", f.read())})
+            request = {"filename": "会员.xlsx", "config": {"limit": 12}}
+            return (await client.post("/export-filtered", json=request),
+                    await client.post("/generate", json=request))
+
+    exported, generated = asyncio.run(scenario())
+    assert exported.status_code == 200
+    assert exported.headers["content-disposition"] == "attachment; filename*=utf-8''filtered_%E4%BC%9A%E5%91%98.xlsx"
+    assert int(exported.headers["content-length"]) == len(exported.content)
+    assert list(pd.read_excel(io.BytesIO(exported.content))["NAME1"]) == [f"Name {i}" for i in range(12)]
+
+    assert generated.status_code == 200
+    assert generated.content.startswith(b"%PDF")
+    assert int(generated.headers["content-length"]) == len(generated.content)
+    cache_dir = web_app.render_cache.cache_dir
+    assert not any(name.endswith(".tmp") for name in os.listdir(cache_dir))
+
+
+def test_metrics_endpoint(web_app):
+    async def scrape():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/metrics")
+
+    response = asyncio.run(scrape())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for name in ("label_stage_duration_seconds_bucket", "label_pages_total", 'label_cache_hit_ratio{cache="filter"}',
+                 "label_job_queue_depth 0", "process_resident_memory_bytes"):
+        assert name in response.text
+
+
+def test_profiled_generate_for_admins_only(web_app, tmp_path, monkeypatch):
+    workbook = tmp_path / "profiled.xlsx"
+    make_workbook(workbook, rows=40)
+    monkeypatch.setattr(web_app, "ADMIN_TOKEN", "secret")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=web_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=300) as client:
+            with open(workbook, "rb") as f:
+                await client.post("/upload", files={"file": ("profiled.xlsx", f.read())})
+            request = {"filename": "profiled.xlsx"}
+            denied = await client.post("/generate?profile=1", json=request)
+            profiled = await client.post("/generate", json=request,
+                                         headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+            profile_id = profiled.headers["x-profile-id"]
+            stacks = await client.get(f"/profiles/{profile_id}/collapsed", headers={"X-Admin-Token": "secret"})
+            dump = await client.get(f"/profiles/{profile_id}/pstats", headers={"X-Admin-Token": "secret"})
+            anonymous = await client.get(f"/profiles/{profile_id}/pstats")
+            return denied, profiled, stacks, dump, anonymous
+
+    denied, profiled, stacks, dump, anonymous = asyncio.run(scenario())
+    assert denied.status_code == 403
+    assert profiled.status_code == 200 and profiled.content.startswith(b"%PDF")
+    assert stacks.status_code == 200 and "generate_labels" in stacks.text
+
+    # The profile covers a full read and filter, not an ingest or filter cache hit
+    (tmp_path / "run.pstats").write_bytes(dump.content)
+    profiled_functions = {name for _, _, name in pstats.Stats(str(tmp_path / "run.pstats")).stats}
+    assert "filter_mask" in profiled_functions
+    assert not profiled_functions & {"read_excel_cached", "make_key"}
+    assert anonymous.status_code == 403
+
+
+def test_startup_warms_the_font_of_the_label_config(web_app, monkeypatch):
+    registered = []
+    monkeypatch.setattr(web_app, "register_cjk_font", lambda config, config_file=None: registered.append((config, config_file)))
+    monkeypatch.setattr(web_app.job_queue, "shutdown", lambda: None)
+    monkeypatch.setattr(web_app, "shutdown_executor", lambda: None)
+
+    async def startup():
+        async with web_app.lifespan(web_app.app):
+            pass
+
+    asyncio.run(startup())
+    config_path = "config/label_config.json"
+    assert registered == [(web_app.load_config(config_path), config_path)]
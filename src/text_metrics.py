@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Batch text-width engine for label layout.
+
+Centering text on a label needs its rendered width. Rather than calling
+canvas.stringWidth for every string inside the render loop, the engine builds
+a glyph advance table per registered font once and measures whole columns of
+strings in one NumPy pass, memoizing repeated strings.
+"""
+
+import numpy as np
+from reportlab.lib.rl_accel import unicode2T1
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+# Memoized widths per (font, size) before the memo is reset
+MAX_MEMO_ENTRIES = 100000
+
+
+class _AdvanceTable:
+    """Advance widths (in 1/1000 em) indexed by code point for one font."""
+
+    def __init__(self, font_name):
+        self.font_name = font_name
+        font = pdfmetrics.getFont(font_name)
+        self.is_ttf = isinstance(font, TTFont)
+
+        if self.is_ttf:
+            # TrueType: every code point maps straight to charWidths, with a default width.
+            # The table stops at the BMP; fonts with glyphs beyond it measure those
+            # strings with ReportLab instead.
+            char_widths = font.face.charWidths
+            self.default_width = font.face.defaultWidth
+            last = max(char_widths, default=255)
+            size = min(last, 0xFFFF) + 1
+            self.widths = np.full(size, self.default_width, dtype=np.float64)
+            for code_point, width in char_widths.items():
+                if code_point < size:
+                    self.widths[code_point] = width
+            self.covers_all = last <= 0xFFFF
+        else:
+            # Type 1: only Latin-1 is tabulated; other characters go through ReportLab,
+            # which may substitute Symbol/ZapfDingbats glyphs
+            self.default_width = None
+            fonts = [font] + font.substitutionFonts
+            self.widths = np.array([
+                sum(f.widths[code] for f, codes in unicode2T1(chr(i), fonts) for code in codes)
+                for i in range(256)
+            ], dtype=np.float64)
+            self.covers_all = False
+
+    def scale(self, total, size):
+        # Same operation order as ReportLab's T1/TTF width functions
+        if self.is_ttf:
+            return 0.001 * size * total
+        return total * 0.001 * size
+
+
+class WidthEngine:
+    """
+    Measures strings with precomputed advance tables.
+
+    Widths match pdfmetrics.stringWidth. Strings the tables cannot cover
+    (non-Latin-1 text in a Type 1 font, characters beyond the BMP in a TrueType
+    font that has glyphs there) fall back to ReportLab.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._memo = {}
+
+    def _table(self, font_name):
+        table = self._tables.get(font_name)
+        if table is None:
+            table = _AdvanceTable(font_name)
+            self._tables[font_name] = table
+        return table
+
+    def _memo_for(self, font_name, size):
+        memo = self._memo.get((font_name, size))
+        if memo is None or len(memo) > MAX_MEMO_ENTRIES:
+            memo = {}
+            self._memo[(font_name, size)] = memo
+        return memo
+
+    def string_width(self, text, font_name, size):
+        """Width of one string in points."""
+        return float(self.string_widths([text], font_name, size)[0])
+
+    def string_widths(self, texts, font_name, size):
+        """
+        Widths of many strings in points, measured in one vectorized pass.
+
+        Args:
+            texts (list): Strings to measure.
+            font_name (str): Registered font name.
+            size (float): Font size.
+
+        Returns:
+            numpy.ndarray: One width per string.
+        """
+        memo = self._memo_for(font_name, size)
+        result = np.empty(len(texts), dtype=np.float64)
+        pending = {}
+        for i, text in enumerate(texts):
+            width = memo.get(text)
+            if width is None:
+                pending.setdefault(text, []).append(i)
+            else:
+                result[i] = width
+
+        if pending:
+            unique_texts = list(pending)
+            widths = self._measure(unique_texts, font_name, size)
+            for text, width in zip(unique_texts, widths):
+                memo[text] = width
+                result[pending[text]] = width
+        return result
+
+    def _measure(self, texts, font_name, size):
+        table = self._table(font_name)
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.intp, count=len(texts))
+        code_points = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+
+        outside = code_points >= len(table.widths)
+        if table.covers_all:
+            advances = np.where(outside, table.default_width, table.widths[np.minimum(code_points, len(table.widths) - 1)])
+        else:
+            advances = table.widths[np.minimum(code_points, len(table.widths) - 1)]
+
+        totals = np.zeros(len(texts), dtype=np.float64)
+        non_empty = lengths > 0
+        if code_points.size:
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            totals[non_empty] = np.add.reduceat(advances, starts[non_empty])
+        widths = [table.scale(total, size) for total in totals.tolist()]
+
+        if not table.covers_all and outside.any():
+            # Strings with characters beyond the table are measured by ReportLab
+            owner = np.repeat(np.arange(len(texts)), lengths)
+            for i in np.unique(owner[outside]).tolist():
+                widths[i] = pdfmetrics.stringWidth(texts[i], font_name, size)
+        return widths
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Registry of uploaded workbooks shared by all web worker processes.
+
+Each upload is recorded in a SQLite database (WAL mode) keyed by filename,
+with its content hash, size, row count and expiry time. Every gunicorn worker
+sees an upload as soon as the worker that received it has registered it, and
+no worker has to scan the upload directory at startup.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+
+class UploadRegistry:
+    """
+    SQLite-backed index of uploads.
+
+    Each call opens its own short-lived connection, so the registry can be used
+    from the event loop and executor threads alike.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            # WAL lets lookups from other workers proceed while an upload is registered
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS uploads (
+                    filename TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    row_count INTEGER,
+                    uploaded_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS uploads_expires_at ON uploads (expires_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def register(self, filename, content_hash, size, row_count, max_age):
+        """
+        Record (or replace) an upload.
+
+        Args:
+            filename (str): Name the file is stored under in the upload directory.
+            content_hash (str): SHA-256 of the file contents.
+            size (int): File size in bytes.
+            row_count (int): Non-empty data rows in the first sheet.
+            max_age (float): Seconds until the upload expires.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads (filename, content_hash, size, row_count, uploaded_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (filename, content_hash, size, row_count, now, now + max_age),
+            )
+
+    def get(self, filename):
+        """Return the upload record as a dict, or None if it is unknown or has expired."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM uploads WHERE filename = ? AND expires_at > ?", (filename, time.time())
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def list(self, include_expired=False):
+        """Return all upload records, oldest first."""
+        sql = "SELECT * FROM uploads"
+        params = ()
+        if not include_expired:
+            sql += " WHERE expires_at > ?"
+            params = (time.time(),)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql + " ORDER BY uploaded_at", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def expired(self):
+        """Return the records of uploads whose expiry time has passed."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM uploads WHERE expires_at <= ?", (time.time(),)).fetchall()
+        return [dict(row) for row in rows]
+
+    def remove(self, filename):
+        """Forget an upload. Returns True if it was registered."""
+        with closing(self._connect()) as conn, conn:
+            return conn.execute("DELETE FROM uploads WHERE filename = ?", (filename,)).rowcount > 0
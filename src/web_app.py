@@ -6,73 +6,162 @@ FastAPI web application for the label generator.
 """
 
 import os
+import hashlib
+import hmac
 import io
 import json
-import tempfile
 import numpy as np
 import shutil
 import time
 import asyncio
+import functools
+import multiprocessing
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, List
+from urllib.parse import quote
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, BackgroundTasks
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 import pandas as pd
 
 # Import our existing label generation modules
-from simple_labels import load_data_from_excel, generate_labels, load_config
+from simple_labels import load_config, register_cjk_font
+import ingest_cache
+import metrics
+from profiling import run_profiled
+from upload_registry import UploadRegistry
+from label_jobs import (JobStore, JobQueue, preview_upload, export_filtered_bytes, render_labels_bytes,
+                        render_cache_key, filter_cache, JOB_QUEUED, JOB_RUNNING, JOB_DONE, NO_DATA_MESSAGE)
+from render_cache import RenderCache
 
 
 # Create a persistent upload directory
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Parsed uploads are cached here as Parquet, keyed by the SHA-256 of the workbook
+INGEST_CACHE_DIR = UPLOAD_DIR / ".ingest_cache"
+
 # File cleanup configuration (in seconds)
 FILE_MAX_AGE = 3600  # 1 hour = 3600 seconds
-CLEANUP_INTERVAL = 1800  # Run cleanup every 30 minutes
+CLEANUP_INTERVAL = 300  # Run cleanup every 5 minutes
+
+# Uploads are streamed to disk in chunks of this size and rejected above the maximum
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_SIZE = int(os.environ.get('LABEL_MAX_UPLOAD_MB', 50)) * 1024 * 1024
+
+# Uploads known to every worker (filename, hash, size, rows, expiry); the files themselves stay on disk
+upload_registry = UploadRegistry(UPLOAD_DIR / ".registry" / "uploads.sqlite3")
+
+# Rendered PDFs, reused for identical uploads, filters, batch windows and configs
+RENDER_CACHE_MB = int(os.environ.get('LABEL_RENDER_CACHE_MB', 512))
+render_cache = RenderCache(UPLOAD_DIR / ".render_cache", max_bytes=RENDER_CACHE_MB * 1024 * 1024)
+
+# Background label jobs: state shared by all workers through SQLite, results stored next to it
+JOBS_DIR = UPLOAD_DIR / ".jobs"
+JOB_WORKERS = int(os.environ.get('LABEL_JOB_WORKERS', 2))
+# Every job records its memory use per stage; LABEL_JOB_MEMORY_TRACE=1 adds tracemalloc figures (slower)
+JOB_MEMORY_TRACE = os.environ.get('LABEL_JOB_MEMORY_TRACE', '0') == '1'
+job_store = JobStore(JOBS_DIR / "jobs.sqlite3")
+job_queue = JobQueue(job_store, max_workers=JOB_WORKERS, memory_trace=JOB_MEMORY_TRACE)
+
+# Identical /generate requests share one render: within a worker through in-flight tasks,
+# across workers through a claim in the job store. A claim older than the lease is
+# assumed abandoned by a dead worker and taken over.
+RENDER_LEASE = int(os.environ.get('LABEL_RENDER_LEASE', 600))
+RENDER_POLL_INTERVAL = 0.2
+_inflight_renders = {}
+
+# PDFs and exports rendered in memory are sent in chunks of this size
+STREAM_CHUNK_SIZE = 64 * 1024
 
-# Global storage for tracking uploaded files (just filenames, actual files on disk)
-uploaded_files = set()
+# Admins (requests carrying X-Admin-Token) can profile a /generate run with ?profile=1
+# or X-Profile: 1. Profiling is unavailable when LABEL_ADMIN_TOKEN is not set.
+ADMIN_TOKEN = os.environ.get('LABEL_ADMIN_TOKEN')
+PROFILE_DIR = UPLOAD_DIR / ".profiles"
+PROFILE_ARTIFACTS = {"pstats": "application/octet-stream", "collapsed": "text/plain; charset=utf-8"}
 
-# Load existing uploaded files on startup
-for file_path in UPLOAD_DIR.glob("*"):
-    if file_path.is_file():
-        uploaded_files.add(file_path.name)
+
+
+def remove_upload(filename):
+    """Delete an upload's file, its ingest cache entry and its registry record."""
+    file_path = UPLOAD_DIR / filename
+    ingest_cache.invalidate(str(file_path), str(INGEST_CACHE_DIR))
+    if file_path.exists():
+        file_path.unlink()
+    upload_registry.remove(filename)
+
+
+def get_upload_path(filename):
+    """Return the path of a registered upload, or raise a 404 HTTPException."""
+    if upload_registry.get(filename) is None:
+        raise HTTPException(status_code=404, detail="File not found. Please upload the file first.")
+    
+    file_path = UPLOAD_DIR / filename
+    if not file_path.exists():
+        # File was registered but doesn't exist on disk - remove from the registry
+        upload_registry.remove(filename)
+        raise HTTPException(status_code=404, detail="File not found on disk. Please upload the file again.")
+    return file_path
 
 
 def cleanup_old_uploads():
-    """Remove uploaded files older than FILE_MAX_AGE seconds."""
+    """
+    Remove expired uploads, plus unregistered files older than FILE_MAX_AGE seconds.
+    
+    Returns:
+        list: {"filename", "age_seconds"} for every file removed.
+    """
+    cleaned_files = []
     try:
         current_time = time.time()
-        cleaned_count = 0
         
+        for upload in upload_registry.expired():
+            age = current_time - upload["uploaded_at"]
+            try:
+                remove_upload(upload["filename"])
+                cleaned_files.append({"filename": upload["filename"], "age_seconds": int(age)})
+                print(f"Cleaned up old file: {upload['filename']} (age: {age:.0f}s)")
+            except Exception as e:
+                print(f"Error cleaning up {upload['filename']}: {e}")
+        
+        # Files on disk without a registry record (e.g. an upload that failed to parse)
         for file_path in UPLOAD_DIR.glob("*"):
-            # Skip .gitkeep and directories
-            if file_path.name == ".gitkeep" or not file_path.is_file():
+            # Skip .gitkeep, internal state files and directories
+            if file_path.name.startswith(".") or not file_path.is_file():
                 continue
             
-            # Check file age
             file_age = current_time - file_path.stat().st_mtime
-            
-            if file_age > FILE_MAX_AGE:
+            if file_age > FILE_MAX_AGE and upload_registry.get(file_path.name) is None:
                 try:
-                    file_path.unlink()
-                    uploaded_files.discard(file_path.name)
-                    cleaned_count += 1
-                    print(f"Cleaned up old file: {file_path.name} (age: {file_age:.0f}s)")
+                    remove_upload(file_path.name)
+                    cleaned_files.append({"filename": file_path.name, "age_seconds": int(file_age)})
+                    print(f"Cleaned up unregistered file: {file_path.name} (age: {file_age:.0f}s)")
                 except Exception as e:
                     print(f"Error cleaning up {file_path.name}: {e}")
         
-        if cleaned_count > 0:
-            print(f"Cleanup complete: {cleaned_count} file(s) removed")
+        if cleaned_files:
+            print(f"Cleanup complete: {len(cleaned_files)} file(s) removed")
+        
+        # Profiling artifacts
+        for file_path in PROFILE_DIR.glob("*"):
+            if current_time - file_path.stat().st_mtime > FILE_MAX_AGE:
+                file_path.unlink()
+        
+        expired_jobs = job_store.expire(FILE_MAX_AGE)
+        if expired_jobs > 0:
+            print(f"Cleanup complete: {expired_jobs} finished job(s) removed")
         
     except Exception as e:
         print(f"Error during cleanup: {e}")
+    
+    return cleaned_files
 
 
 async def periodic_cleanup():
@@ -89,7 +178,11 @@ async def lifespan(app: FastAPI):
     print(f"Starting file cleanup service (max age: {FILE_MAX_AGE}s, interval: {CLEANUP_INTERVAL}s)")
     # Don't clean up files on startup - only run periodic cleanup
     # This allows recently uploaded files to persist across restarts
-    print(f"Found {len(uploaded_files)} existing file(s) in upload directory")
+    print(f"Found {len(upload_registry.list())} registered upload(s)")
+    # Load (and if needed build the cache for) the CJK font now, not on the first /generate,
+    # using the same label config the endpoints render with
+    config_path = "config/label_config.json"
+    register_cjk_font(load_config(config_path), config_path)
     # Start periodic cleanup task
     cleanup_task = asyncio.create_task(periodic_cleanup())
     
@@ -97,6 +190,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("Shutting down file cleanup service...")
+    job_queue.shutdown()
+    shutdown_executor()
     cleanup_task.cancel()
     try:
         await cleanup_task
@@ -131,6 +226,7 @@ class LabelConfig(BaseModel):
     limit: Optional[int] = None
     start_index: int = 0
     batch_size: Optional[int] = None
+    streaming: bool = False  # Stream rows from the workbook instead of loading a DataFrame
 
 
 class GenerateLabelsRequest(BaseModel):
@@ -138,58 +234,135 @@ class GenerateLabelsRequest(BaseModel):
     config: Optional[LabelConfig] = None
 
 
-# Create a persistent upload directory
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# CPU-bound work (parsing, filtering, rendering, exporting) runs on an executor so the
+# event loop keeps answering other requests. LABEL_EXECUTOR is "thread" or "process".
+EXECUTOR_KIND = os.environ.get('LABEL_EXECUTOR', 'thread')
+EXECUTOR_WORKERS = int(os.environ.get('LABEL_EXECUTOR_WORKERS', 2))
+# Heavy requests running at once in this worker; further ones wait for a slot
+MAX_CONCURRENT_TASKS = int(os.environ.get('LABEL_MAX_CONCURRENCY', EXECUTOR_WORKERS))
+task_slots = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+_executor = None
 
-# File cleanup configuration (in seconds)
-FILE_MAX_AGE = 3600  # 1 hour = 3600 seconds
-CLEANUP_INTERVAL = 300  # Run cleanup every 5 minutes
 
-# Global storage for tracking uploaded files (just filenames, actual files on disk)
-uploaded_files = set()
+def get_executor():
+    """Return this worker's executor for blocking work, creating it on first use."""
+    global _executor
+    if _executor is None:
+        if EXECUTOR_KIND == 'process':
+            # Spawned workers don't inherit the server's threads or open sockets
+            _executor = ProcessPoolExecutor(max_workers=EXECUTOR_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="label-work")
+    return _executor
 
-# Load existing uploaded files on startup
-for file_path in UPLOAD_DIR.glob("*"):
-    if file_path.is_file():
-        uploaded_files.add(file_path.name)
 
+def shutdown_executor():
+    """Shut down the executor, if one was created."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
 
-def cleanup_old_uploads():
-    """Remove uploaded files older than FILE_MAX_AGE seconds."""
-    try:
-        current_time = time.time()
-        cleaned_count = 0
-        
-        for file_path in UPLOAD_DIR.glob("*"):
-            # Skip .gitkeep and directories
-            if file_path.name == ".gitkeep" or not file_path.is_file():
-                continue
-            
-            # Check file age
-            file_age = current_time - file_path.stat().st_mtime
-            
-            if file_age > FILE_MAX_AGE:
-                try:
-                    file_path.unlink()
-                    uploaded_files.discard(file_path.name)
-                    cleaned_count += 1
-                    print(f"Cleaned up old file: {file_path.name} (age: {file_age:.0f}s)")
-                except Exception as e:
-                    print(f"Error cleaning up {file_path.name}: {e}")
-        
-        if cleaned_count > 0:
-            print(f"Cleanup complete: {cleaned_count} file(s) removed")
-        
-    except Exception as e:
-        print(f"Error during cleanup: {e}")
 
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking function on the executor without stalling the event loop.
 
-async def periodic_cleanup():
-    """Background task to periodically clean up old files."""
+    At most MAX_CONCURRENT_TASKS calls run at once. With the process executor,
+    func and its arguments must be picklable (module-level functions, plain values).
+    """
+    async with task_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches the ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+
+async def _render_once(cache_key, file_path, config_dict, config_path):
+    """Render into the render cache unless another worker is already doing so, then wait for it."""
     while True:
-        await asyncio.sleep(CLEANUP_INTERVAL)
-        cleanup_old_uploads()
+        cached_path = render_cache.get(cache_key)
+        if cached_path is not None:
+            return cached_path
+
+        owner = uuid.uuid4().hex
+        if job_store.claim_render(cache_key, owner, RENDER_LEASE):
+            try:
+                # Render in memory: the PDF goes to the cache and the callers without a disk round trip
+                pdf = await run_blocking(render_labels_bytes, file_path, config_dict, config_path,
+                                         cache_dir=str(INGEST_CACHE_DIR))
+                if pdf is not None:
+                    await asyncio.to_thread(render_cache.put_bytes, cache_key, pdf)
+                return pdf
+            finally:
+                job_store.release_render(cache_key, owner)
+
+        # Another worker is rendering the same PDF: wait for its claim to go away or run
+        # past its lease. If it failed or died there is still no cache entry, and the
+        # next pass takes the claim over and renders here instead.
+        while job_store.render_claimed(cache_key, RENDER_LEASE):
+            await asyncio.sleep(RENDER_POLL_INTERVAL)
+
+
+async def render_coalesced(cache_key, file_path, config_dict, config_path):
+    """
+    Render labels into the render cache, sharing the work between identical concurrent requests.
+
+    Args:
+        cache_key (str): Render cache key from render_cache_key.
+        file_path (str): Uploaded workbook.
+        config_dict (dict): Request options for render_labels_from_upload.
+        config_path (str): Label configuration file.
+
+    Returns:
+        bytes or str: The PDF rendered here, or the path of the cached PDF when it
+        was rendered elsewhere; None if no rows matched. Every caller waiting on
+        the same key gets the same result (or the same exception).
+    """
+    task = _inflight_renders.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_render_once(cache_key, file_path, config_dict, config_path))
+        _inflight_renders[cache_key] = task
+        task.add_done_callback(lambda _: _inflight_renders.pop(cache_key, None))
+    # A client that disconnects must not cancel the render the other callers are waiting on
+    return await asyncio.shield(task)
+
+
+def stream_bytes(data, media_type, filename, headers=None):
+    """Return an in-memory file as a chunked StreamingResponse download."""
+    view = memoryview(data)
+    chunks = (view[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(view), STREAM_CHUNK_SIZE))
+    # Same Content-Disposition as FileResponse, including non-ASCII filenames
+    quoted = quote(filename)
+    if quoted != filename:
+        disposition = f"attachment; filename*=utf-8''{quoted}"
+    else:
+        disposition = f'attachment; filename="{filename}"'
+    headers = dict(headers or {}, **{"Content-Disposition": disposition, "Content-Length": str(len(data))})
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+def require_admin(http_request):
+    """Raise a 403 HTTPException unless the request carries the admin token."""
+    token = http_request.headers.get('x-admin-token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def profile_requested(http_request):
+    """Whether the request asks to be profiled (only admins may)."""
+    flag = http_request.query_params.get('profile') or http_request.headers.get('x-profile')
+    if not flag or flag.lower() in ('0', 'false', 'no'):
+        return False
+    require_admin(http_request)
+    return True
 
 
 def clean_data_for_json(data):
@@ -224,104 +397,93 @@ async def config_page(request: Request):
 
 
 @app.post("/upload")
-async def upload_excel_file(file: UploadFile = File(...)):
+async def upload_excel_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """Upload an Excel file for processing."""
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="Only Excel files (.xlsx, .xls) are allowed")
     
+    file_path = UPLOAD_DIR / file.filename
+    # Unique per request, so concurrent uploads of one name don't share a temp file. The
+    # name keeps the extension, so the upload can be validated before it is moved into place.
+    partial_path = UPLOAD_DIR / f".part-{uuid.uuid4().hex}-{file.filename}"
+    
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Save file to disk
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, 'wb') as f:
-            f.write(content)
-        
-        # Track uploaded file
-        uploaded_files.add(file.filename)
-        
-        # Load and preview the data
-        df = pd.read_excel(file_path)
-        
-        # Get sample data and clean it for JSON serialization
-        sample_data = df.head(3).to_dict(orient='records')
-        clean_sample_data = clean_data_for_json(sample_data)
-        
-        # Count only non-empty rows (rows that have at least one non-null value)
-        non_empty_rows = df.dropna(how='all').shape[0]
+        # Stream the upload to disk chunk by chunk, hashing as the bytes arrive
+        sha = hashlib.sha256()
+        size = 0
+        with open(partial_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File is larger than the {MAX_UPLOAD_SIZE // (1024 * 1024)} MB upload limit"
+                    )
+                sha.update(chunk)
+                f.write(chunk)
+        
+        # Preview from the first rows and the sheet's dimension, off the event loop. This also
+        # validates the workbook: a file that can't be read never replaces a previous upload.
+        preview = await run_blocking(preview_upload, str(partial_path))
+        
+        # Move the file into place. The previous upload's registry entry (and with it its
+        # content hash, which keys the render and filter caches) and cached parse go first,
+        # so no worker pairs the new bytes with the old hash.
+        upload_registry.remove(file.filename)
+        ingest_cache.invalidate(str(file_path), str(INGEST_CACHE_DIR))
+        os.replace(partial_path, file_path)
+        content_hash = sha.hexdigest()
+        ingest_cache.record_sha256(str(file_path), content_hash)
+        
+        # Make the upload visible to every worker
+        upload_registry.register(file.filename, content_hash, size, preview["rows"], FILE_MAX_AGE)
+        
+        # Parse the full sheet into the ingest cache after responding, ready for /generate
+        background_tasks.add_task(run_blocking, ingest_cache.warm, str(file_path), str(INGEST_CACHE_DIR))
         
         return {
             "message": f"File '{file.filename}' uploaded successfully",
             "filename": file.filename,
-            "rows": non_empty_rows,
-            "columns": list(df.columns[:10]),  # Show first 10 columns as preview
-            "sample_data": clean_sample_data  # Show first 3 rows
+            "rows": preview["rows"],
+            "columns": preview["columns"],  # Show first 10 columns as preview
+            "sample_data": clean_data_for_json(preview["sample_data"])  # Show first 3 rows
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+    finally:
+        if partial_path.exists():
+            partial_path.unlink()
 
 
 @app.get("/files")
 async def list_uploaded_files():
     """List all uploaded files."""
-    return {"files": list(uploaded_files)}
+    return {"files": [upload["filename"] for upload in upload_registry.list()]}
 
 
 @app.post("/export-filtered")
-async def export_filtered_excel(request: GenerateLabelsRequest, background_tasks: BackgroundTasks):
+async def export_filtered_excel(request: GenerateLabelsRequest):
     """Export filtered Excel data based on the provided configuration."""
     filename = request.filename
     
-    if filename not in uploaded_files:
-        raise HTTPException(status_code=404, detail="File not found. Please upload the file first.")
-    
     # Get the file path from disk
-    file_path = UPLOAD_DIR / filename
-    if not file_path.exists():
-        # File was tracked but doesn't exist on disk - remove from tracking
-        uploaded_files.discard(filename)
-        raise HTTPException(status_code=404, detail="File not found on disk. Please upload the file again.")
+    file_path = get_upload_path(filename)
     
     try:
         # Load data with filters if provided
         config_dict = request.config.dict() if request.config else {}
         
-        df = load_data_from_excel(
-            str(file_path),
-            category_filter=config_dict.get('category_filter'),
-            category_exclude_filter=config_dict.get('category_exclude_filter'),
-            status_filter=config_dict.get('status_filter'),
-            status_exclude_filter=config_dict.get('status_exclude_filter'),
-            mail_zone_filter=config_dict.get('mail_zone_filter'),
-            publication_columns=config_dict.get('publication_columns'),
-            filter_mode=config_dict.get('filter_mode', 'OR')
-        )
+        # Filter and export the data off the event loop, in memory
+        exported = await run_blocking(export_filtered_bytes, str(file_path), config_dict, str(INGEST_CACHE_DIR))
         
-        if df is None or df.empty:
+        if exported is None:
             raise HTTPException(status_code=400, detail="No data found after applying filters")
         
-        # Apply batch processing if specified
-        if config_dict.get('batch_size'):
-            start_idx = config_dict.get('start_index', 0)
-            end_idx = start_idx + config_dict['batch_size']
-            df = df.iloc[start_idx:end_idx]
-        elif config_dict.get('limit'):
-            df = df.head(config_dict['limit'])
-        
-        # Create temporary output file for filtered Excel
-        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as output_file:
-            output_path = output_file.name
-        
-        # Export filtered data to Excel
-        df.to_excel(output_path, index=False, engine='openpyxl')
-        
-        # Schedule cleanup of temp output file after response
-        background_tasks.add_task(os.unlink, output_path)
-        
         # Return the Excel file
-        return FileResponse(
-            output_path,
+        return stream_bytes(
+            exported,
             media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             filename=f"filtered_{filename}"
         )
@@ -331,86 +493,147 @@ async def export_filtered_excel(request: GenerateLabelsRequest, background_tasks
 
 
 @app.post("/generate")
-async def generate_labels_endpoint(request: GenerateLabelsRequest, background_tasks: BackgroundTasks):
+async def generate_labels_endpoint(request: GenerateLabelsRequest, http_request: Request):
     """Generate labels from uploaded Excel data."""
     filename = request.filename
     
-    if filename not in uploaded_files:
-        raise HTTPException(status_code=404, detail="File not found. Please upload the file first.")
-    
     # Get the file path from disk
-    file_path = UPLOAD_DIR / filename
-    if not file_path.exists():
-        # File was tracked but doesn't exist on disk - remove from tracking
-        uploaded_files.discard(filename)
-        raise HTTPException(status_code=404, detail="File not found on disk. Please upload the file again.")
+    file_path = get_upload_path(filename)
     
     try:
         # Load data with filters if provided
         config_dict = request.config.dict() if request.config else {}
         
-        df = load_data_from_excel(
-            str(file_path),
-            category_filter=config_dict.get('category_filter'),
-            category_exclude_filter=config_dict.get('category_exclude_filter'),
-            status_filter=config_dict.get('status_filter'),
-            status_exclude_filter=config_dict.get('status_exclude_filter'),
-            mail_zone_filter=config_dict.get('mail_zone_filter'),
-            publication_columns=config_dict.get('publication_columns'),
-            filter_mode=config_dict.get('filter_mode', 'OR')
-        )
-        
-        if df is None or df.empty:
-            raise HTTPException(status_code=400, detail="No data found or data could not be loaded")
-        
-        # Apply batch processing if specified
-        if config_dict.get('batch_size'):
-            start_idx = config_dict.get('start_index', 0)
-            end_idx = start_idx + config_dict['batch_size']
-            df = df.iloc[start_idx:end_idx]
-        elif config_dict.get('limit'):
-            df = df.head(config_dict['limit'])
-        
-        # Convert to records
-        records = df.to_dict(orient='records')
-        
-        # Create temporary output file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as output_file:
-            output_path = output_file.name
-        
         # Load label configuration
         config_path = "config/label_config.json"
         
-        # Prepare config overrides for publication codes display
-        temp_config_overrides = {}
-        
-        # If publication_columns are specified, use them for display on labels
-        if config_dict.get('publication_columns'):
-            # The publication_columns from the request are the same as what should be displayed
-            # For example, if filtering by ["BE"], display "BE" codes on labels
-            temp_config_overrides['display_publication_codes_on_label'] = config_dict['publication_columns']
-        
-        # Generate labels with config overrides
-        generate_labels(records, output_path, config_file=config_path, temp_config_overrides=temp_config_overrides)
-        
-        # Check if file was created successfully
-        if not os.path.exists(output_path):
-            raise HTTPException(status_code=500, detail="Failed to generate labels")
-        
-        # Schedule cleanup of temp output file after response
-        background_tasks.add_task(os.unlink, output_path)
-        
-        # Return the PDF file
-        return FileResponse(
-            output_path,
-            media_type='application/pdf',
-            filename=f"labels_{filename.split('.')[0]}.pdf"
-        )
+        # A profiled run always renders and keeps its profile for download. Without a cache_dir it
+        # reads the workbook and filters from scratch: the filter cache is only used alongside the
+        # ingest cache, so neither can hide the stages being profiled.
+        if profile_requested(http_request):
+            profile_id = uuid.uuid4().hex
+            pdf = await run_blocking(run_profiled, str(PROFILE_DIR / profile_id), render_labels_bytes,
+                                     str(file_path), config_dict, config_path)
+            if pdf is None:
+                raise HTTPException(status_code=400, detail=NO_DATA_MESSAGE)
+            return stream_bytes(pdf, media_type='application/pdf', filename=f"labels_{filename.split('.')[0]}.pdf",
+                                headers={"X-Profile-Id": profile_id})
+        
+        # Identical inputs render identical labels: serve a cached PDF when there is one
+        cache_key = render_cache_key(upload_registry.get(filename)["content_hash"], config_dict, config_path)
+        etag = f'"{cache_key}"'
+        if etag_matches(http_request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        cached_path = render_cache.get(cache_key)
+        if cached_path is not None:
+            return FileResponse(
+                cached_path,
+                media_type='application/pdf',
+                filename=f"labels_{filename.split('.')[0]}.pdf",
+                headers={"ETag": etag, "X-Render-Cache": "hit"}
+            )
+        
+        # Load, filter and render with config overrides; identical requests in flight share the render
+        pdf = await render_coalesced(cache_key, str(file_path), config_dict, config_path)
+        
+        if pdf is None:
+            raise HTTPException(status_code=400, detail=NO_DATA_MESSAGE)
+        
+        # Return the PDF: straight from memory when rendered here, else from the shared cache
+        pdf_filename = f"labels_{filename.split('.')[0]}.pdf"
+        headers = {"ETag": etag, "X-Render-Cache": "miss"}
+        if isinstance(pdf, bytes):
+            return stream_bytes(pdf, media_type='application/pdf', filename=pdf_filename, headers=headers)
+        return FileResponse(pdf, media_type='application/pdf', filename=pdf_filename, headers=headers)
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating labels: {str(e)}")
 
 
+@app.get("/profiles/{profile_id}/{kind}")
+async def download_profile(profile_id: str, kind: str, http_request: Request):
+    """Download the pstats dump or collapsed stacks of a profiled /generate run (admins only)."""
+    require_admin(http_request)
+    if kind not in PROFILE_ARTIFACTS or not profile_id.isalnum():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path = PROFILE_DIR / f"{profile_id}.{kind}"
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    return FileResponse(path, media_type=PROFILE_ARTIFACTS[kind], filename=f"profile_{profile_id}.{kind}")
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: GenerateLabelsRequest):
+    """Queue label generation in the background and return the job id."""
+    filename = request.filename
+    
+    file_path = get_upload_path(filename)
+    
+    config_dict = request.config.dict() if request.config else {}
+    job_id = job_store.create(filename, config_dict)
+    output_path = str(JOBS_DIR / f"{job_id}.pdf")
+    job_queue.submit(job_id, str(file_path), config_dict, output_path, "config/label_config.json",
+                     cache_dir=str(INGEST_CACHE_DIR))
+    
+    return {
+        "job_id": job_id,
+        "state": JOB_QUEUED,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result"
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report the state and progress of a label job."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "job_id": job["id"],
+        "filename": job["filename"],
+        "state": job["state"],
+        "progress": {
+            "labels_done": job["labels_done"],
+            "labels_total": job["labels_total"]
+        },
+        "label_count": job["label_count"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result_url": f"/jobs/{job_id}/result" if job["state"] == JOB_DONE else None,
+        "memory_report": job["memory_report"]
+    }
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Download the PDF of a finished label job."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job["state"] in (JOB_QUEUED, JOB_RUNNING):
+        return JSONResponse(status_code=409, content={"detail": "Job has not finished yet", "state": job["state"]})
+    
+    if job["state"] != JOB_DONE:
+        raise HTTPException(status_code=409, detail=f"Job failed: {job['error']}")
+    
+    if not job["result_path"] or not os.path.exists(job["result_path"]):
+        raise HTTPException(status_code=404, detail="Job result has expired")
+    
+    return FileResponse(
+        job["result_path"],
+        media_type='application/pdf',
+        filename=f"labels_{job['filename'].split('.')[0]}.pdf"
+    )
+
+
 @app.get("/config")
 async def get_config():
     """Get the current label configuration."""
@@ -467,6 +690,32 @@ async def health_check():
     return {"status": "healthy", "message": "Label Generator API is running"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Report size, limits and hit/miss counts of this worker's caches."""
+    # With LABEL_EXECUTOR=process, filtering runs (and is cached) in the executor
+    # processes, so these counts only cover work done in this process
+    return {"filter_cache": filter_cache.stats(), "render_cache": render_cache.stats()}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Expose this worker's stage timings, counters, cache and queue gauges in the Prometheus text format."""
+    filter_stats = filter_cache.stats()
+    render_stats = render_cache.stats()
+    gauges = [
+        ("label_cache_hit_ratio", "Hit ratio of this worker's caches.", {"cache": "filter"}, filter_stats["hit_ratio"]),
+        ("label_cache_hit_ratio", "Hit ratio of this worker's caches.", {"cache": "render"}, render_stats["hit_ratio"]),
+        ("label_job_queue_depth", "Background jobs waiting for a worker (all web workers).", None,
+         job_store.count(JOB_QUEUED)),
+        ("label_jobs_running", "Background jobs being rendered (all web workers).", None,
+         job_store.count(JOB_RUNNING)),
+        ("label_inflight_renders", "Distinct /generate renders in progress in this worker.", None, len(_inflight_renders)),
+        ("process_resident_memory_bytes", "Resident memory size in bytes.", None, metrics.process_rss_bytes()),
+    ]
+    return Response(metrics.render_prometheus(gauges), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/cleanup/status")
 async def cleanup_status():
     """Get status of uploaded files and cleanup configuration."""
@@ -474,23 +723,24 @@ async def cleanup_status():
         current_time = time.time()
         files_info = []
         
-        for file_path in UPLOAD_DIR.glob("*"):
-            if file_path.is_file() and file_path.name != ".gitkeep":
-                age = current_time - file_path.stat().st_mtime
-                size = file_path.stat().st_size
-                will_be_deleted = age > FILE_MAX_AGE
-                time_until_deletion = max(0, FILE_MAX_AGE - age)
-                
-                files_info.append({
-                    "filename": file_path.name,
-                    "age_seconds": int(age),
-                    "age_formatted": f"{age/3600:.1f} hours" if age >= 3600 else f"{age/60:.1f} minutes",
-                    "size_bytes": size,
-                    "size_formatted": f"{size/1024:.1f} KB" if size >= 1024 else f"{size} bytes",
-                    "will_be_deleted": will_be_deleted,
-                    "time_until_deletion": int(time_until_deletion) if not will_be_deleted else 0,
-                    "time_until_deletion_formatted": f"{time_until_deletion/60:.1f} minutes" if time_until_deletion < 3600 else f"{time_until_deletion/3600:.1f} hours"
-                })
+        for upload in upload_registry.list(include_expired=True):
+            age = current_time - upload["uploaded_at"]
+            size = upload["size"]
+            will_be_deleted = upload["expires_at"] <= current_time
+            time_until_deletion = max(0, upload["expires_at"] - current_time)
+            
+            files_info.append({
+                "filename": upload["filename"],
+                "rows": upload["row_count"],
+                "content_hash": upload["content_hash"],
+                "age_seconds": int(age),
+                "age_formatted": f"{age/3600:.1f} hours" if age >= 3600 else f"{age/60:.1f} minutes",
+                "size_bytes": size,
+                "size_formatted": f"{size/1024:.1f} KB" if size >= 1024 else f"{size} bytes",
+                "will_be_deleted": will_be_deleted,
+                "time_until_deletion": int(time_until_deletion) if not will_be_deleted else 0,
+                "time_until_deletion_formatted": f"{time_until_deletion/60:.1f} minutes" if time_until_deletion < 3600 else f"{time_until_deletion/3600:.1f} hours"
+            })
         
         return {
             "config": {
@@ -511,25 +761,7 @@ async def cleanup_status():
 async def run_cleanup_now():
     """Manually trigger file cleanup."""
     try:
-        current_time = time.time()
-        cleaned_files = []
-        
-        for file_path in UPLOAD_DIR.glob("*"):
-            if file_path.name == ".gitkeep" or not file_path.is_file():
-                continue
-            
-            file_age = current_time - file_path.stat().st_mtime
-            
-            if file_age > FILE_MAX_AGE:
-                try:
-                    file_path.unlink()
-                    uploaded_files.discard(file_path.name)
-                    cleaned_files.append({
-                        "filename": file_path.name,
-                        "age_seconds": int(file_age)
-                    })
-                except Exception as e:
-                    print(f"Error cleaning up {file_path.name}: {e}")
+        cleaned_files = cleanup_old_uploads()
         
         return {
             "message": f"Cleanup completed: {len(cleaned_files)} file(s) removed",